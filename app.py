@@ -74,35 +74,59 @@ st.markdown("---")
 # Quick stats section
 st.subheader("📊 Dataset Quick Stats")
 
-import pandas as pd
+from utils.data import load_catalog, load_quality_report, load_shared_data
 
-@st.cache_data
 def load_data():
-       try:
-           return pd.read_csv('assets/BMWdata.csv')
-       except FileNotFoundError:
-           st.error("Data file not found! Please check assets/BMWdata.csv exists.")
-           return None
-
-try:
-    df = load_data()
-    
+    """The shared dataset, or None (with an error shown) when the file is missing"""
+    try:
+        return load_shared_data()
+    except FileNotFoundError:
+        st.error("Data file not found! Please check assets/BMWdata.csv exists.")
+        return None
+
+df = load_data()
+
+if df is not None:
+    # Counts and ranges come from the dataset catalog, computed once at ingestion
+    catalog = load_catalog()
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Records", f"{len(df):,}")
+        st.metric("Total Records", f"{catalog.rows:,}")
     
     with col2:
-        st.metric("Years Covered", f"{df['Year'].min()}-{df['Year'].max()}")
+        st.metric("Years Covered", "{}-{}".format(*catalog.bounds('Year')))
     
     with col3:
-        st.metric("BMW Models", df['Model'].nunique())
+        st.metric("BMW Models", len(catalog.domain('Model')))
     
     with col4:
-        st.metric("Global Regions", df['Region'].nunique())
-        
-except Exception as e:
-    st.warning("Unable to load dataset preview. Please ensure the data file is in the correct location.")
+        st.metric("Global Regions", len(catalog.domain('Region')))
+
+    # Data quality report, produced while the dataset was ingested
+    report = load_quality_report()
+    if report.passed:
+        st.success(f"✅ Data quality checks passed for all {report.rows:,} records "
+                   f"({len(report.issues)} warnings).")
+    else:
+        st.error(f"⚠️ Data quality checks found {len(report.errors)} problems. "
+                 "Charts may be affected; see the report below.")
+
+    with st.expander("🩺 Data Quality Report"):
+        st.markdown("""
+        Every record is checked for the expected columns and types, plausible values of Year, Price,
+        Mileage and Engine Size, and known categories. Sales are also screened for anomalies within
+        each Model × Region segment.
+        """)
+        if report.issues:
+            st.dataframe(report.issues_frame(), hide_index=True, use_container_width=True)
+        st.markdown(f"- **Unusual records:** {report.anomalous_records:,} with a price or sales "
+                    f"volume more than 4 standard deviations from their segment's mean")
+        st.markdown(f"- **Unusual years:** {len(report.series_anomalies):,} Model × Region years whose "
+                    f"total sales depart sharply from the previous five years (robust z-score above 3.5)")
+        if len(report.series_anomalies):
+            st.dataframe(report.series_anomalies.sort_values('Robust_Z', key=abs, ascending=False),
+                         hide_index=True, use_container_width=True)
 
 st.markdown("---")
 
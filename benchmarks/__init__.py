@@ -0,0 +1,3 @@
+"""
+Headless benchmarks for the portfolio's data pipelines
+"""
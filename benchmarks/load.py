@@ -0,0 +1,492 @@
+"""
+Load test - concurrent Dashboard sessions replaying filter changes, timed per rerun
+
+Each simulated user loads the Dashboard, then replays a random but realistic sequence of
+sidebar changes: narrowing models, regions or fuel types, moving the year and price sliders,
+toggling the forecast, switching the map type or resetting every filter. Users pause between
+steps for an exponentially distributed think time. Every rerun is timed from the request to
+the end of the script run. The report gives throughput, p50/p95/p99 latency overall and per
+action, and the resident memory of the serving process sampled throughout the run.
+
+Drivers:
+- server: starts `streamlit run app.py` on a local port (or targets --url) and drives it over
+  the browser's own websocket protocol, one connection per session. Memory is the server
+  process's RSS.
+- apptest: runs each session as a streamlit.testing AppTest on a thread of this process,
+  sharing its caches. No network involved; memory is this process's RSS.
+
+Usage (from the repository root):
+    python -m benchmarks.load                                  # 10 sessions x 10 steps
+    python -m benchmarks.load --sessions 50 --steps 20 --think 1
+    python -m benchmarks.load --driver apptest --sessions 4 --think 0
+    python -m benchmarks.load --url ws://localhost:8501 --pid 12345
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import streamlit
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from utils.data import ROOT, load_catalog
+
+BENCH_DIR = Path(__file__).resolve().parent
+OUTPUT_PATH = BENCH_DIR / 'load_latest.json'
+
+DASHBOARD_SCRIPT = ROOT / 'pages' / '3_📈_Dashboard.py'
+DASHBOARD_PAGE = 'Dashboard'
+
+# Sidebar widgets the scenarios change, by label
+WIDGETS = {
+    'years': 'Select Year Range',
+    'models': 'Select BMW Models',
+    'regions': 'Select Regions',
+    'fuel_types': 'Select Fuel Types',
+    'price': 'Price Range (USD)',
+    'forecast': '🔮 Show sales forecast',
+    'map_type': 'Map type',
+}
+MAP_TYPES = ['Choropleth', 'Density']
+
+# Relative frequency of each user action
+ACTION_WEIGHTS = {
+    'models': 3, 'regions': 3, 'fuel_types': 2, 'years': 2, 'price': 2,
+    'forecast': 1, 'map_type': 1, 'reset': 1,
+}
+
+PERCENTILES = (50, 95, 99)
+MEMORY_INTERVAL = 0.25
+SERVER_START_TIMEOUT = 60
+
+
+class Scenario:
+    """Random sidebar changes of one simulated user, drawn from the catalog's domains"""
+
+    def __init__(self, catalog, seed):
+        self.rng = np.random.default_rng(seed)
+        self.domains = {name: catalog.domain(column) for name, column in
+                        [('models', 'Model'), ('regions', 'Region'), ('fuel_types', 'Fuel_Type')]}
+        self.years = catalog.bounds('Year')
+        self.prices = catalog.bounds('Price_USD')
+        self.price_step = catalog.slider_step('Price_USD')
+        self.actions = list(ACTION_WEIGHTS)
+        weights = np.array(list(ACTION_WEIGHTS.values()), dtype=float)
+        self.weights = weights / weights.sum()
+        self.forecast = True
+        self.map_type = MAP_TYPES[0]
+
+    def defaults(self):
+        """Widget values of a fresh Dashboard, by label"""
+        return {
+            WIDGETS['years']: tuple(self.years),
+            WIDGETS['models']: list(self.domains['models']),
+            WIDGETS['regions']: list(self.domains['regions']),
+            WIDGETS['fuel_types']: list(self.domains['fuel_types']),
+            WIDGETS['price']: tuple(self.prices),
+            WIDGETS['forecast']: True,
+            WIDGETS['map_type']: MAP_TYPES[0],
+        }
+
+    def _subset(self, values, most):
+        size = int(self.rng.integers(1, min(most, len(values)) + 1))
+        chosen = set(self.rng.choice(len(values), size=size, replace=False).tolist())
+        return [v for i, v in enumerate(values) if i in chosen]
+
+    def _range(self, bounds, step):
+        """Random sub-range of bounds on the slider's step grid"""
+        positions = int((bounds[1] - bounds[0]) // step)
+        low, high = sorted(self.rng.choice(positions + 1, size=2, replace=False).tolist())
+        return bounds[0] + low * step, min(bounds[0] + high * step, bounds[1])
+
+    def step(self):
+        """(action, {label: value}) of the user's next change"""
+        action = str(self.rng.choice(self.actions, p=self.weights))
+        if action in self.domains:
+            return action, {WIDGETS[action]: self._subset(self.domains[action], 3)}
+        if action == 'years':
+            return action, {WIDGETS['years']: self._range(self.years, 1)}
+        if action == 'price':
+            return action, {WIDGETS['price']: self._range(self.prices, self.price_step)}
+        if action == 'forecast':
+            self.forecast = not self.forecast
+            return action, {WIDGETS['forecast']: self.forecast}
+        if action == 'map_type':
+            self.map_type = MAP_TYPES[1 - MAP_TYPES.index(self.map_type)]
+            return action, {WIDGETS['map_type']: self.map_type}
+        self.forecast, self.map_type = True, MAP_TYPES[0]
+        return action, self.defaults()
+
+    def think(self, mean):
+        return float(self.rng.exponential(mean)) if mean > 0 else 0.0
+
+
+def rss_bytes(pid):
+    """Resident set size of a process from /proc, or None where that is unavailable"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler:
+    """Samples a process's RSS on a background thread until stopped"""
+
+    def __init__(self, pid, interval=MEMORY_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+
+    def _run(self):
+        while True:
+            rss = rss_bytes(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        if self.pid is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def summary(self, sessions):
+        if not self.samples:
+            return {'pid': self.pid, 'available': False}
+        start, peak, end = self.samples[0], max(self.samples), self.samples[-1]
+        return {'pid': self.pid, 'available': True, 'start_mb': start / 1e6, 'peak_mb': peak / 1e6,
+                'end_mb': end / 1e6, 'per_session_mb': (peak - start) / 1e6 / max(sessions, 1)}
+
+
+class StreamlitServer:
+    """`streamlit run app.py` in a subprocess on a free local port"""
+
+    def __init__(self, port=None):
+        self.port = port or _free_port()
+        self.process = None
+
+    @property
+    def url(self):
+        return f'ws://localhost:{self.port}'
+
+    def __enter__(self):
+        env = dict(os.environ, PORTFOLIO_TELEMETRY='0')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', str(ROOT / 'app.py'),
+             '--server.headless', 'true', '--server.port', str(self.port),
+             '--browser.gatherUsageStats', 'false'],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Streamlit server exited with code {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f'http://localhost:{self.port}/_stcore/health', timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.25)
+        self.__exit__()
+        raise TimeoutError(f"Streamlit server did not start within {SERVER_START_TIMEOUT} s")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def widget_state(widget_id, value):
+    """WidgetState of a value as the browser encodes it"""
+    state = WidgetState(id=widget_id)
+    if isinstance(value, bool):
+        state.bool_value = value
+    elif isinstance(value, str):
+        state.string_value = value
+    elif isinstance(value, tuple):
+        state.double_array_value.data.extend(float(v) for v in value)
+    else:
+        state.string_array_value.data.extend(str(v) for v in value)
+    return state
+
+
+class WebsocketSession:
+    """One browser-like session on a Streamlit server, rerunning the Dashboard"""
+
+    def __init__(self, url, timeout):
+        self.url = url.rstrip('/') + '/_stcore/stream'
+        self.timeout = timeout
+        self.widget_ids = {}
+        self.values = {}
+        self.ws = None
+
+    async def __aenter__(self):
+        self.ws = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    async def rerun(self, changes=None):
+        """Apply {label: value} changes and rerun; returns (seconds, errors)"""
+        for label, value in (changes or {}).items():
+            self.values[self.widget_ids[label]] = widget_state(self.widget_ids[label], value)
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_name = DASHBOARD_PAGE
+        msg.rerun_script.widget_states.widgets.extend(self.values.values())
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        errors = await asyncio.wait_for(self._receive(), self.timeout)
+        return time.perf_counter() - start, errors
+
+    async def _receive(self):
+        """Read messages up to the end of the script run, noting widgets and exceptions"""
+        errors = 0
+        while True:
+            msg = ForwardMsg()
+            msg.ParseFromString(await self.ws.recv())
+            kind = msg.WhichOneof('type')
+            if kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+                element = msg.delta.new_element
+                field = element.WhichOneof('type')
+                if field == 'exception':
+                    errors += 1
+                proto = getattr(element, field)
+                if getattr(proto, 'id', '') and getattr(proto, 'label', ''):
+                    self.widget_ids[proto.label] = proto.id
+            elif kind == 'script_finished':
+                if msg.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    errors += 1
+                return errors
+
+
+async def _server_user(url, scenario, steps, think, timeout, delay, records):
+    await asyncio.sleep(delay)
+    try:
+        async with WebsocketSession(url, timeout) as session:
+            seconds, errors = await session.rerun()
+            records.append(('load', seconds, errors))
+            for _ in range(steps):
+                await asyncio.sleep(scenario.think(think))
+                action, changes = scenario.step()
+                seconds, errors = await session.rerun(changes)
+                records.append((action, seconds, errors))
+    except (asyncio.TimeoutError, OSError, websockets.WebSocketException) as exc:
+        records.append(('failed', None, f'{type(exc).__name__}: {exc}'))
+
+
+def run_server(url, scenarios, steps, think, timeout, ramp):
+    """Records of every session driven concurrently over websockets"""
+    records = []
+
+    async def main():
+        await asyncio.gather(*[
+            _server_user(url, scenario, steps, think, timeout, ramp * i / len(scenarios), records)
+            for i, scenario in enumerate(scenarios)
+        ])
+
+    asyncio.run(main())
+    return records
+
+
+def _apptest_widget(at, label):
+    for kind in ('slider', 'multiselect', 'toggle', 'radio'):
+        for widget in getattr(at, kind):
+            if widget.label == label:
+                return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def _apptest_user(scenario, steps, think, timeout, delay, records):
+    from streamlit.testing.v1 import AppTest
+
+    time.sleep(delay)
+    at = AppTest.from_file(str(DASHBOARD_SCRIPT), default_timeout=timeout)
+    action, changes = 'load', {}
+    for step in range(steps + 1):
+        if step:
+            time.sleep(scenario.think(think))
+            action, changes = scenario.step()
+        for label, value in changes.items():
+            _apptest_widget(at, label).set_value(value)
+        start = time.perf_counter()
+        try:
+            at.run()
+        except RuntimeError as exc:
+            records.append((action, None, f'{type(exc).__name__}: {exc}'))
+            return
+        records.append((action, time.perf_counter() - start, len(at.exception)))
+
+
+def run_apptest(scenarios, steps, think, timeout, ramp):
+    """Records of every session run as an AppTest on its own thread"""
+    os.environ.setdefault('PORTFOLIO_TELEMETRY', '0')
+    records = []
+    threads = [threading.Thread(target=_apptest_user, name=f'load-session-{i}',
+                                args=(scenario, steps, think, timeout, ramp * i / len(scenarios), records))
+               for i, scenario in enumerate(scenarios)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def run_sessions(url, scenarios, steps, think, timeout, ramp):
+    """Records of scenarios run against the server at url, or as AppTests when url is None"""
+    if url is None:
+        return run_apptest(scenarios, steps, think, timeout, ramp)
+    return run_server(url, scenarios, steps, think, timeout, ramp)
+
+
+def latency_summary(seconds):
+    values = np.asarray(seconds, dtype=float)
+    summary = {'count': len(values)}
+    if len(values):
+        summary.update({f'p{p}_ms': float(np.percentile(values, p)) * 1000 for p in PERCENTILES})
+        summary.update(mean_ms=float(values.mean()) * 1000, max_ms=float(values.max()) * 1000)
+    return summary
+
+
+def summarize(records, elapsed):
+    """Throughput, error counts and latency percentiles overall and per action"""
+    timed = [(action, seconds) for action, seconds, _ in records if seconds is not None]
+    failures = [error for _, seconds, error in records if seconds is None]
+    errors = sum(error for _, seconds, error in records if seconds is not None)
+    actions = {}
+    for action, seconds in timed:
+        actions.setdefault(action, []).append(seconds)
+    return {
+        'reruns': len(timed),
+        'errors': errors,
+        'failed_sessions': len(failures),
+        'failures': failures,
+        'elapsed_seconds': elapsed,
+        'throughput_per_second': len(timed) / elapsed if elapsed else 0.0,
+        'latency': latency_summary([s for _, s in timed]),
+        'actions': {action: latency_summary(values) for action, values in sorted(actions.items())},
+    }
+
+
+def print_report(output):
+    meta, summary, memory = output['meta'], output['summary'], output['memory']
+    print(f"Driver: {meta['driver']}, {meta['sessions']} sessions x {meta['steps']} steps, "
+          f"think {meta['think']} s", file=sys.stderr)
+    print(f"Reruns: {summary['reruns']} ({summary['errors']} with errors, "
+          f"{summary['failed_sessions']} failed sessions) in {summary['elapsed_seconds']:.1f} s "
+          f"-> {summary['throughput_per_second']:.2f} reruns/s", file=sys.stderr)
+    print(f"  {'action':<12} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}",
+          file=sys.stderr)
+    for name, row in [('all', summary['latency'])] + list(summary['actions'].items()):
+        if row['count']:
+            print(f"  {name:<12} {row['count']:>6} {row['p50_ms']:10.1f} {row['p95_ms']:10.1f} "
+                  f"{row['p99_ms']:10.1f} {row['max_ms']:10.1f}", file=sys.stderr)
+    if memory['available']:
+        print(f"Memory (pid {memory['pid']}): start {memory['start_mb']:.0f} MB, peak {memory['peak_mb']:.0f} MB, "
+              f"end {memory['end_mb']:.0f} MB, {memory['per_session_mb']:.1f} MB per session at peak",
+              file=sys.stderr)
+    else:
+        print("Memory: not sampled (pass --pid with --url, on Linux)", file=sys.stderr)
+    for failure in summary['failures']:
+        print(f"FAILED session: {failure}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--driver', choices=['server', 'apptest'], default='server')
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--steps', type=int, default=10, help='Filter changes per session after the first load')
+    parser.add_argument('--think', type=float, default=0.5, help='Mean pause between steps, in seconds')
+    parser.add_argument('--ramp', type=float, default=0.0, help='Seconds over which sessions start')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds allowed per rerun')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='Existing server, e.g. ws://localhost:8501 (server driver)')
+    parser.add_argument('--port', type=int, help='Port of the started server (default: a free port)')
+    parser.add_argument('--pid', type=int, help='Process to sample memory of when using --url')
+    parser.add_argument('--no-warmup', action='store_true',
+                        help='Time the first load too, including cold cache builds')
+    parser.add_argument('--output', type=Path, default=OUTPUT_PATH)
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog()
+    scenarios = [Scenario(catalog, args.seed + i) for i in range(args.sessions)]
+
+    def measure(url, pid):
+        # An untimed first load builds the shared caches, unless cold starts are measured
+        if not args.no_warmup:
+            run_sessions(url, [Scenario(catalog, args.seed + args.sessions)], 0, 0, args.timeout, 0)
+        with MemorySampler(pid) as sampler:
+            start = time.perf_counter()
+            records = run_sessions(url, scenarios, args.steps, args.think, args.timeout, args.ramp)
+            elapsed = time.perf_counter() - start
+        return records, elapsed, sampler.summary(args.sessions)
+
+    if args.driver == 'apptest':
+        records, elapsed, memory = measure(None, os.getpid())
+    elif args.url:
+        records, elapsed, memory = measure(args.url, args.pid)
+    else:
+        with StreamlitServer(args.port) as server:
+            records, elapsed, memory = measure(server.url, server.process.pid)
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'streamlit': streamlit.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'driver': args.driver,
+            'url': args.url,
+            'sessions': args.sessions,
+            'steps': args.steps,
+            'think': args.think,
+            'ramp': args.ramp,
+            'seed': args.seed,
+            'warmup': not args.no_warmup,
+        },
+        'summary': summarize(records, elapsed),
+        'memory': memory,
+        'records': [{'action': action, 'seconds': seconds, 'errors': errors}
+                    for action, seconds, errors in records],
+    }
+    print_report(output)
+    args.output.write_text(json.dumps(output, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 1 if output['summary']['errors'] or output['summary']['failed_sessions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
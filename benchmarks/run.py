@@ -0,0 +1,285 @@
+"""
+Benchmark suite - time each page's pipeline stages headlessly, without a browser
+
+Stages: CSV parse, data quality validation, dataset catalog, columnar cache build/attach, filter mask, streamed exports, each group-by, figure
+construction and JSON serialization for the Dashboard and EDA Gallery, over synthetic datasets (utils.synthetic) fitted to the bundled CSV;
+graph build, metrics, figure and JSON for the Network Analysis page over random graphs.
+
+Usage (from the repository root):
+    python -m benchmarks.run                       # quick grid, compared with the baseline
+    python -m benchmarks.run --scale full          # 50k-50M rows, 10-10^6 edges
+    python -m benchmarks.run --rows 200000 --edges 100
+    python -m benchmarks.run --save-baseline       # store this run as the new baseline
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.io as pio
+
+from utils import aggregations as agg
+from utils import charts
+from utils.catalog import build_catalog
+from utils.cube import SalesCube, combine_selection
+from utils.data import DATA_PATH, attach_columnar, build_columnar_cache, read_sales_csv
+from utils.export import DATA_FORMATS, export_chunks
+from utils.heatmap import SparseHeatmap
+from utils.network import calculate_metrics, create_network_viz, create_community_viz
+from utils.planner import QueryPlanner
+from utils.quality import validate
+from utils.synthetic import SyntheticSalesModel, iter_chunks, write_dataset
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_PATH = BENCH_DIR / 'baseline.json'
+OUTPUT_PATH = BENCH_DIR / 'latest.json'
+
+SCALES = {
+    'quick': {'rows': [50_000, 500_000], 'edges': [10, 1_000]},
+    'full': {'rows': [50_000, 500_000, 5_000_000, 50_000_000],
+             'edges': [10, 100, 1_000, 10_000, 100_000, 1_000_000]},
+}
+
+# Betweenness, closeness and greedy modularity are O(n*m); beyond this they are skipped
+EXPENSIVE_GRAPH_EDGES = 10_000
+
+# Ratios below this absolute difference are treated as timer noise
+NOISE_FLOOR_SECONDS = 0.002
+
+
+class Recorder:
+    """Time callables and collect one result record per stage"""
+
+    def __init__(self, repeats):
+        self.repeats = repeats
+        self.results = []
+
+    def time(self, page, stage, size, func, repeats=None):
+        samples = []
+        result = None
+        for _ in range(repeats or self.repeats):
+            start = time.perf_counter()
+            result = func()
+            samples.append(time.perf_counter() - start)
+        self.results.append({
+            'page': page,
+            'stage': stage,
+            'size': size,
+            'seconds': min(samples),
+            'median_seconds': statistics.median(samples),
+            'repeats': len(samples),
+        })
+        print(f"  {page:<10} {stage:<36} {size:>12,}  {min(samples) * 1000:10.2f} ms", file=sys.stderr)
+        return result
+
+    def skip(self, page, stage, size, reason):
+        self.results.append({'page': page, 'stage': stage, 'size': size,
+                             'seconds': None, 'skipped': reason})
+
+
+def figure_stages(rec, page, size, name, build):
+    """Time figure construction and its JSON serialization"""
+    fig = rec.time(page, f'figure_{name}', size, build)
+    rec.time(page, f'json_{name}', size, lambda: pio.to_json(fig, validate=False))
+
+
+def bench_dashboard(rec, df, size):
+    page = 'dashboard'
+    years = (int(df['Year'].min()), int(df['Year'].max()))
+    prices = (int(df['Price_USD'].min()), int(df['Price_USD'].max()))
+    models = sorted(df['Model'].unique())
+    regions = sorted(df['Region'].unique())
+    fuels = sorted(df['Fuel_Type'].unique())
+
+    filtered = rec.time(page, 'filter_default', size,
+                        lambda: agg.apply_filters(df, years, models, regions, fuels, prices))
+    rec.time(page, 'filter_narrow', size,
+             lambda: agg.apply_filters(df, (2018, 2022), models[:3], regions[:2], fuels[:2], prices))
+    rec.time(page, 'kpis', size, lambda: agg.compute_kpis(filtered, df))
+    for fmt in DATA_FORMATS:
+        rec.time(page, f'export_{fmt}', size, lambda: sum(len(c) for c in export_chunks(filtered, fmt)), repeats=1)
+
+    cube = rec.time(page, 'cube_build', size, lambda: SalesCube.build(df), repeats=1)
+    brushes = {'Region': regions[:1], 'Year': list(range(2015, 2018))}
+    sidebar = {'Year': list(range(years[0], years[1] + 1)), 'Model': models,
+               'Region': regions, 'Fuel_Type': fuels}
+
+    def brushed_aggregates():
+        for dim in ['Region', 'Fuel_Type', 'Year', 'Model']:
+            cube.aggregate([dim], combine_selection(sidebar, brushes, exclude=dim))
+        cube.aggregate(['Transmission', 'Fuel_Type'], combine_selection(sidebar, brushes))
+
+    rec.time(page, 'cube_brush_all_charts', size, brushed_aggregates)
+
+    planner = rec.time(page, 'planner_build', size,
+                       lambda: QueryPlanner(df, cube, build_catalog(df)), repeats=1)
+    narrow = {'Model': models[:1], 'Region': regions[:1]}
+    rec.time(page, 'planner_rows_narrow', size, lambda: planner.rows(narrow))
+    rec.time(page, 'planner_rows_broad', size, lambda: planner.rows({'Region': regions[1:]}))
+
+    for name, group, build in [
+        ('region_sales', agg.region_sales, charts.region_sales_chart),
+        ('fuel_sales', agg.fuel_sales, charts.fuel_sales_chart),
+        ('sales_trend', agg.sales_trend, charts.sales_trend_chart),
+        ('top_models', agg.top_models, charts.top_models_chart),
+        ('transmission_fuel', agg.transmission_fuel_sales, charts.transmission_fuel_chart),
+    ]:
+        data = rec.time(page, f'groupby_{name}', size, lambda: group(filtered))
+        figure_stages(rec, page, size, name, lambda: build(data))
+
+
+def bench_eda(rec, df, size):
+    page = 'eda'
+    for name, cols in (('model_color', ['Color']), ('model_color_year_region', ['Color', 'Year', 'Region'])):
+        pivot = rec.time(page, f'heatmap_build_{name}', size,
+                         lambda: SparseHeatmap.from_frame(df, ['Model'], cols))
+        view = rec.time(page, f'heatmap_view_{name}', size, lambda: pivot.view(), repeats=1)
+        figure_stages(rec, page, size, f'heatmap_{name}',
+                      lambda: charts.pivot_heatmap(view, 'Sales_Volume', name))
+
+    matrix = rec.time(page, 'groupby_model_year_matrix', size, lambda: agg.model_year_matrix(df))
+    rec.time(page, 'model_trend_stats', size, lambda: agg.model_trend_stats(matrix))
+    yearly = rec.time(page, 'model_yearly_slice', size, lambda: agg.model_yearly_sales(matrix, 'M5'))
+    figure_stages(rec, page, size, 'model_yearly', lambda: charts.model_yearly_chart(yearly, 'M5'))
+
+    trends = rec.time(page, 'groupby_fuel_trends', size, lambda: agg.fuel_trends(df))
+    figure_stages(rec, page, size, 'fuel_trends', lambda: charts.fuel_trends_chart(trends))
+
+    segmented = df.copy()
+    rec.time(page, 'model_segments', size, lambda: agg.add_model_segments(segmented))
+    rec.time(page, 'segment_correlations', size, lambda: agg.segment_correlations(segmented))
+    for by in ('Year', ['Model', 'Region', 'Fuel_Type']):
+        name = by if isinstance(by, str) else '_'.join(by)
+        rec.time(page, f'grouped_stats_{name.lower()}', size,
+                 lambda: agg.grouped_stats(segmented, by, 'Mileage_KM', 'Price_USD'))
+    scatter_df = segmented.sample(n=min(1000, len(segmented)), random_state=42)
+    figure_stages(rec, page, size, 'mileage_price_scatter',
+                  lambda: charts.mileage_price_scatter(scatter_df))
+
+
+def bench_network(rec, n_edges):
+    page = 'network'
+    n_nodes = max(10, n_edges // 5)
+    G = rec.time(page, 'graph_build', n_edges,
+                 lambda: nx.gnm_random_graph(n_nodes, n_edges, seed=42))
+    rec.time(page, 'degree_centrality', n_edges, lambda: nx.degree_centrality(G))
+    if n_edges > EXPENSIVE_GRAPH_EDGES:
+        for stage in ['metrics', 'figure_network', 'json_network',
+                      'figure_communities', 'json_communities']:
+            rec.skip(page, stage, n_edges, f'O(n*m) stage skipped above {EXPENSIVE_GRAPH_EDGES:,} edges')
+        return
+    metrics = rec.time(page, 'metrics', n_edges, lambda: calculate_metrics(G), repeats=1)
+    figure_stages(rec, page, n_edges, 'network', lambda: create_network_viz(G, metrics))
+    figure_stages(rec, page, n_edges, 'communities',
+                  lambda: create_community_viz(G, metrics['communities']))
+
+
+def run(rows, edges, repeats):
+    rec = Recorder(repeats)
+    model = SyntheticSalesModel.fit(read_sales_csv(DATA_PATH))
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in rows:
+            print(f"Dataset: {n_rows:,} rows", file=sys.stderr)
+            path = Path(tmp) / f'bmw_{n_rows}.csv'
+            write_dataset(path, iter_chunks(model, n_rows, seed=42))
+            df = rec.time('data', 'csv_parse', n_rows, lambda: read_sales_csv(path), repeats=1)
+            rec.time('data', 'quality_validate', n_rows, lambda: validate(df))
+            rec.time('data', 'catalog_build', n_rows, lambda: build_catalog(df))
+            arrow_path = path.with_suffix('.arrow')
+            rec.time('data', 'columnar_build', n_rows,
+                     lambda: build_columnar_cache(path, arrow_path), repeats=1)
+            # Pages run on the attached frame, whose text columns are dictionary-encoded
+            attached = rec.time('data', 'columnar_attach', n_rows, lambda: attach_columnar(arrow_path))
+            bench_dashboard(rec, attached, n_rows)
+            bench_eda(rec, attached, n_rows)
+            del df, attached
+            path.unlink()
+            arrow_path.unlink()
+    for n_edges in edges:
+        print(f"Graph: {n_edges:,} edges", file=sys.stderr)
+        bench_network(rec, n_edges)
+    return rec.results
+
+
+def compare(results, baseline, tolerance):
+    """Return (report rows, regressions) of results against a baseline run"""
+    previous = {(r['page'], r['stage'], r['size']): r for r in baseline['results']}
+    report, regressions = [], []
+    for r in results:
+        old = previous.get((r['page'], r['stage'], r['size']))
+        if r['seconds'] is None or old is None or old.get('seconds') is None:
+            continue
+        ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        row = dict(r, baseline_seconds=old['seconds'], ratio=ratio)
+        report.append(row)
+        if ratio > 1 + tolerance and r['seconds'] - old['seconds'] > NOISE_FLOOR_SECONDS:
+            regressions.append(row)
+    return report, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='quick')
+    parser.add_argument('--rows', type=int, nargs='+', help='Dataset sizes (overrides --scale)')
+    parser.add_argument('--edges', type=int, nargs='+', help='Graph sizes (overrides --scale)')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', type=Path, default=OUTPUT_PATH)
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown ratio before a stage counts as a regression')
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    rows = args.rows or SCALES[args.scale]['rows']
+    edges = args.edges if args.edges is not None else SCALES[args.scale]['edges']
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'plotly': plotly.__version__,
+            'networkx': nx.__version__,
+            'machine': platform.machine(),
+            'rows': rows,
+            'edges': edges,
+            'repeats': args.repeats,
+        },
+        'results': run(rows, edges, args.repeats),
+    }
+
+    regressions = []
+    if args.baseline.exists() and not args.save_baseline:
+        report, regressions = compare(output['results'], json.loads(args.baseline.read_text()),
+                                      args.tolerance)
+        output['comparison'] = {'baseline': str(args.baseline), 'tolerance': args.tolerance,
+                                'stages': report, 'regressions': regressions}
+        for row in regressions:
+            print(f"REGRESSION {row['page']}/{row['stage']} @ {row['size']:,}: "
+                  f"{row['baseline_seconds'] * 1000:.2f} ms -> {row['seconds'] * 1000:.2f} ms "
+                  f"({row['ratio']:.2f}x)", file=sys.stderr)
+        print(f"Compared {len(report)} stages with baseline: {len(regressions)} regressions",
+              file=sys.stderr)
+
+    args.output.write_text(json.dumps(output, indent=2))
+    print(f"Results written to {args.output}", file=sys.stderr)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(output, indent=2))
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
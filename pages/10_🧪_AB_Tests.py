@@ -0,0 +1,146 @@
+"""
+A/B Tests - Engagement with the EDA Gallery chart variants and their significance
+"""
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.telemetry import ALPHA, EXPERIMENTS, experiment_results, get_telemetry, load_events
+
+# Header
+st.title("🧪 Visualization A/B Tests")
+st.markdown("""
+Each visitor to the EDA Gallery sees one of two designs for some charts, for example a heat map or a
+stacked bar chart of the same data. This page compares how visitors engaged with each design, using
+chart interactions and their answers to "Was this chart easy to read?". This implements the Future
+Work A/B testing framework for visualization effectiveness.
+""")
+st.markdown("---")
+
+# Section 1: Collection status
+st.header("1. 📡 Event Collection")
+
+telemetry = get_telemetry()
+
+if st.button("🔄 Refresh events"):
+    telemetry.flush()
+    load_events.clear()
+
+events = load_events()
+pipeline = telemetry.stats()
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("Stored Events", f"{len(events):,}")
+
+with col2:
+    st.metric("Sessions", f"{events['session'].nunique():,}")
+
+with col3:
+    st.metric("Buffered (this server)", f"{pipeline['buffered']:,}")
+
+with col4:
+    st.metric("Dropped (this server)", f"{pipeline['dropped'] + pipeline['failed']:,}")
+
+if events.empty:
+    st.info("""
+    No events have been recorded yet. Visit the EDA Gallery to take part, or record simulated sessions
+    from the repository root:
+
+    `python -m utils.telemetry --simulate 2000`
+    """)
+    st.stop()
+
+st.markdown("---")
+
+# Section 2: One block per experiment
+for number, (experiment, spec) in enumerate(EXPERIMENTS.items(), start=2):
+    st.header(f"{number}. 📊 {spec['title']}")
+
+    summary, tests = experiment_results(events, experiment)
+
+    col1, col2 = st.columns([3, 2])
+
+    with col1:
+        fig = go.Figure(go.Bar(
+            x=summary['Variant'],
+            y=summary['Interaction_Rate'],
+            error_y=dict(type='data', symmetric=False,
+                         array=summary['Rate_High'] - summary['Interaction_Rate'],
+                         arrayminus=summary['Interaction_Rate'] - summary['Rate_Low']),
+            marker_color=['#9bb7e0', '#1c69d4', '#0b3d91'][:len(summary)],
+            text=summary['Interaction_Rate'].map(lambda r: f"{r:.1%}" if r == r else "n/a"),
+            textposition='outside',
+        ))
+        fig.update_layout(title="Share of Sessions Interacting with the Chart",
+                          yaxis_title="Interaction Rate", yaxis_tickformat='.0%',
+                          xaxis_title="Variant", height=400)
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        st.dataframe(
+            summary[['Variant', 'Sessions', 'Interaction_Rate', 'Interactions_per_Session', 'Votes', 'Helpful_Rate']],
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'Interaction_Rate': st.column_config.NumberColumn("Interaction Rate", format="percent"),
+                'Interactions_per_Session': st.column_config.NumberColumn("Interactions / Session", format="%.2f"),
+                'Helpful_Rate': st.column_config.NumberColumn("Helpful Votes", format="percent"),
+            },
+        )
+        st.dataframe(
+            tests[['Metric', 'Test', 'p_value', 'Significant']],
+            hide_index=True,
+            use_container_width=True,
+            column_config={'p_value': st.column_config.NumberColumn("p-value", format="%.4f")},
+        )
+
+    significant = tests.loc[tests['Significant'], 'Metric'].tolist()
+    if significant:
+        best = summary.loc[summary['Interaction_Rate'].idxmax(), 'Variant']
+        st.success(f"Variants differ significantly (p < {ALPHA}) in: {', '.join(significant).lower()}. "
+                   f"**{best}** has the highest interaction rate.")
+    else:
+        st.info(f"No significant difference between variants at p < {ALPHA} yet.")
+    if tests['Low_Sample'].any():
+        st.caption("Some tests have few observations per variant; treat their p-values with caution.")
+
+    with st.expander("📖 How to Read This Chart"):
+        st.markdown("""
+        - **Bars:** Share of sessions that selected points on the chart at least once, per variant
+        - **Error bars:** 95% confidence interval for that share (Wilson score interval)
+        - **Tables:** Engagement per variant, and the test comparing variants on each metric
+        - **Significance:** A p-value below 0.05 means a difference this large would rarely arise by chance
+        """)
+
+    st.markdown("---")
+
+# Method
+st.header(f"{len(EXPERIMENTS) + 2}. 🧪 Method")
+
+st.markdown("""
+- **Assignment:** Each browser session draws one variant per experiment uniformly at random and keeps
+  it for the rest of the session
+- **Events:** An exposure when the session first sees its variant, a selection whenever it selects
+  points on the chart, and its latest thumbs up/down vote
+- **Collection:** Events go to an in-memory ring buffer that a background thread writes in batches to
+  a local SQLite database (or Parquet files), so tracking adds no disk I/O to a page rerun
+- **Tests:** Chi-square tests compare interaction and helpful-vote rates across variants, and a
+  Mann-Whitney U test compares interactions per session
+""")
+
+st.info("""
+**📌 Privacy & Limitations:** Events carry only a random session token, the variant, the event type and
+a timestamp; browsers sending Do Not Track and visitors who opt out in the EDA Gallery sidebar are not
+recorded. Interactions are a proxy for comprehension, repeated looks at the results inflate the chance
+of a false positive, and a new session starts on each browser reload.
+""")
+
+# Footer
+st.markdown("---")
+st.markdown("""
+<div style='text-align: center; color: #666; padding: 1rem 0;'>
+    <p>A/B Tests | Built with Streamlit, SciPy & Plotly | © 2025 Zakaria Iraqi</p>
+</div>
+""", unsafe_allow_html=True)
@@ -3,18 +3,31 @@ EDA Gallery - Exploratory Data Analysis with 4 Chart Types
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
-# Load data
-@st.cache_data
-def load_data():
-    df = pd.read_csv('assets/BMWdata.csv')
-    return df
+from utils.data import load_shared_data
+from utils.snapshots import render_comparison, snapshot_source, version_sidebar
+from utils.aggregations import (
+    model_yearly_sales, fuel_trends, add_model_segments, segment_correlations, grouped_stats
+)
+from utils.charts import (
+    pivot_heatmap, pivot_bars, model_yearly_chart, model_yearly_line,
+    fuel_trends_chart, mileage_price_scatter, group_correlation_chart
+)
+from utils.cube import load_model_year_sales
+from utils.heatmap import HEATMAP_DIMENSIONS, HEATMAP_METRICS, MAX_VIEW_CELLS, load_heatmap
+from utils.telemetry import assign_variant, feedback_prompt, telemetry_sidebar, tracked_chart
+
+# Dataset version - the working copy or a pinned snapshot
+pinned_version, compare_version, comparing = version_sidebar('eda')
+
+# Chart variants under test - assigned once per session
+telemetry_sidebar()
+color_variant = assign_variant('model_color_chart')
+yearly_variant = assign_variant('model_yearly_chart')
 
-df = load_data()
+# Load data - memory-mapped once per process and shared by all sessions
+source = snapshot_source(pinned_version)
+df = load_shared_data(source)
 
 # Header
 st.title("📊 EDA Gallery: Exploratory Data Analysis")
@@ -24,6 +37,10 @@ Each chart is designed to answer specific business questions and reveal patterns
 """)
 st.markdown("---")
 
+if comparing:
+    render_comparison(pinned_version, compare_version)
+    st.markdown("---")
+
 # Chart 1: Heat Map - Color/Model/Year combinations
 st.header("1. 🔥 Heat Map: Highest Sales by Color, Model, and Year")
 
@@ -34,28 +51,81 @@ st.markdown("""
 BMW optimize inventory planning, regional color preferences, and marketing strategies for specific models.
 """)
 
-# Prepare data for heatmap - aggregate by color and model
-heatmap_data = df.groupby(['Model', 'Color'])['Sales_Volume'].sum().reset_index()
-heatmap_pivot = heatmap_data.pivot(index='Model', columns='Color', values='Sales_Volume')
-
-fig1 = px.imshow(heatmap_pivot,
-                 labels=dict(x="Color", y="Model", color="Sales Volume"),
-                 title="Total Sales Volume by Model and Color (2010-2024)",
-                 color_continuous_scale="YlOrRd",
-                 aspect="auto")
-
-fig1.update_layout(height=500)
-st.plotly_chart(fig1, use_container_width=True)
+# Any dimensions can be combined on either axis; the pivot is kept sparse and large ones are
+# shown as aggregated blocks of a chosen window
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    row_dims = st.multiselect("Rows", HEATMAP_DIMENSIONS, default=['Model'], key='heatmap_rows')
+
+with col2:
+    col_dims = st.multiselect("Columns", [d for d in HEATMAP_DIMENSIONS if d not in row_dims],
+                              default=['Color'], key='heatmap_cols')
+
+with col3:
+    heatmap_metric = st.selectbox("Value", list(HEATMAP_METRICS), format_func=HEATMAP_METRICS.get,
+                                  key='heatmap_metric')
+
+with col4:
+    heatmap_order = st.radio("Order", ['label', 'total'], horizontal=True, key='heatmap_order',
+                             format_func={'label': "A–Z", 'total': "Largest first"}.get)
+
+row_dims = row_dims or ['Model']
+col_dims = col_dims or [next(d for d in HEATMAP_DIMENSIONS if d not in row_dims)]
+pivot = load_heatmap(row_dims, col_dims, heatmap_order, source)
+n_rows, n_cols = pivot.shape
+# Bars get one series per column, so they show fewer, wider column blocks
+max_cols = 12 if color_variant == 'stacked_bar' else MAX_VIEW_CELLS
+
+row_window = col_window = None
+if n_rows > MAX_VIEW_CELLS or n_cols > max_cols:
+    col1, col2 = st.columns(2)
+    with col1:
+        if n_rows > MAX_VIEW_CELLS:
+            row_window = st.slider("Row window", 0, n_rows, (0, n_rows), key='heatmap_row_window')
+    with col2:
+        if n_cols > max_cols:
+            col_window = st.slider("Column window", 0, n_cols, (0, n_cols), key='heatmap_col_window')
+    if row_window and row_window[0] == row_window[1] or col_window and col_window[0] == col_window[1]:
+        row_window = col_window = None
+
+view = pivot.view(row_window, col_window, max_cols=max_cols)
+heatmap_title = (f"{HEATMAP_METRICS[heatmap_metric]} by {' × '.join(row_dims).replace('_', ' ')} "
+                 f"and {' × '.join(col_dims).replace('_', ' ')}")
+
+if color_variant == 'stacked_bar':
+    fig1 = pivot_bars(view, heatmap_metric, heatmap_title)
+else:
+    fig1 = pivot_heatmap(view, heatmap_metric, heatmap_title)
+tracked_chart(fig1, 'model_color_chart')
+if view.row_level or view.col_level:
+    st.caption(f"{n_rows:,} × {n_cols:,} pivot with {pivot.nnz:,} non-empty cells: each cell shown merges "
+               f"{1 << view.row_level} row(s) × {1 << view.col_level} column(s). Narrow the windows to zoom in.")
+feedback_prompt('model_color_chart')
 
 # How to read this chart
 with st.expander("📖 How to Read This Chart"):
-    st.markdown("""
-    - **Axes:** The vertical axis shows BMW models, while the horizontal axis shows available colors
-    - **Color Encoding:** Darker red/orange colors indicate higher sales volumes, lighter yellow indicates lower volumes
-    - **Hot Spots:** The darkest cells reveal the most popular model-color combinations
-    - **Patterns:** You can scan horizontally across a model to see which colors sell best for that model, 
-      or vertically down a color to see which models are most popular in that color
-    """)
+    if color_variant == 'stacked_bar':
+        st.markdown("""
+        - **Axes:** Each bar is one row value (BMW models by default), and its length shows the chosen value
+        - **Segments:** Each colored segment is one column value (paint colors by default); for average
+          price the segments are drawn side by side instead of stacked
+        - **Comparisons:** Longer bars are the best-selling models; compare segment lengths within a bar
+          to see which colors sell best for that model
+        - **Legend:** Click a color in the legend to hide it, or double-click to show it alone
+        - **Large pivots:** Adjacent columns are merged into blocks labelled "first … last"
+        """)
+    else:
+        st.markdown("""
+        - **Axes:** Rows and columns are the dimensions chosen above; by default the vertical axis shows
+          BMW models and the horizontal axis shows available colors
+        - **Color Encoding:** Darker red/orange colors indicate higher sales volumes, lighter yellow indicates lower volumes
+        - **Hot Spots:** The darkest cells reveal the most popular model-color combinations
+        - **Patterns:** You can scan horizontally across a model to see which colors sell best for that model, 
+          or vertically down a color to see which models are most popular in that color
+        - **Large pivots:** Adjacent rows or columns are merged into blocks labelled "first … last";
+          narrow the windows to zoom in, and blank cells are combinations that never occur
+        """)
 
 # Observations
 st.subheader("🔍 Key Observations")
@@ -72,59 +142,87 @@ st.markdown("""
 
 st.markdown("---")
 
-# Chart 2: Bar Chart - M5 Sales by Year
-st.header("2. 📊 Bar Chart: BMW M5 Sales Performance by Year")
+# Chart 2: Bar Chart - Sales by Year for one model
+model_year, model_stats = load_model_year_sales(source)
+models = list(model_year.index)
+model = st.session_state.get('eda_model', 'M5' if 'M5' in models else models[0])
+if model not in models:
+    # The kept model is not in this dataset version
+    model = st.session_state['eda_model'] = models[0]
 
-st.markdown("""
-**Question:** What year did the BMW M5 sell the most volume in?
+st.header(f"2. 📊 Bar Chart: BMW {model} Sales Performance by Year")
 
-**Why it matters:** The M5 is BMW's flagship performance sedan. Understanding its sales trends helps 
-identify successful model years, potentially correlating with design refreshes, technology updates, 
-or market conditions.
-""")
+st.selectbox("Model", models, index=models.index(model), key='eda_model')
+
+st.markdown(f"""
+**Question:** What year did the BMW {model} sell the most volume in?
 
-# Filter for M5 only
-m5_data = df[df['Model'] == 'M5'].groupby('Year')['Sales_Volume'].sum().reset_index()
-m5_data = m5_data.sort_values('Year')
+**Why it matters:** Understanding a model's sales trends helps identify successful model years, 
+potentially correlating with design refreshes, technology updates, or market conditions.
+""")
 
-fig2 = px.bar(m5_data, 
-              x='Year', 
-              y='Sales_Volume',
-              title="BMW M5 Total Sales Volume by Year (2010-2024)",
-              labels={'Sales_Volume': 'Total Sales Volume', 'Year': 'Year'},
-              color='Sales_Volume',
-              color_continuous_scale='Blues')
+# Slice the model's row of the precomputed Model x Year matrix
+model_data = model_yearly_sales(model_year, model)
 
-fig2.update_layout(height=500, showlegend=False)
-st.plotly_chart(fig2, use_container_width=True)
+if yearly_variant == 'line':
+    fig2 = model_yearly_line(model_data, model)
+else:
+    fig2 = model_yearly_chart(model_data, model)
+tracked_chart(fig2, 'model_yearly_chart')
+feedback_prompt('model_yearly_chart')
 
 # How to read this chart
 with st.expander("📖 How to Read This Chart"):
-    st.markdown("""
-    - **X-axis:** Years from 2010 to 2024
-    - **Y-axis:** Total sales volume for BMW M5 in that year
-    - **Bar Height:** Taller bars indicate higher sales volumes for that year
-    - **Color Intensity:** Darker blue colors represent higher sales numbers
-    - **Trend:** This simple format makes it immediately obvious which year had peak M5 sales
-    """)
+    if yearly_variant == 'line':
+        st.markdown(f"""
+        - **X-axis:** Years from 2010 to 2024
+        - **Y-axis:** Total sales volume for BMW {model} in that year
+        - **Points:** Each marker is one year's sales; the line connects consecutive years
+        - **Trend:** Rising and falling stretches of the line show growth and decline between years
+        """)
+    else:
+        st.markdown(f"""
+        - **X-axis:** Years from 2010 to 2024
+        - **Y-axis:** Total sales volume for BMW {model} in that year
+        - **Bar Height:** Taller bars indicate higher sales volumes for that year
+        - **Color Intensity:** Darker blue colors represent higher sales numbers
+        - **Trend:** This simple format makes it immediately obvious which year had peak {model} sales
+        """)
 
 # Observations
 st.subheader("🔍 Key Observations")
 
-# Find peak year
-peak_year = m5_data.loc[m5_data['Sales_Volume'].idxmax()]
+stats = model_stats.loc[model]
+growth_rank = int(model_stats['CAGR'].rank(ascending=False, method='min')[model])
+growth_place = "the" if growth_rank == 1 else f"the {growth_rank}{ {2: 'nd', 3: 'rd'}.get(growth_rank, 'th') }"
 
 st.markdown(f"""
-- **Peak Performance:** The BMW M5 achieved its highest sales volume in **{int(peak_year['Year'])}** 
-  with **{int(peak_year['Sales_Volume']):,}** units sold
-- **Sales Patterns:** There appears to be cyclical patterns in M5 sales, likely corresponding to 
-  model generation releases (M5 typically has 7-year generation cycles)
-- **Recent Trends:** The most recent years show {('increasing' if m5_data.iloc[-1]['Sales_Volume'] > m5_data.iloc[-3]['Sales_Volume'] else 'declining')} 
-  sales, which may reflect market saturation or competition from electric vehicles
-- **Consistency:** Despite fluctuations, the M5 maintains strong sales as BMW's performance flagship, 
-  showing sustained demand for high-performance luxury sedans
+- **Peak Performance:** The BMW {model} achieved its highest sales volume in **{stats['Peak_Year']}** 
+  with **{int(stats['Peak_Sales']):,}** units sold
+- **Long-Term Growth:** Sales changed by **{stats['CAGR']:+.2%}** per year on average (CAGR) from 
+  {model_year.columns[0]} to {model_year.columns[-1]}, {growth_place} fastest growth of {len(models)} models
+- **Recent Trends:** Over the last five years sales have been **{stats['Trend']}** 
+  ({stats['Recent_Change']:+.1%} per year), which may reflect model refreshes, market saturation or 
+  competition from electric vehicles
+- **Position in the Lineup:** The {model} ranks **#{stats['Sales_Rank']}** of {len(models)} models by total 
+  sales volume across all years
 """)
 
+with st.expander("📋 Peak Year and Growth for Every Model"):
+    st.dataframe(
+        model_stats.sort_values('Sales_Rank').reset_index(),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Total_Sales': st.column_config.NumberColumn("Total Sales", format="%d"),
+            'Sales_Rank': st.column_config.NumberColumn("Rank"),
+            'Peak_Year': st.column_config.NumberColumn("Peak Year", format="%d"),
+            'Peak_Sales': st.column_config.NumberColumn("Peak Sales", format="%d"),
+            'CAGR': st.column_config.NumberColumn("CAGR", format="percent"),
+            'Recent_Change': st.column_config.NumberColumn("Recent Trend / Year", format="percent"),
+        },
+    )
+
 st.markdown("---")
 
 # Chart 3: Multiple Panel Line Chart - Electric/Hybrid Impact
@@ -140,44 +238,10 @@ the success of this strategy.
 """)
 
 # Prepare data for fuel type trends
-fuel_trends = df.groupby(['Year', 'Fuel_Type']).agg({
-    'Price_USD': 'mean',
-    'Sales_Volume': 'sum'
-}).reset_index()
-
-# Create subplot with two panels
-fig3 = make_subplots(
-    rows=2, cols=1,
-    subplot_titles=('Average Price by Fuel Type Over Time', 
-                    'Total Sales Volume by Fuel Type Over Time'),
-    vertical_spacing=0.12
-)
+fuel_trend_data = fuel_trends(df)
 
-# Add traces for each fuel type - Price
-for fuel in fuel_trends['Fuel_Type'].unique():
-    fuel_df = fuel_trends[fuel_trends['Fuel_Type'] == fuel]
-    fig3.add_trace(
-        go.Scatter(x=fuel_df['Year'], y=fuel_df['Price_USD'], 
-                   name=fuel, mode='lines+markers',
-                   legendgroup=fuel, showlegend=True),
-        row=1, col=1
-    )
-
-# Add traces for each fuel type - Sales
-for fuel in fuel_trends['Fuel_Type'].unique():
-    fuel_df = fuel_trends[fuel_trends['Fuel_Type'] == fuel]
-    fig3.add_trace(
-        go.Scatter(x=fuel_df['Year'], y=fuel_df['Sales_Volume'], 
-                   name=fuel, mode='lines+markers',
-                   legendgroup=fuel, showlegend=False),
-        row=2, col=1
-    )
-
-fig3.update_xaxes(title_text="Year", row=2, col=1)
-fig3.update_yaxes(title_text="Average Price (USD)", row=1, col=1)
-fig3.update_yaxes(title_text="Total Sales Volume", row=2, col=1)
-
-fig3.update_layout(height=800, title_text="Electrification Impact Analysis (2010-2024)")
+# Create subplot with two panels, one trace per fuel type
+fig3 = fuel_trends_chart(fuel_trend_data)
 st.plotly_chart(fig3, use_container_width=True)
 
 # How to read this chart
@@ -220,31 +284,12 @@ whether newer technology holds value better.
 """)
 
 # Calculate age and depreciation proxy
-current_year = 2024
-df['Age'] = current_year - df['Year']
-df['Model_Segment'] = df['Model'].apply(lambda x: 'Performance' if x in ['M3', 'M5', 'i8'] 
-                                          else ('SUV' if x.startswith('X') 
-                                                else 'Sedan'))
+add_model_segments(df)
 
 # Sample FEWER data points for clearer visualization
 scatter_df = df.sample(n=min(1000, len(df)), random_state=42)
 
-fig4 = px.scatter(scatter_df, 
-                  x='Mileage_KM', 
-                  y='Price_USD',
-                  color='Model_Segment',
-                  size='Sales_Volume',
-                  hover_data=['Model', 'Year', 'Fuel_Type'],
-                  title="Mileage vs. Price Across Model Segments",
-                  labels={'Mileage_KM': 'Mileage (KM)', 
-                          'Price_USD': 'Price (USD)',
-                          'Model_Segment': 'Segment'},
-                  trendline="ols",
-                  opacity=0.4,  # Lower opacity
-                  color_discrete_sequence=['#1f77b4', '#ff7f0e', '#2ca02c'])  # Distinct colors
-
-fig4.update_traces(marker=dict(size=8, line=dict(width=0.5, color='white')))  # Add white borders
-fig4.update_layout(height=600)
+fig4 = mileage_price_scatter(scatter_df)
 st.plotly_chart(fig4, use_container_width=True)
 
 # How to read this chart
@@ -258,17 +303,19 @@ with st.expander("📖 How to Read This Chart"):
     - **Slope Comparison:** Steeper downward slopes indicate faster depreciation with mileage
     """)
 
+with st.expander("📐 Mileage–Price Correlation by Group"):
+    corr_by = st.selectbox("Group by", ['Model_Segment', 'Model', 'Region', 'Fuel_Type', 'Year', 'Transmission'],
+                           format_func=lambda c: c.replace('_', ' '), key='eda_corr_by')
+    group_stats = grouped_stats(df, corr_by, 'Mileage_KM', 'Price_USD')
+    st.plotly_chart(group_correlation_chart(group_stats, corr_by), use_container_width=True)
+    st.caption("Correlations, covariances, means and variances of every group come from one pass over "
+               "all records, not a sample.")
+
 # Observations
 st.subheader("🔍 Key Observations")
 
 # Calculate correlation by segment
-correlations = []
-for segment in df['Model_Segment'].unique():
-    seg_df = df[df['Model_Segment'] == segment]
-    corr = seg_df['Mileage_KM'].corr(seg_df['Price_USD'])
-    correlations.append({'Segment': segment, 'Correlation': corr})
-
-corr_df = pd.DataFrame(correlations).sort_values('Correlation')
+corr_df = segment_correlations(df)
 
 st.markdown(f"""
 - **Depreciation Patterns:** All segments show negative correlation between mileage and price, 
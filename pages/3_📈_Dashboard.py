@@ -3,18 +3,44 @@ Dashboard Page - Interactive BMW Sales Dashboard
 """
 
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
 
-# Load data
-@st.cache_data
-def load_data():
-    df = pd.read_csv('assets/BMWdata.csv')
-    return df
+from utils.data import load_catalog, load_shared_data
+from utils.aggregations import (
+    region_sales, fuel_sales, sales_trend, top_models, transmission_fuel_sales
+)
+from utils.charts import (
+    region_sales_chart, fuel_sales_chart, sales_trend_chart,
+    top_models_chart, transmission_fuel_chart, highlight_selected,
+    MAP_METRICS, region_choropleth, region_density_map, dealer_density_map
+)
+from utils.cube import combine_selection
+from utils.dealers import load_dealer_index
+from utils.export import (
+    CHART_FORMATS, DATA_FORMATS, chart_formats, data_download, filter_state_key,
+    get_chart_exporter, image_export_available
+)
+from utils.forecast import load_forecast
+from utils.geo import load_region_geometry, region_map_values
+from utils.planner import load_query_planner
+from utils.rendering import ProgressiveRenderer
+from utils.profiling import Tracer, profiling_enabled
+from utils.snapshots import render_comparison, snapshot_source, version_sidebar
+
+# Opt-in instrumentation (?profile=1 or PORTFOLIO_PROFILE=1)
+tracer = Tracer(enabled=profiling_enabled(), page='dashboard')
 
-df = load_data()
+# Dataset version - the working copy or a pinned snapshot, each with its own cached aggregates
+pinned_version, compare_version, comparing = version_sidebar('dashboard')
+source = tracer.call_cached('snapshot_checkout', snapshot_source, pinned_version)
+
+# Load data - memory-mapped once per process and shared by all sessions
+df = tracer.call_cached('shared_dataset', load_shared_data, source)
+
+# Filter options, slider bounds and dataset totals, computed once when the version was ingested
+catalog = tracer.call_cached('dataset_catalog', load_catalog, source)
+year_bounds = catalog.bounds('Year')
+price_bounds = catalog.bounds('Price_USD')
 
 # Header
 st.title("📈 BMW Sales Dashboard")
@@ -27,72 +53,118 @@ st.sidebar.header("🔍 Filters")
 # Year range filter
 year_range = st.sidebar.slider(
     "Select Year Range",
-    min_value=int(df['Year'].min()),
-    max_value=int(df['Year'].max()),
-    value=(int(df['Year'].min()), int(df['Year'].max()))
+    min_value=year_bounds[0],
+    max_value=year_bounds[1],
+    value=year_bounds
 )
 
 # Model multiselect
 models = st.sidebar.multiselect(
     "Select BMW Models",
-    options=sorted(df['Model'].unique()),
-    default=sorted(df['Model'].unique())
+    options=catalog.domain('Model'),
+    default=catalog.domain('Model')
 )
 
 # Region multiselect
 regions = st.sidebar.multiselect(
     "Select Regions",
-    options=sorted(df['Region'].unique()),
-    default=sorted(df['Region'].unique())
+    options=catalog.domain('Region'),
+    default=catalog.domain('Region')
 )
 
 # Fuel type filter
 fuel_types = st.sidebar.multiselect(
     "Select Fuel Types",
-    options=sorted(df['Fuel_Type'].unique()),
-    default=sorted(df['Fuel_Type'].unique())
+    options=catalog.domain('Fuel_Type'),
+    default=catalog.domain('Fuel_Type')
 )
 
-# Price range filter
+# Price range filter - the step splits the central 90% of prices into about 100 positions
 price_range = st.sidebar.slider(
     "Price Range (USD)",
-    min_value=int(df['Price_USD'].min()),
-    max_value=int(df['Price_USD'].max()),
-    value=(int(df['Price_USD'].min()), int(df['Price_USD'].max())),
-    step=1000
+    min_value=price_bounds[0],
+    max_value=price_bounds[1],
+    value=price_bounds,
+    step=catalog.slider_step('Price_USD')
+)
+
+# Forecast overlay
+show_forecast = st.sidebar.toggle(
+    "🔮 Show sales forecast",
+    value=True,
+    help="Project total sales volume three years ahead with 95% bands, from per-series "
+         "exponential smoothing of every Model × Region × Fuel Type"
 )
 
+# Rendering mode
+progressive = st.sidebar.toggle(
+    "⚡ Progressive rendering",
+    value=True,
+    help="Show KPIs immediately and fill in each chart as soon as its data is ready"
+)
+
+# Linked brushing - chart selections persist here until cleared, because a chart's own
+# selection state resets whenever its figure changes
+brushes = st.session_state.setdefault('dashboard_brushes', {})
+
+if brushes:
+    st.sidebar.markdown("**🖱️ Chart Selections**")
+    for dim, labels in brushes.items():
+        st.sidebar.caption(f"{dim}: {', '.join(str(v) for v in labels)}")
+    if st.sidebar.button("Clear chart selections"):
+        brushes.clear()
+        st.rerun()
+
+sidebar_selection = {
+    'Year': list(range(year_range[0], year_range[1] + 1)),
+    'Model': models,
+    'Region': regions,
+    'Fuel_Type': fuel_types,
+}
+
+# Every query is planned: its row count is estimated from the catalog, then it runs as a row
+# index lookup, a scan of coded columns or a read of the pre-aggregated cube, whichever is
+# cheapest. The cube has no price dimension, so a narrowed price range rules it out.
+full_price_range = price_range == price_bounds
+planner = tracer.call_cached('query_planner', load_query_planner, source)
+queries = planner.run(None if full_price_range else price_range, on_plan=tracer.record_plan)
+
+
+def chart_data(name, by, exclude=None):
+    """Rows or cube cells for a chart, filtered by the sidebar and every other chart's brush"""
+    return queries.chart_data(name, by, combine_selection(sidebar_selection, brushes, exclude))
+
+
 # Apply filters
-filtered_df = df[
-    (df['Year'] >= year_range[0]) & 
-    (df['Year'] <= year_range[1]) &
-    (df['Model'].isin(models)) &
-    (df['Region'].isin(regions)) &
-    (df['Fuel_Type'].isin(fuel_types)) &
-    (df['Price_USD'] >= price_range[0]) &
-    (df['Price_USD'] <= price_range[1])
-]
+with tracer.span('filter'):
+    selection = combine_selection(sidebar_selection, brushes)
+    filtered_df = queries.rows('filter', selection)
 
 # Show active filters count
 st.sidebar.markdown("---")
-st.sidebar.metric("Filtered Records", f"{len(filtered_df):,} / {len(df):,}")
+st.sidebar.metric("Filtered Records", f"{len(filtered_df):,} / {catalog.rows:,}")
+if planner.cube.dropped:
+    st.sidebar.caption(f"⚠️ {planner.cube.dropped:,} records missing a Year, Model, Region, Fuel Type "
+                       "or Transmission label are left out of chart totals served from the cube.")
 
 # KPI Section
 st.subheader("📊 Key Performance Indicators")
 
+with tracer.span('kpis'):
+    kpis = queries.kpis('kpis', selection, filtered_df)
+
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    total_sales = filtered_df['Sales_Volume'].sum()
     st.metric(
         "Total Sales Volume",
-        f"{total_sales:,.0f}",
-        delta=f"{(total_sales/df['Sales_Volume'].sum()*100):.1f}% of total"
+        f"{kpis['total_sales']:,.0f}",
+        delta=f"{(kpis['total_sales']/kpis['overall_sales']*100):.1f}% of total"
     )
 
 with col2:
-    avg_price = filtered_df['Price_USD'].mean()
-    overall_avg = df['Price_USD'].mean()
+    avg_price = kpis['avg_price']
+    overall_avg = kpis['overall_avg_price']
     st.metric(
         "Average Price",
         f"${avg_price:,.0f}",
@@ -100,117 +172,255 @@ with col2:
     )
 
 with col3:
-    median_mileage = filtered_df['Mileage_KM'].median()
     st.metric(
         "Median Mileage",
-        f"{median_mileage:,.0f} KM"
+        f"{kpis['median_mileage']:,.0f} KM"
     )
 
 with col4:
-    unique_models = filtered_df['Model'].nunique()
     st.metric(
         "Active Models",
-        f"{unique_models}"
+        f"{kpis['unique_models']}"
     )
 
 st.markdown("---")
 
-# Visualizations
+# Differences against another dataset version, under the same filters
+if comparing:
+    with tracer.span('version_comparison'):
+        render_comparison(pinned_version, compare_version, selection)
+    st.markdown("---")
+
+if not brushes:
+    st.caption("🖱️ Click bars or box-select years in the charts below to filter the other charts.")
+
+# Forecasts extend the trend line only when the selected years reach the end of the data.
+# They are fit on every price, so a narrowed price range would put them on another scale.
+forecast = None
+if show_forecast and year_range[1] == year_bounds[1] and full_price_range:
+    forecast = tracer.call_cached('sales_forecast', load_forecast, source)
+elif show_forecast:
+    st.caption("🔮 The sales forecast is shown only when the year range reaches "
+               f"{year_bounds[1]} and the price range covers all prices.")
+
+
+def trend_chart(data):
+    bands = None
+    if forecast is not None:
+        bands = forecast.total(combine_selection(sidebar_selection, brushes, exclude='Year'))
+    return sales_trend_chart(data, bands)
+
+
+# Visualizations - each chart gets a placeholder and fills in when its aggregation finishes
+renderer = ProgressiveRenderer(enabled=progressive)
+
+# Finished figures by chart name, and the options besides the filters that shape each one,
+# for the export section
+figures = {}
+chart_options = {'sales_trend': (forecast is not None,)}
+
+
+def chart_block(name, by, aggregate, build, brush=None, axis=None):
+    """Worker-thread computation for one chart: its aggregation, then its figure.
+
+    A brushable chart ignores its own brush and highlights the selected labels instead.
+    """
+    def compute():
+        with tracer.span(f'groupby_{name}'):
+            data = aggregate(chart_data(name, by, exclude=brush))
+        with tracer.span(f'figure_{name}'):
+            fig = build(data)
+            if brush in brushes:
+                highlight_selected(fig, brushes[brush], axis)
+            figures[name] = fig
+            return fig
+    return compute
+
+
+def update_brush(dim, axis):
+    """on_select callback: store the labels picked in a chart as that dimension's brush"""
+    points = st.session_state[f'brush_{dim}']['selection']['points']
+    picked = {int(p[axis]) if dim == 'Year' else p[axis] for p in points}
+    # Ignore points outside the data, e.g. forecast years on the trend line
+    labels = sorted(picked & set(catalog.domain(dim)))
+    if labels:
+        brushes[dim] = labels
+    else:
+        brushes.pop(dim, None)
+
+
+def show_chart(name, brush=None, axis=None):
+    def render(fig):
+        with tracer.span(f'plotly_chart_{name}'):
+            if brush is None:
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.plotly_chart(fig, use_container_width=True, key=f'brush_{brush}',
+                                on_select=lambda: update_brush(brush, axis),
+                                selection_mode=('points', 'box'))
+    return render
+
+
+def brushable_chart(target, name, by, aggregate, build, axis):
+    renderer.add(target, chart_block(name, by, aggregate, build, brush=by[0], axis=axis),
+                 show_chart(name, brush=by[0], axis=axis))
+
+
 col1, col2 = st.columns(2)
 
-with col1:
-    # Sales by Region
-    region_sales = filtered_df.groupby('Region')['Sales_Volume'].sum().reset_index()
-    region_sales = region_sales.sort_values('Sales_Volume', ascending=True)
-    
-    fig1 = px.bar(region_sales, 
-                  y='Region', 
-                  x='Sales_Volume',
-                  title="Sales Volume by Region",
-                  labels={'Sales_Volume': 'Total Sales', 'Region': 'Region'},
-                  orientation='h',
-                  color='Sales_Volume',
-                  color_continuous_scale='Blues')
-    
-    fig1.update_layout(height=400, showlegend=False)
-    st.plotly_chart(fig1, use_container_width=True)
+# Sales by Region
+brushable_chart(col1, 'region_sales', ['Region'], region_sales, region_sales_chart, axis='y')
+
+# Sales by Fuel Type
+brushable_chart(col2, 'fuel_sales', ['Fuel_Type'], fuel_sales, fuel_sales_chart, axis='y')
+
+# Regional map - the geometry is a static file the browser caches, so filter changes only
+# send the per-region values
+st.markdown("---")
+map_col1, map_col2 = st.columns(2)
+
+with map_col1:
+    map_type = st.radio("Map type", ["Choropleth", "Density"], horizontal=True)
+
+with map_col2:
+    map_metric = st.radio("Map metric", list(MAP_METRICS), horizontal=True,
+                          format_func=MAP_METRICS.get)
+
+geometry = tracer.call_cached('region_geometry', load_region_geometry)
+geojson = geometry.trace_geojson()
+map_metrics, map_points = tracer.call_cached(
+    'region_map_values', region_map_values, source, selection,
+    None if full_price_range else price_range)
 
-with col2:
-    # Sales by Fuel Type
-    fuel_sales = filtered_df.groupby('Fuel_Type')['Sales_Volume'].sum().reset_index()
-    
-    fig2 = px.pie(fuel_sales, 
-                  values='Sales_Volume', 
-                  names='Fuel_Type',
-                  title="Sales Distribution by Fuel Type",
-                  color_discrete_sequence=px.colors.qualitative.Set3)
-    
-    fig2.update_layout(height=400)
-    st.plotly_chart(fig2, use_container_width=True)
+
+def region_map():
+    with tracer.span('figure_region_map'):
+        if map_type == "Choropleth":
+            fig = region_choropleth(map_metrics, geojson, map_metric)
+        else:
+            fig = region_density_map(map_metrics, geometry.centroids, map_metric, map_points)
+        figures['region_map'] = fig
+        return fig
+
+
+chart_options['region_map'] = (map_type, map_metric)
+
+
+renderer.add(st, region_map, show_chart('region_map'))
+
+# Dealership density - each dealer is credited with a share of its region's filtered sales,
+# and the spatial index reads only the dealers inside the focused area
+dealer_index = tracer.call_cached('dealer_index', load_dealer_index)
+
+if dealer_index is not None:
+    st.markdown("---")
+    st.subheader("🏬 Dealership Density")
+
+    dealer_col1, dealer_col2, dealer_col3 = st.columns([2, 1, 1])
+
+    with dealer_col1:
+        focus = st.selectbox("Focus area", ["World"] + sorted(geometry.bounds))
+
+    bounds = (-90.0, 90.0, -180.0, 180.0) if focus == "World" else geometry.bounds[focus]
+    center = geometry.centroids.set_index('Region').loc[focus] if focus != "World" else None
+
+    with dealer_col2:
+        near_lat = st.number_input("Latitude", -90.0, 90.0,
+                                   float(center['lat']) if center is not None else 48.14, step=0.5)
+
+    with dealer_col3:
+        near_lon = st.number_input("Longitude", -180.0, 180.0,
+                                   float(center['lon']) if center is not None else 11.58, step=0.5)
+
+    with tracer.span('dealer_density'):
+        dealer_sales = dealer_index.point_weights(map_metrics.set_index('Region')['Sales_Volume'])
+        dealer_cells = dealer_index.density(bounds, dealer_sales)
+        nearest = dealer_index.nearest(near_lat, near_lon, k=5)
+
+    def dealer_map():
+        figures['dealer_density'] = dealer_density_map(dealer_cells, bounds)
+        return figures['dealer_density']
+
+    chart_options['dealer_density'] = (focus,)
+    renderer.add(st, dealer_map, show_chart('dealer_density'))
+
+    st.caption(f"{int(dealer_cells['Dealers'].sum()):,} of {len(dealer_index):,} dealers in view")
+    st.markdown("**📍 Nearest Dealers**")
+    st.dataframe(
+        nearest.assign(Credited_Sales=dealer_sales[nearest['_index']].round())[
+            ['Name', 'Region', 'Latitude', 'Longitude', 'Distance_KM', 'Credited_Sales']],
+        hide_index=True,
+        use_container_width=True,
+        column_config={'Distance_KM': st.column_config.NumberColumn("Distance (KM)", format="%.1f"),
+                       'Credited_Sales': st.column_config.NumberColumn("Credited Sales", format="%d")},
+    )
 
 # Full-width visualizations
 st.markdown("---")
 
 # Sales trend over time
-sales_trend = filtered_df.groupby('Year').agg({
-    'Sales_Volume': 'sum',
-    'Price_USD': 'mean'
-}).reset_index()
-
-fig3 = go.Figure()
-
-fig3.add_trace(go.Scatter(
-    x=sales_trend['Year'],
-    y=sales_trend['Sales_Volume'],
-    mode='lines+markers',
-    name='Sales Volume',
-    line=dict(color='#1f77b4', width=3),
-    marker=dict(size=8)
-))
-
-fig3.update_layout(
-    title="Sales Volume Trend Over Time",
-    xaxis_title="Year",
-    yaxis_title="Total Sales Volume",
-    height=400,
-    hovermode='x unified'
-)
-
-st.plotly_chart(fig3, use_container_width=True)
+brushable_chart(st, 'sales_trend', ['Year'], sales_trend, trend_chart, axis='x')
 
 # Model performance comparison
 st.markdown("---")
 col1, col2 = st.columns(2)
 
-with col1:
-    # Top models by sales
-    model_sales = filtered_df.groupby('Model')['Sales_Volume'].sum().reset_index()
-    model_sales = model_sales.sort_values('Sales_Volume', ascending=False).head(10)
-    
-    fig4 = px.bar(model_sales,
-                  x='Sales_Volume',
-                  y='Model',
-                  title="Top 10 Models by Sales Volume",
-                  orientation='h',
-                  color='Sales_Volume',
-                  color_continuous_scale='Viridis')
-    
-    fig4.update_layout(height=500, showlegend=False)
-    st.plotly_chart(fig4, use_container_width=True)
+# Top models by sales
+brushable_chart(col1, 'top_models', ['Model'], top_models, top_models_chart, axis='y')
 
-with col2:
-    # Transmission distribution
-    trans_data = filtered_df.groupby(['Transmission', 'Fuel_Type'])['Sales_Volume'].sum().reset_index()
-    
-    fig5 = px.sunburst(trans_data,
-                       path=['Transmission', 'Fuel_Type'],
-                       values='Sales_Volume',
-                       title="Sales by Transmission & Fuel Type",
-                       color='Sales_Volume',
-                       color_continuous_scale='RdYlBu_r')
-    
-    fig5.update_layout(height=500)
-    st.plotly_chart(fig5, use_container_width=True)
+# Transmission distribution - filtered by every brush
+renderer.add(col2, chart_block('transmission_fuel', ['Transmission', 'Fuel_Type'],
+                               transmission_fuel_sales, transmission_fuel_chart),
+             show_chart('transmission_fuel'))
+
+# Export - files are produced only when a download button is clicked, on Streamlit's download
+# thread: data streams through a chunked compressor, and chart files come from a shared
+# render pool that caches them by filter state
+st.markdown("---")
+st.subheader("⬇️ Export")
+
+export_titles = {
+    'region_sales': "Sales by Region",
+    'fuel_sales': "Sales by Fuel Type",
+    'region_map': "Regional Map",
+    'dealer_density': "Dealership Density",
+    'sales_trend': "Sales Trend",
+    'top_models': "Top Models",
+    'transmission_fuel': "Transmission by Fuel Type",
+}
+export_titles = {name: title for name, title in export_titles.items()
+                 if name != 'dealer_density' or dealer_index is not None}
+
+export_col1, export_col2 = st.columns(2)
+
+with export_col1:
+    st.markdown("**Filtered Records**")
+    data_format = st.radio("Data format", list(DATA_FORMATS), horizontal=True,
+                           format_func=lambda f: DATA_FORMATS[f]['label'])
+    st.download_button(
+        f"⬇️ Download {len(filtered_df):,} records",
+        data_download(filtered_df, data_format),
+        file_name=f"bmw_sales_filtered{DATA_FORMATS[data_format]['extension']}",
+        mime=DATA_FORMATS[data_format]['mime'],
+        on_click='ignore',
+    )
+
+with export_col2:
+    st.markdown("**Charts**")
+    export_chart = st.selectbox("Chart", list(export_titles), format_func=export_titles.get)
+    chart_format = st.radio("Chart format", chart_formats(), horizontal=True,
+                            format_func=lambda f: CHART_FORMATS[f]['label'])
+    export_key = filter_state_key(source, selection, None if full_price_range else price_range,
+                                  export_chart, *chart_options.get(export_chart, ()))
+    st.download_button(
+        "⬇️ Download chart",
+        get_chart_exporter().download(export_key, lambda: figures[export_chart], chart_format),
+        file_name=f"{export_chart}.{chart_format}",
+        mime=CHART_FORMATS[chart_format]['mime'],
+        on_click='ignore',
+    )
+    if not image_export_available():
+        st.caption("Install `kaleido` to export charts as PNG or SVG images.")
 
 # Insights section
 st.markdown("---")
@@ -268,7 +478,7 @@ st.markdown("""
 **🔄 Last Refreshed:** {}
 
 **📊 Total Records:** {:,}
-""".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), len(df)))
+""".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), catalog.rows))
 
 # Footer
 st.markdown("---")
@@ -276,4 +486,10 @@ st.markdown("""
 <div style='text-align: center; color: #666; padding: 1rem 0;'>
     <p>Interactive Dashboard | Built with Streamlit & Plotly | © 2025 Zakaria Iraqi</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Fill in chart placeholders as their computations complete
+renderer.drain()
+
+# Per-rerun performance panel (only when profiling is enabled)
+tracer.render_panel()
\ No newline at end of file
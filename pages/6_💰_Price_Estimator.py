@@ -0,0 +1,149 @@
+"""
+Price Estimator - Predict BMW prices and explore what-if scenarios
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from utils.data import load_catalog
+from utils.pricing import load_price_model
+
+# Slider bounds from the dataset catalog, and the persisted price model (trained once per dataset version)
+catalog = load_catalog()
+
+with st.spinner("Loading price model..."):
+    model = load_price_model()
+
+categories = model.spec['categories']
+
+# Header
+st.title("💰 BMW Price Estimator")
+st.markdown("""
+Estimate a vehicle's price from its model, year, mileage, fuel type and other attributes, then
+sweep any attribute to see how the predicted price responds. This implements Future Work
+item 1 (price prediction model).
+""")
+st.markdown("---")
+
+# Section 1: Single estimate
+st.header("1. 🔎 Estimate a Vehicle's Price")
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    vehicle_model = st.selectbox("Model", categories['Model'])
+    region = st.selectbox("Region", categories['Region'])
+
+with col2:
+    fuel_type = st.selectbox("Fuel Type", categories['Fuel_Type'])
+    transmission = st.selectbox("Transmission", categories['Transmission'])
+
+with col3:
+    color = st.selectbox("Color", categories['Color'])
+    year_bounds = catalog.bounds('Year')
+    year = st.slider("Year", *year_bounds, year_bounds[1])
+
+with col4:
+    engine_size = st.slider("Engine Size (L)", *map(float, catalog.bounds('Engine_Size_L')), 3.0,
+                            step=catalog.slider_step('Engine_Size_L'))
+    mileage = st.slider("Mileage (KM)", 0, 200_000, 50_000, step=catalog.slider_step('Mileage_KM'))
+
+vehicle = dict(Model=vehicle_model, Region=region, Color=color, Fuel_Type=fuel_type,
+               Transmission=transmission, Year=year, Engine_Size_L=engine_size)
+
+estimate = float(model.predict(Mileage_KM=mileage, **vehicle))
+st.metric("Estimated Price", f"${estimate:,.0f}",
+          delta=f"±${model.metrics['mae']:,.0f} typical error", delta_color="off")
+
+st.markdown("---")
+
+# Section 2: What-if sweep
+st.header("2. 📉 What-If: Price vs. Mileage for Every Model")
+
+st.markdown("""
+**Question:** How does predicted price fall with mileage, and which models hold their value best?
+
+All other attributes are held at the values chosen above. Every point on every line is predicted in
+a single vectorized batch.
+""")
+
+steps = st.select_slider("Mileage points per model", options=[100, 500, 1_000, 5_000, 10_000],
+                         value=1_000)
+
+mileage_grid = np.linspace(0, 200_000, steps)
+models = np.array(categories['Model'])
+
+start = time.perf_counter()
+grid = model.predict(Mileage_KM=mileage_grid[None, :], **dict(vehicle, Model=models[:, None]))
+elapsed_ms = (time.perf_counter() - start) * 1000
+
+sweep_df = pd.DataFrame({
+    'Model': np.repeat(models, steps),
+    'Mileage_KM': np.tile(mileage_grid, len(models)),
+    'Predicted_Price': grid.ravel(),
+})
+
+fig = px.line(sweep_df,
+              x='Mileage_KM',
+              y='Predicted_Price',
+              color='Model',
+              title="Predicted Price vs. Mileage by Model",
+              labels={'Mileage_KM': 'Mileage (KM)', 'Predicted_Price': 'Predicted Price (USD)'})
+fig.update_layout(height=550, hovermode='x unified')
+st.plotly_chart(fig, use_container_width=True)
+
+st.caption(f"Predicted {grid.size:,} prices ({len(models)} models × {steps:,} mileages) "
+           f"in {elapsed_ms:.1f} ms")
+
+with st.expander("📖 How to Read This Chart"):
+    st.markdown("""
+    - **X-axis:** Vehicle mileage from 0 to 200,000 KM
+    - **Y-axis:** Predicted price in USD, holding every other attribute at the values chosen above
+    - **Lines:** One line per BMW model; higher lines are models predicted to be worth more
+    - **Slope:** Steeper downward slopes indicate faster depreciation with mileage
+    """)
+
+st.markdown("---")
+
+# Section 3: Model quality
+st.header("3. 🧪 Model Quality")
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.metric("Holdout R²", f"{model.metrics['r2']:.3f}")
+
+with col2:
+    st.metric("Mean Absolute Error", f"${model.metrics['mae']:,.0f}")
+
+with col3:
+    st.metric("RMSE", f"${model.metrics['rmse']:,.0f}")
+
+st.markdown(f"""
+- **Method:** Ridge regression on one-hot model, region, color, fuel type and transmission, plus
+  standardized year, engine size and mileage with piecewise mileage terms
+- **Validation:** Trained on {model.metrics['train_rows']:,} records and scored on
+  {model.metrics['holdout_rows']:,} held-out records
+- **Interpretation:** An R² near zero means the listed attributes explain little of the price variation
+  in this dataset, so estimates cluster around the overall average. Treat them as a baseline rather
+  than a valuation
+""")
+
+# Data Ethics Note
+st.info("""
+**📌 Limitations:** Predictions reflect historical patterns in this dataset only. They do not account
+for vehicle condition, options, local market conditions or economic factors, and should not be used as
+a substitute for a professional appraisal.
+""")
+
+# Footer
+st.markdown("---")
+st.markdown("""
+<div style='text-align: center; color: #666; padding: 1rem 0;'>
+    <p>Price Estimator | Built with Streamlit, NumPy & Plotly | © 2025 Zakaria Iraqi</p>
+</div>
+""", unsafe_allow_html=True)
@@ -0,0 +1,175 @@
+"""
+Pricing Simulator - Project sales volume and revenue under what-if price changes
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.elasticity import load_elasticities, simulate
+
+# Segment elasticities (estimated once per dataset version)
+with st.spinner("Estimating price elasticities..."):
+    segments = load_elasticities()
+
+models = sorted(segments['Model'].unique())
+
+# Header
+st.title("🎯 BMW Pricing Simulator")
+st.markdown("""
+Change prices across the lineup, or for individual models, and see the projected effect on sales
+volume and revenue for every model and region. Each segment responds according to its own estimated
+price elasticity.
+""")
+st.markdown("---")
+
+# Section 1: Scenario
+st.header("1. 🎛️ Define a Price Scenario")
+
+col1, col2 = st.columns([1, 2])
+
+with col1:
+    global_change = st.slider("Price change for all models (%)", -30, 30, 0, step=1)
+    st.caption("Per-model adjustments are added on top of the global change.")
+
+with col2:
+    adjustments = st.data_editor(
+        pd.DataFrame({'Model': models, 'Adjustment (%)': 0.0}),
+        column_config={
+            'Model': st.column_config.TextColumn(disabled=True),
+            'Adjustment (%)': st.column_config.NumberColumn(min_value=-30.0, max_value=30.0, step=1.0),
+        },
+        hide_index=True,
+        use_container_width=True,
+        height=250,
+        key='pricing_adjustments',
+    )
+
+per_model = adjustments.set_index('Model')['Adjustment (%)'].fillna(0)
+changes = (global_change + segments['Model'].map(per_model).fillna(0).to_numpy()) / 100
+changes = np.maximum(changes, -0.99)
+
+start = time.perf_counter()
+volume, revenue = simulate(segments, changes)
+elapsed_ms = (time.perf_counter() - start) * 1000
+
+base_volume = segments['Base_Volume'].sum()
+base_revenue = segments['Base_Revenue'].sum()
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    st.metric("Projected Sales Volume", f"{volume.sum():,.0f}",
+              delta=f"{(volume.sum() / base_volume - 1) * 100:+.2f}%")
+
+with col2:
+    st.metric("Projected Revenue", f"${revenue.sum() / 1e9:,.2f}B",
+              delta=f"{(revenue.sum() / base_revenue - 1) * 100:+.2f}%")
+
+with col3:
+    st.metric("Average Elasticity", f"{np.average(segments['Elasticity'], weights=segments['Base_Volume']):+.3f}")
+
+st.markdown("---")
+
+# Section 2: Impact by segment
+st.header("2. 🗺️ Revenue Impact by Model and Region")
+
+impact = segments[['Model', 'Region']].assign(Revenue_Change=(revenue - segments['Base_Revenue']) / 1e6)
+impact_matrix = impact.pivot(index='Model', columns='Region', values='Revenue_Change')
+
+fig = px.imshow(impact_matrix,
+                labels=dict(x="Region", y="Model", color="Revenue Change ($M)"),
+                title="Projected Revenue Change by Segment ($M)",
+                color_continuous_scale='RdBu',
+                color_continuous_midpoint=0,
+                aspect='auto',
+                text_auto='.1f')
+fig.update_layout(height=550)
+st.plotly_chart(fig, use_container_width=True)
+
+st.caption(f"Evaluated {len(segments)} segments in {elapsed_ms:.2f} ms")
+
+with st.expander("📖 How to Read This Chart"):
+    st.markdown("""
+    - **Cells:** One Model × Region segment
+    - **Color:** Blue cells gain revenue under the scenario, red cells lose revenue
+    - **Values:** Projected change in revenue versus the historical baseline, in millions of USD
+    """)
+
+st.markdown("---")
+
+# Section 3: Revenue curve
+st.header("3. 📈 Revenue Response to a Uniform Price Change")
+
+st.markdown("""
+**Question:** Across the whole lineup, which uniform price change maximizes projected revenue?
+
+Every scenario from −30% to +30% is evaluated for every segment in a single vectorized batch.
+""")
+
+sweep = np.linspace(-0.30, 0.30, 61)
+start = time.perf_counter()
+sweep_volume, sweep_revenue = simulate(segments, sweep[:, None])
+sweep_ms = (time.perf_counter() - start) * 1000
+
+total_revenue = sweep_revenue.sum(axis=1) / 1e9
+best = int(total_revenue.argmax())
+
+fig = go.Figure()
+fig.add_trace(go.Scatter(x=sweep * 100, y=total_revenue, mode='lines', name='Projected Revenue',
+                         line=dict(color='#1c69d4', width=3)))
+fig.add_trace(go.Scatter(x=[sweep[best] * 100], y=[total_revenue[best]], mode='markers',
+                         name='Maximum', marker=dict(color='#e63946', size=12)))
+fig.add_hline(y=base_revenue / 1e9, line_dash='dash', line_color='gray',
+              annotation_text='Baseline')
+fig.update_layout(title="Projected Total Revenue vs. Uniform Price Change",
+                  xaxis_title="Price Change (%)",
+                  yaxis_title="Revenue (USD, billions)",
+                  height=450,
+                  hovermode='x unified')
+st.plotly_chart(fig, use_container_width=True)
+
+st.caption(f"Evaluated {sweep_revenue.size:,} projections ({len(sweep)} scenarios × "
+           f"{len(segments)} segments) in {sweep_ms:.2f} ms")
+
+with st.expander("📖 How to Read This Chart"):
+    st.markdown("""
+    - **X-axis:** Price change applied to every model and region
+    - **Y-axis:** Projected total revenue across all segments
+    - **Red marker:** The price change with the highest projected revenue in the range shown
+    - **Dashed line:** Historical revenue with no price change
+    """)
+
+st.markdown("---")
+
+# Section 4: Method
+st.header("4. 🧪 Method")
+
+st.markdown(f"""
+- **Demand model:** Constant elasticity per segment, so volume scales with (1 + price change) raised
+  to the segment's elasticity
+- **Estimation:** Log-log regression of sales volume on price within each of the {len(segments)}
+  Model × Region segments, computed from per-segment sums in one pass over the data
+- **Shrinkage:** Segments with few records are pulled toward the elasticity pooled across all segments
+- **Interpretation:** Elasticities near zero mean volume barely responds to price in this dataset, so
+  revenue moves almost one-for-one with the price change
+""")
+
+# Data Ethics Note
+st.info("""
+**📌 Limitations:** Elasticities are observational estimates from historical records, not the result of
+controlled price experiments. They ignore competitor responses, substitution between models and
+regions, and supply constraints. Use the projections to compare scenarios, not as sales forecasts.
+""")
+
+# Footer
+st.markdown("---")
+st.markdown("""
+<div style='text-align: center; color: #666; padding: 1rem 0;'>
+    <p>Pricing Simulator | Built with Streamlit, NumPy & Plotly | © 2025 Zakaria Iraqi</p>
+</div>
+""", unsafe_allow_html=True)
@@ -0,0 +1,152 @@
+"""
+Trend Alerts - Significant changes in sales series detected by the background alert job
+"""
+
+import pandas as pd
+import plotly.graph_objects as go
+import streamlit as st
+
+from utils.alerts import DRIFT, SERIES_DIMENSIONS, THRESHOLD, WARMUP_RECORDS, AlertEngine, load_alerts
+from utils.data import load_shared_data
+
+# Header
+st.title("🔔 Trend Change Alerts")
+st.markdown("""
+A background job watches every Model × Region × Fuel Type sales series and raises an alert when a
+series shifts to a new level. Each run reads only the records added since the previous run. This
+implements the Future Work notification system for significant trend changes.
+""")
+st.markdown("---")
+
+alerts, status = load_alerts()
+
+# Section 1: Engine status
+st.header("1. 🛰️ Alert Job Status")
+
+if st.button("🔄 Check for new records now"):
+    with st.spinner("Processing new records..."):
+        processed, new_alerts = AlertEngine().run()
+    load_alerts.clear()
+    st.success(f"Processed {processed:,} new records and raised {len(new_alerts)} new alerts.")
+    alerts, status = load_alerts()
+
+if status is None:
+    st.info("""
+    The alert job has not run yet. Start it from the repository root, for example every five minutes:
+
+    `python -m utils.alerts --interval 300`
+
+    or use the button above to process the dataset once.
+    """)
+    st.stop()
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("Records Processed", f"{status['rows']:,}")
+
+with col2:
+    st.metric("Series Monitored", f"{status['series']:,}")
+
+with col3:
+    st.metric("Alerts Raised", f"{len(alerts):,}")
+
+with col4:
+    st.metric("Last Run (UTC)", status['last_run'][:16].replace('T', ' '))
+
+st.markdown("---")
+
+# Section 2: Alert log
+st.header("2. 📋 Alert Log")
+
+if alerts.empty:
+    st.success("No significant trend changes detected so far.")
+    st.stop()
+
+col1, col2 = st.columns(2)
+
+with col1:
+    directions = st.multiselect("Direction", ['increase', 'decrease'], default=['increase', 'decrease'])
+
+with col2:
+    alert_models = st.multiselect("Models", sorted(alerts['Model'].unique()),
+                                  default=sorted(alerts['Model'].unique()))
+
+shown = alerts[alerts['direction'].isin(directions) & alerts['Model'].isin(alert_models)]
+st.dataframe(
+    shown.sort_values('row', ascending=False).rename(columns={
+        'detected_at': 'Detected', 'direction': 'Direction', 'row': 'Record',
+        'year': 'Year', 'previous_mean': 'Previous Mean Sales', 'records_in_regime': 'Records Before',
+    }),
+    hide_index=True,
+    use_container_width=True,
+)
+
+st.markdown("---")
+
+# Section 3: Series detail
+st.header("3. 🔍 Inspect an Alerted Series")
+
+series_labels = (alerts[SERIES_DIMENSIONS].drop_duplicates()
+                 .apply(lambda r: ' / '.join(r), axis=1).tolist())
+choice = st.selectbox("Series", series_labels)
+keys = dict(zip(SERIES_DIMENSIONS, choice.split(' / ')))
+
+df = load_shared_data()
+mask = pd.Series(True, index=df.index)
+for dim, value in keys.items():
+    mask &= df[dim] == value
+series = df.loc[mask, 'Sales_Volume'].reset_index()
+series_alerts = alerts[(alerts[SERIES_DIMENSIONS] == pd.Series(keys)).all(axis=1)]
+
+fig = go.Figure()
+fig.add_trace(go.Scatter(x=series['index'], y=series['Sales_Volume'], mode='markers', name='Record',
+                         marker=dict(color='#9bb7e0', size=5)))
+fig.add_trace(go.Scatter(x=series['index'], y=series['Sales_Volume'].rolling(WARMUP_RECORDS, min_periods=1).mean(),
+                         mode='lines', name=f'{WARMUP_RECORDS}-record mean',
+                         line=dict(color='#1c69d4', width=3)))
+for alert in series_alerts.itertuples():
+    fig.add_vline(x=alert.row, line_dash='dash',
+                  line_color='#2a9d8f' if alert.direction == 'increase' else '#e63946')
+fig.update_layout(title=f"Sales Volume per Record: {choice}",
+                  xaxis_title="Record (ingestion order)",
+                  yaxis_title="Sales Volume",
+                  height=450)
+st.plotly_chart(fig, use_container_width=True)
+
+with st.expander("📖 How to Read This Chart"):
+    st.markdown("""
+    - **X-axis:** Position of each record in the dataset, in the order records were ingested
+    - **Dots:** Sales volume of individual records in this series
+    - **Line:** Rolling mean of recent records, showing the series' level
+    - **Dashed lines:** Alerts; green marks a shift up and red a shift down
+    """)
+
+st.markdown("---")
+
+# Section 4: Method
+st.header("4. 🧪 Method")
+
+st.markdown(f"""
+- **Detector:** Two-sided CUSUM on each record's sales volume, standardized by the running mean and
+  standard deviation of its series since the last alert
+- **Sensitivity:** Drift allowance of {DRIFT} and alert threshold of {THRESHOLD} standard deviations;
+  a series needs {WARMUP_RECORDS} records before it is scored
+- **Restart:** After an alert the series' statistics restart, so the detector learns the new level
+- **Incremental:** The job stores each series' statistics and the position already read in the file,
+  and parses only appended records on its next run
+""")
+
+st.info("""
+**📌 Limitations:** Alerts describe statistical shifts in the order records were ingested, not
+calendar trends, and a few alerts are expected by chance across hundreds of series. Confirm an alert
+against the Dashboard before acting on it.
+""")
+
+# Footer
+st.markdown("---")
+st.markdown("""
+<div style='text-align: center; color: #666; padding: 1rem 0;'>
+    <p>Trend Alerts | Built with Streamlit, NumPy & Plotly | © 2025 Zakaria Iraqi</p>
+</div>
+""", unsafe_allow_html=True)
@@ -0,0 +1,179 @@
+"""
+Route Planner - Multi-vehicle delivery routes to dealers, sized by sales concentrations
+"""
+
+import pandas as pd
+import streamlit as st
+
+from utils.charts import delivery_route_map
+from utils.cube import load_shared_cube
+from utils.dealers import load_dealer_index
+from utils.routing import OR_OPT_LENGTH, ROAD_FACTOR, SAVINGS_NEIGHBOURS, delivery_plan
+
+# Header
+st.title("🚚 Delivery Route Planner")
+st.markdown("""
+Plan how a wave of new vehicles reaches the dealers of a region. Each dealer receives vehicles in
+proportion to its share of the region's sales for the selected years and models, and a fleet of
+transporters leaves a regional depot on routes that respect their capacity while keeping the total
+distance short. This implements the Future Work route optimization for delivery logistics.
+""")
+st.markdown("---")
+
+index = load_dealer_index()
+if index is None:
+    st.warning("""
+    No dealer location file was found. Add `assets/dealerships.csv` (or set `PORTFOLIO_DEALERS_PATH`),
+    or generate one with `python -m utils.dealers --rows 2000 --output assets/dealerships.csv`.
+    """)
+    st.stop()
+
+cube = load_shared_cube()
+years = sorted(int(y) for y in cube.labels['Year'])
+models = sorted(cube.labels['Model'])
+
+# Section 1: Scenario
+st.header("1. 🎛️ Delivery Scenario")
+
+col1, col2, col3 = st.columns(3)
+
+with col1:
+    region = st.selectbox("Region", list(index.regions))
+    year_range = st.select_slider("Sales years", options=years, value=(years[-3], years[-1]))
+
+with col2:
+    selected_models = st.multiselect("Models", models, default=models)
+    vehicles = st.number_input("Vehicles to deliver", 100, 100_000, 2_000, step=100)
+
+with col3:
+    max_stops = st.slider("Dealers served (largest first)", 20, 5000, 300, step=20)
+    capacity = st.slider("Transporter capacity (vehicles)", 8, 120, 40, step=4)
+
+time_budget = st.slider("Optimization time budget (seconds)", 0.5, 10.0, 3.0, step=0.5)
+
+selection = {
+    'Year': [y for y in years if year_range[0] <= y <= year_range[1]],
+    'Model': selected_models or None,
+}
+
+with st.spinner("Optimizing routes..."):
+    plan = delivery_plan(region, selection, int(vehicles), max_stops, capacity, time_budget)
+
+if plan is None:
+    st.warning("No dealer in this region has sales for the selected years and models.")
+    st.stop()
+
+depot, stops, summary, stats = plan
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    st.metric("Dealers Served", f"{stats['stops']:,}")
+
+with col2:
+    st.metric("Transporter Routes", f"{stats['vehicles']:,}")
+
+with col3:
+    st.metric("Total Distance", f"{stats['total_km']:,.0f} km",
+              delta=f"{(stats['total_km'] / stats['savings_km'] - 1) * 100:+.2f}% vs. savings",
+              delta_color='inverse')
+
+with col4:
+    st.metric("Solve Time", f"{stats['seconds']:.2f} s")
+
+if not stats['converged']:
+    st.caption("The time budget ran out before local search converged; a larger budget may shorten the routes.")
+
+st.markdown("---")
+
+# Section 2: Map
+st.header("2. 🗺️ Route Map")
+
+st.plotly_chart(delivery_route_map(depot, stops, summary), use_container_width=True)
+
+with st.expander("📖 How to Read This Chart"):
+    st.markdown("""
+    - **Black marker:** Regional depot, placed at the dealer closest to the demand-weighted center
+    - **Colored lines:** One transporter route each, leaving the depot and returning to it
+    - **Markers on a line:** Dealers served by that route; hover for the dealer and its delivery
+    - **Straight segments:** Lines join stops directly; distances approximate road travel
+    """)
+
+st.markdown("---")
+
+# Section 3: Route details
+st.header("3. 📋 Route Details")
+
+col1, col2 = st.columns([1, 1])
+
+with col1:
+    st.markdown("**Routes**")
+    st.dataframe(
+        summary.drop(columns='Path').assign(Utilization=summary['Load'] / capacity),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Distance_KM': st.column_config.NumberColumn("Distance (KM)", format="%.0f"),
+            'Full_Load_Trip': st.column_config.CheckboxColumn("Full-Load Trip"),
+            'Utilization': st.column_config.ProgressColumn("Utilization", min_value=0, max_value=1),
+        },
+    )
+
+with col2:
+    st.markdown("**Stops**")
+    st.dataframe(
+        stops.sort_values(['Route', 'Sequence'])[['Route', 'Sequence', 'Name', 'Demand', 'Latitude', 'Longitude']],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+st.download_button("⬇️ Download stop schedule (CSV)",
+                   stops.sort_values(['Route', 'Sequence']).to_csv(index=False),
+                   file_name=f"routes_{region.lower().replace(' ', '_')}.csv", mime='text/csv')
+
+st.markdown("---")
+
+# Section 4: Method
+st.header("4. 🧪 Method")
+
+timings = pd.DataFrame({
+    'Stage': ['Distance matrix', 'Savings construction', 'Local search'],
+    'Seconds': [stats['matrix_seconds'],
+                stats['construction_seconds'] - stats['matrix_seconds'],
+                stats['seconds'] - stats['construction_seconds']],
+})
+
+col1, col2 = st.columns([2, 1])
+
+with col1:
+    st.markdown(f"""
+    - **Demand:** The selected sales are credited to dealers in proportion to their weight, and the
+      vehicle wave is split across the largest dealers in the same proportion
+    - **Distances:** Great-circle distances between all stops, computed in one matrix product and
+      scaled by {ROAD_FACTOR} to approximate road travel
+    - **Construction:** Clarke-Wright savings over each dealer's {SAVINGS_NEIGHBOURS} nearest
+      neighbours, merging routes while the transporter has room
+    - **Improvement:** 2-opt within each route and or-opt moves of up to {OR_OPT_LENGTH} consecutive
+      stops into any route with spare capacity, until no move helps or the time budget runs out
+    - **Large deliveries:** A dealer needing more than one full transporter gets dedicated full-load trips
+    """)
+
+with col2:
+    st.dataframe(timings, hide_index=True, use_container_width=True,
+                 column_config={'Seconds': st.column_config.NumberColumn(format="%.3f")})
+    st.caption(f"{stats['local_search_moves']:,} or-opt moves applied")
+
+st.info("""
+**📌 Limitations:** Dealer locations and their weights come from the bundled dealer file, and the sales
+data has no dealer key, so demand is an allocation rather than observed orders. Distances ignore the
+road network, delivery time windows and driver hours. The heuristic finds good routes quickly but does
+not prove them optimal.
+""")
+
+# Footer
+st.markdown("---")
+st.markdown("""
+<div style='text-align: center; color: #666; padding: 1rem 0;'>
+    <p>Route Planner | Built with Streamlit, NumPy & Plotly | © 2025 Zakaria Iraqi</p>
+</div>
+""", unsafe_allow_html=True)
@@ -0,0 +1,3 @@
+"""
+Shared helpers for the BMW Sales Portfolio pages
+"""
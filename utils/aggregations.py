@@ -0,0 +1,239 @@
+"""
+Page aggregations - the filters and group-bys behind the Dashboard and EDA Gallery charts
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils.encoding import decode_labels, factorize, label_mask
+
+
+# Dashboard
+
+def apply_filters(df, year_range, models, regions, fuel_types, price_range):
+    """Apply the Dashboard sidebar filters"""
+    return df[
+        (df['Year'] >= year_range[0]) &
+        (df['Year'] <= year_range[1]) &
+        label_mask(df['Model'], models) &
+        label_mask(df['Region'], regions) &
+        label_mask(df['Fuel_Type'], fuel_types) &
+        (df['Price_USD'] >= price_range[0]) &
+        (df['Price_USD'] <= price_range[1])
+    ]
+
+
+def apply_selection(df, selection, price_range=None):
+    """Keep rows whose dimensions fall in selection (dimension -> allowed labels)"""
+    mask = np.ones(len(df), dtype=bool)
+    for dim, allowed in selection.items():
+        if allowed is not None:
+            mask &= label_mask(df[dim], allowed)
+    if price_range is not None:
+        mask &= ((df['Price_USD'] >= price_range[0]) & (df['Price_USD'] <= price_range[1])).to_numpy()
+    return df[mask]
+
+
+def compute_kpis(filtered_df, df=None, catalog=None):
+    """Headline KPIs for the filtered data, relative to the full dataset.
+
+    With a DatasetCatalog the dataset totals are read from it instead of scanning df.
+    """
+    if catalog is not None:
+        overall_sales, overall_avg_price = catalog.total('Sales_Volume'), catalog.mean('Price_USD')
+    else:
+        overall_sales, overall_avg_price = df['Sales_Volume'].sum(), df['Price_USD'].mean()
+    return {
+        'total_sales': filtered_df['Sales_Volume'].sum(),
+        'overall_sales': overall_sales,
+        'avg_price': filtered_df['Price_USD'].mean(),
+        'overall_avg_price': overall_avg_price,
+        'median_mileage': filtered_df['Mileage_KM'].median(),
+        'unique_models': filtered_df['Model'].nunique(),
+    }
+
+
+def region_sales(filtered_df):
+    """Total sales volume per region, ascending"""
+    result = decode_labels(filtered_df.groupby('Region')['Sales_Volume'].sum().reset_index())
+    return result.sort_values('Sales_Volume', ascending=True)
+
+
+def fuel_sales(filtered_df):
+    """Total sales volume per fuel type"""
+    return decode_labels(filtered_df.groupby('Fuel_Type')['Sales_Volume'].sum().reset_index())
+
+
+def sales_trend(filtered_df):
+    """Yearly total sales volume and average price"""
+    return filtered_df.groupby('Year').agg({
+        'Sales_Volume': 'sum',
+        'Price_USD': 'mean'
+    }).reset_index()
+
+
+def top_models(filtered_df, n=10):
+    """Top n models by total sales volume"""
+    result = decode_labels(filtered_df.groupby('Model')['Sales_Volume'].sum().reset_index())
+    return result.sort_values('Sales_Volume', ascending=False).head(n)
+
+
+def transmission_fuel_sales(filtered_df):
+    """Sales volume per transmission and fuel type pair"""
+    return decode_labels(filtered_df.groupby(['Transmission', 'Fuel_Type'])['Sales_Volume'].sum().reset_index())
+
+
+# EDA Gallery
+
+PERFORMANCE_MODELS = ['M3', 'M5', 'i8']
+
+
+def model_year_matrix(df):
+    """Model x Year matrix of total sales volume, from rows or cube cells; missing years are 0"""
+    return df.groupby(['Model', 'Year'])['Sales_Volume'].sum().unstack(fill_value=0).sort_index(axis=1)
+
+
+def model_yearly_sales(matrix, model):
+    """Total sales volume per year for a single model, sliced from a model_year_matrix"""
+    return matrix.loc[model].rename_axis('Year').reset_index(name='Sales_Volume')
+
+
+def model_trend_stats(matrix, recent_years=5, flat_threshold=0.01):
+    """Peak year, growth and recent trend of every model at once, from a model_year_matrix.
+
+    CAGR runs from the first to the last year with sales. The recent trend is the least-squares
+    slope over the last recent_years years relative to their mean; within +/- flat_threshold
+    per year it counts as stable.
+    """
+    values = matrix.to_numpy(dtype=np.float64)
+    years = matrix.columns.to_numpy(dtype=np.float64)
+    rows = np.arange(len(values))
+
+    peak = values.argmax(axis=1)
+    sold = values > 0
+    first = sold.argmax(axis=1)
+    last = values.shape[1] - 1 - sold[:, ::-1].argmax(axis=1)
+    periods = years[last] - years[first]
+    start, end = values[rows, first], values[rows, last]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cagr = np.where((periods > 0) & (start > 0), (end / start) ** (1 / np.maximum(periods, 1)) - 1, np.nan)
+
+        recent = values[:, -recent_years:]
+        centred = years[-recent_years:] - years[-recent_years:].mean()
+        slope = recent @ centred / (centred @ centred)
+        change = slope / recent.mean(axis=1)
+
+    totals = values.sum(axis=1)
+    return pd.DataFrame({
+        'Total_Sales': totals,
+        'Sales_Rank': pd.Series(totals).rank(ascending=False, method='min').to_numpy(dtype=int),
+        'Peak_Year': years[peak].astype(int),
+        'Peak_Sales': values[rows, peak],
+        'CAGR': cagr,
+        'Recent_Change': change,
+        'Trend': np.select([change > flat_threshold, change < -flat_threshold], ['increasing', 'declining'], 'stable'),
+    }, index=matrix.index)
+
+
+def fuel_trends(df):
+    """Yearly average price and total sales volume per fuel type"""
+    return decode_labels(df.groupby(['Year', 'Fuel_Type']).agg({
+        'Price_USD': 'mean',
+        'Sales_Volume': 'sum'
+    }).reset_index())
+
+
+def add_model_segments(df, current_year=2024):
+    """Add vehicle Age and Model_Segment (Performance / SUV / Sedan) columns in place"""
+    df['Age'] = current_year - df['Year']
+    # Classify each distinct model once, then map the rows
+    models = df['Model'].dropna().unique()
+    segments = {m: 'Performance' if m in PERFORMANCE_MODELS else ('SUV' if m.startswith('X') else 'Sedan')
+                for m in models}
+    df['Model_Segment'] = df['Model'].map(segments)
+    return df
+
+
+def segment_correlations(df):
+    """Mileage/price correlation per model segment, ascending"""
+    stats = grouped_stats(df, 'Model_Segment', 'Mileage_KM', 'Price_USD')
+    return stats['Correlation'].rename_axis('Segment').reset_index().sort_values('Correlation')
+
+
+# Grouped statistics
+
+def group_codes(df, by):
+    """Group code of every row for one or more grouping columns, and the index of the groups.
+
+    Only combinations that occur get a code, in sorted key order; rows with a missing key get
+    -1. Keys are the columns' codes (utils.encoding), so dictionary-encoded columns are grouped
+    without reading their labels.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys, labels = zip(*(factorize(df[col]) for col in by))
+    missing = np.any([k < 0 for k in keys], axis=0)
+    shape = tuple(max(len(l), 1) for l in labels)
+    flat = np.ravel_multi_index([np.maximum(k, 0) for k in keys], shape)
+    size = int(np.prod(shape))
+    if size <= 4 * len(flat):
+        # Few possible combinations: mark the occupied ones and number them in order
+        occupied = np.bincount(flat[~missing], minlength=size) > 0
+        present = np.flatnonzero(occupied)
+        group = np.where(missing, -1, (np.cumsum(occupied) - 1)[flat])
+    else:
+        present, inverse = np.unique(flat[~missing], return_inverse=True)
+        group = np.full(len(flat), -1)
+        group[~missing] = inverse.ravel()
+    if len(by) == 1:
+        return group, pd.Index(labels[0][present], name=by[0])
+    index = pd.MultiIndex.from_arrays([np.asarray(l)[i] for l, i in zip(labels, np.unravel_index(present, shape))],
+                                      names=by)
+    return group, index
+
+
+def grouped_moments(df, by, columns):
+    """Count, means and sample covariance matrix of columns for every group, in one pass.
+
+    The sufficient statistics n, sum(x) and sum(x * y) of every group are accumulated with
+    bincount over values centred at the overall means, which keeps the sums well conditioned,
+    so the cost is one scan whatever the number of groups. Rows with a missing value are
+    skipped. Returns (index, counts (g,), means (g, k), covariances (g, k, k)); groups with
+    fewer than two rows have NaN covariances.
+    """
+    codes, index = group_codes(df, by)
+    values = np.column_stack([df[col].to_numpy(dtype=np.float64) for col in columns])
+    valid = (codes >= 0) & ~np.isnan(values).any(axis=1)
+    codes, values = codes[valid], values[valid]
+    n_groups, k = len(index), len(columns)
+
+    centre = values.mean(axis=0) if len(values) else np.zeros(k)
+    deltas = values - centre
+    counts = np.bincount(codes, minlength=n_groups).astype(np.float64)
+    sums = np.column_stack([np.bincount(codes, deltas[:, i], n_groups) for i in range(k)])
+    products = np.empty((n_groups, k, k))
+    for i in range(k):
+        for j in range(i, k):
+            products[:, i, j] = products[:, j, i] = np.bincount(codes, deltas[:, i] * deltas[:, j], n_groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = centre + sums / counts[:, None]
+        covariances = ((products - sums[:, :, None] * sums[:, None, :] / counts[:, None, None])
+                       / (counts - 1)[:, None, None])
+    covariances[counts < 2] = np.nan
+    return index, counts, means, covariances
+
+
+def grouped_stats(df, by, x, y):
+    """Count, means, variances, covariance and correlation of x and y for every group of by"""
+    index, counts, means, cov = grouped_moments(df, by, [x, y])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = cov[:, 0, 1] / np.sqrt(cov[:, 0, 0] * cov[:, 1, 1])
+    return pd.DataFrame({
+        'Count': counts.astype(int),
+        f'Mean_{x}': means[:, 0],
+        f'Mean_{y}': means[:, 1],
+        f'Var_{x}': cov[:, 0, 0],
+        f'Var_{y}': cov[:, 1, 1],
+        'Covariance': cov[:, 0, 1],
+        'Correlation': correlation,
+    }, index=index)
@@ -0,0 +1,263 @@
+"""
+Trend alerts - incremental change-point detection over every sales series
+
+Each Model x Region x Fuel_Type combination is a series of Sales_Volume records in
+ingestion order. A self-starting two-sided CUSUM runs on every series at once: each record is
+standardized against the running mean and variance of its series since the last change point,
+and an alert fires when the cumulative drift passes a threshold. The detector then restarts
+the series' statistics, so it learns the new level.
+
+The detector state (per-series statistics and the byte offset already read from the CSV) is
+saved after every run, so a run parses only rows appended since the previous one. If the
+already-read part of the file has changed, the state is discarded and history is rescanned.
+
+Usage (from the repository root):
+    python -m utils.alerts                    # process new rows once
+    python -m utils.alerts --interval 300     # keep polling every five minutes
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data import DATA_PATH, ROOT
+
+ALERT_DIR = Path(os.environ.get('PORTFOLIO_ALERT_DIR', ROOT / 'alerts'))
+SERIES_DIMENSIONS = ['Model', 'Region', 'Fuel_Type']
+VALUE_COLUMN = 'Sales_Volume'
+
+# CUSUM reference drift and decision threshold, in standard deviations
+DRIFT = 0.5
+THRESHOLD = 8.0
+# Records a series needs after a (re)start before it is scored
+WARMUP_RECORDS = 30
+
+READ_BYTES = 64 * 1024 * 1024
+_FINGERPRINT_BYTES = 4096
+
+
+class ChangeDetector:
+    """Per-series running statistics and CUSUM sums, updated batch by batch"""
+
+    def __init__(self, keys=None, count=None, mean=None, m2=None, upper=None, lower=None):
+        self.keys = keys if keys is not None else pd.MultiIndex.from_tuples([], names=SERIES_DIMENSIONS)
+        n = len(self.keys)
+        self.count = count if count is not None else np.zeros(n)
+        self.mean = mean if mean is not None else np.zeros(n)
+        self.m2 = m2 if m2 is not None else np.zeros(n)
+        self.upper = upper if upper is not None else np.zeros(n)
+        self.lower = lower if lower is not None else np.zeros(n)
+
+    def _series_codes(self, batch):
+        """Series code of every row, registering series not seen before"""
+        keys = pd.MultiIndex.from_frame(batch[SERIES_DIMENSIONS])
+        codes = self.keys.get_indexer(keys)
+        if (codes < 0).any():
+            new = keys[codes < 0].unique()
+            self.keys = self.keys.append(new)
+            grow = np.zeros(len(new))
+            for name in ('count', 'mean', 'm2', 'upper', 'lower'):
+                setattr(self, name, np.concatenate([getattr(self, name), grow]))
+            codes = self.keys.get_indexer(keys)
+        return codes
+
+    def update(self, batch, first_row=0):
+        """Run the detector over a batch of new records; returns a list of alert dicts.
+
+        Rows are laid out as a (series, position) matrix so that each step of the recursion
+        advances every series at once; the loop runs over the longest series in the batch.
+        """
+        codes = self._series_codes(batch)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes = codes[order]
+        series, starts, lengths = np.unique(sorted_codes, return_index=True, return_counts=True)
+        position = np.arange(len(order)) - np.repeat(starts, lengths)
+        values = np.full((len(series), lengths.max(initial=0)), np.nan)
+        values[np.repeat(np.arange(len(series)), lengths), position] = batch[VALUE_COLUMN].to_numpy()[order]
+        rows = np.full(values.shape, -1)
+        rows[np.repeat(np.arange(len(series)), lengths), position] = order
+
+        count, mean, m2 = self.count[series], self.mean[series], self.m2[series]
+        upper, lower = self.upper[series], self.lower[series]
+        alerts = []
+        for t in range(values.shape[1]):
+            x = values[:, t]
+            active = ~np.isnan(x)
+            std = np.sqrt(m2 / np.maximum(count - 1, 1))
+            scored = active & (count >= WARMUP_RECORDS) & (std > 0)
+            z = np.where(scored, (np.where(active, x, 0) - mean) / np.where(std > 0, std, 1), 0.0)
+            upper = np.where(scored, np.maximum(0, upper + z - DRIFT), upper)
+            lower = np.where(scored, np.maximum(0, lower - z - DRIFT), lower)
+            fired = scored & ((upper > THRESHOLD) | (lower > THRESHOLD))
+            for i in np.flatnonzero(fired):
+                row = rows[i, t]
+                alerts.append({
+                    **dict(zip(SERIES_DIMENSIONS, self.keys[series[i]])),
+                    'direction': 'increase' if upper[i] > THRESHOLD else 'decrease',
+                    'row': int(first_row + row),
+                    'year': int(batch['Year'].iat[row]) if 'Year' in batch else None,
+                    'previous_mean': float(mean[i]),
+                    'records_in_regime': int(count[i]),
+                })
+            # Restart the statistics of series that changed, seeded with the triggering record
+            count = np.where(fired, 0, count)
+            mean = np.where(fired, 0, mean)
+            m2 = np.where(fired, 0, m2)
+            upper = np.where(fired, 0, upper)
+            lower = np.where(fired, 0, lower)
+            # Welford update for every series with a record at this step
+            new_count = count + active
+            delta = np.where(active, x - mean, 0)
+            mean = mean + np.where(active, delta / np.maximum(new_count, 1), 0)
+            m2 = m2 + np.where(active, delta * (np.where(active, x, 0) - mean), 0)
+            count = new_count
+
+        self.count[series], self.mean[series], self.m2[series] = count, mean, m2
+        self.upper[series], self.lower[series] = upper, lower
+        return alerts
+
+    def to_arrays(self):
+        return {
+            'keys': self.keys.to_frame(index=False).to_numpy(dtype=str),
+            'count': self.count, 'mean': self.mean, 'm2': self.m2,
+            'upper': self.upper, 'lower': self.lower,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        keys = pd.MultiIndex.from_arrays(list(arrays['keys'].T), names=SERIES_DIMENSIONS) \
+            if len(arrays['keys']) else None
+        return cls(keys, *(arrays[name].copy() for name in ('count', 'mean', 'm2', 'upper', 'lower')))
+
+
+class AlertEngine:
+    """Detector state and alert log for one source file, kept in alert_dir"""
+
+    def __init__(self, source=DATA_PATH, alert_dir=ALERT_DIR):
+        self.source = Path(source)
+        self.alert_dir = Path(alert_dir)
+        self.state_path = self.alert_dir / f'{self.source.stem}.state.npz'
+        self.log_path = self.alert_dir / f'{self.source.stem}.alerts.jsonl'
+
+    def _fingerprint(self, offset):
+        """Hash of the header and of the bytes just before offset, to detect rewritten files"""
+        with open(self.source, 'rb') as f:
+            head = f.read(_FINGERPRINT_BYTES)
+            f.seek(max(offset - _FINGERPRINT_BYTES, 0))
+            tail = f.read(min(offset, _FINGERPRINT_BYTES))
+        return hashlib.sha1(head + tail).hexdigest()
+
+    def _load_state(self):
+        if not self.state_path.exists():
+            return None
+        with np.load(self.state_path) as data:
+            meta = json.loads(str(data['meta']))
+            arrays = {name: data[name] for name in data.files if name != 'meta'}
+        size = self.source.stat().st_size
+        if meta['offset'] > size or meta['fingerprint'] != self._fingerprint(meta['offset']):
+            return None
+        return meta, ChangeDetector.from_arrays(arrays)
+
+    def _save_state(self, meta, detector):
+        self.alert_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(f'.{os.getpid()}.tmp.npz')
+        np.savez(tmp, meta=json.dumps(meta), **detector.to_arrays())
+        os.replace(tmp, self.state_path)
+
+    def run(self):
+        """Process rows appended since the last run; returns (rows processed, new alerts)"""
+        state = self._load_state()
+        if state is None:
+            # First run, or the file was rewritten: start over from the header
+            self.log_path.unlink(missing_ok=True)
+            with open(self.source, 'rb') as f:
+                header = f.readline()
+            meta = {'offset': len(header), 'rows': 0, 'columns': header.decode().strip().split(',')}
+            detector = ChangeDetector()
+        else:
+            meta, detector = state
+
+        processed, alerts = 0, []
+        with open(self.source, 'rb') as f:
+            f.seek(meta['offset'])
+            while True:
+                block = f.read(READ_BYTES)
+                # Parse whole lines only; a partial last line is read on the next run
+                end = block.rfind(b'\n') + 1
+                if end == 0:
+                    break
+                batch = pd.read_csv(io.BytesIO(block[:end]), header=None, names=meta['columns'])
+                alerts += detector.update(batch, first_row=meta['rows'])
+                meta['offset'] += end
+                meta['rows'] += len(batch)
+                processed += len(batch)
+                f.seek(meta['offset'])
+
+        detected_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        if alerts:
+            self.alert_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'a') as log:
+                for alert in alerts:
+                    log.write(json.dumps({'detected_at': detected_at, **alert}) + '\n')
+        meta['fingerprint'] = self._fingerprint(meta['offset'])
+        meta['last_run'] = detected_at
+        self._save_state(meta, detector)
+        return processed, alerts
+
+    def status(self):
+        """Rows processed, series tracked and last run time, or None before the first run"""
+        state = self._load_state()
+        if state is None:
+            return None
+        meta, detector = state
+        return {'rows': meta['rows'], 'series': len(detector.keys), 'last_run': meta['last_run']}
+
+    def alerts(self):
+        """Every alert logged for the source, oldest first"""
+        if not self.log_path.exists():
+            return pd.DataFrame(columns=['detected_at'] + SERIES_DIMENSIONS +
+                                ['direction', 'row', 'year', 'previous_mean', 'records_in_regime'])
+        return pd.read_json(self.log_path, lines=True, dtype={'year': 'Int64'})
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_alerts(source=DATA_PATH):
+    """Logged alerts and engine status, re-read at most once a minute"""
+    engine = AlertEngine(source)
+    return engine.alerts(), engine.status()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--source', type=Path, default=DATA_PATH)
+    parser.add_argument('--alert-dir', type=Path, default=ALERT_DIR)
+    parser.add_argument('--interval', type=float, default=None,
+                        help="Seconds between runs; omit to run once")
+    args = parser.parse_args(argv)
+
+    engine = AlertEngine(args.source, args.alert_dir)
+    while True:
+        start = time.perf_counter()
+        processed, alerts = engine.run()
+        print(f"{datetime.now():%Y-%m-%d %H:%M:%S}  {processed:,} new rows, {len(alerts)} alerts "
+              f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        for alert in alerts:
+            print(f"  {alert['direction']:>8}  {alert['Model']} / {alert['Region']} / "
+                  f"{alert['Fuel_Type']}  row {alert['row']:,}", file=sys.stderr)
+        if args.interval is None:
+            return 0
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
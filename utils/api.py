@@ -0,0 +1,382 @@
+"""
+Dashboard API - the Dashboard's KPIs and breakdowns as a headless JSON service
+
+Runs beside the Streamlit app on the same data layer: the shared memory-mapped dataset, the
+pre-aggregated SalesCube and the aggregation functions behind the Dashboard charts. Query
+parameters mirror the Dashboard sidebar.
+
+Responses are built once per dataset version and normalized filter state, then kept in an
+in-process LRU cache as compact JSON, its gzip encoding and a content ETag. Repeated requests
+cost a dictionary lookup, and clients revalidating with If-None-Match get 304 Not Modified.
+
+Usage (from the repository root):
+    python -m utils.api                         # http://127.0.0.1:8600/api/v1/dashboard
+    python -m utils.api --port 9000 --workers 4
+"""
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from utils.aggregations import (
+    apply_selection, compute_kpis, fuel_sales, region_sales, sales_trend, top_models,
+    transmission_fuel_sales
+)
+from utils.cube import DIMENSIONS, load_shared_cube
+from utils.data import dataset_key, load_catalog, load_shared_data
+from utils.snapshots import snapshot_source
+
+API_PREFIX = '/api/v1'
+DEFAULT_PORT = 8600
+
+# The Dashboard charts: breakdown name -> (cube dimensions, aggregation)
+BREAKDOWNS = {
+    'region': (['Region'], region_sales),
+    'fuel_type': (['Fuel_Type'], fuel_sales),
+    'year': (['Year'], sales_trend),
+    'model': (['Model'], top_models),
+    'transmission': (['Transmission', 'Fuel_Type'], transmission_fuel_sales),
+}
+
+# Sidebar multiselects and the query parameter carrying each (repeated or comma-separated)
+LIST_PARAMS = {'model': 'Model', 'region': 'Region', 'fuel_type': 'Fuel_Type'}
+RANGE_PARAMS = ('year_min', 'year_max', 'price_min', 'price_max')
+KNOWN_PARAMS = set(LIST_PARAMS) | set(RANGE_PARAMS) | {'version', 'top'}
+
+CACHE_ENTRIES = 4096
+# Dataset versions kept loaded at once, least recently used dropped first
+DATASET_ENTRIES = 4
+GZIP_MIN_BYTES = 512
+
+
+class QueryError(ValueError):
+    """A request parameter that cannot be applied; reported as 400 Bad Request"""
+
+
+class CachedResponse:
+    """Encoded response body with its gzip form and ETag"""
+
+    __slots__ = ('body', 'gzipped', 'etag')
+
+    def __init__(self, body):
+        self.body = body
+        self.gzipped = gzip.compress(body, 6) if len(body) >= GZIP_MIN_BYTES else None
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class ResponseCache:
+    """Thread-safe LRU of CachedResponse by request key"""
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+def encode(payload):
+    """Compact UTF-8 JSON; NaN and infinities become null"""
+    return json.dumps(_jsonable(payload), separators=(',', ':'), ensure_ascii=False,
+                      allow_nan=False).encode('utf-8')
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _records(frame):
+    return [dict(zip(frame.columns, row)) for row in frame.itertuples(index=False, name=None)]
+
+
+# Filters
+
+def _list_param(params, name):
+    values = [v.strip() for raw in params.getlist(name) for v in raw.split(',')]
+    return [v for v in values if v]
+
+
+def _int_param(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        return int(float(raw))
+    except (ValueError, OverflowError):
+        raise QueryError(f"{name} must be a number, got {raw!r}") from None
+
+
+def parse_filters(params, labels, year_bounds, price_bounds):
+    """Normalized (selection, price_range, top) from query parameters.
+
+    Missing parameters select everything, like the Dashboard's default sidebar. Labels are
+    sorted and ranges clipped to the data, so equivalent requests share one cache key.
+    price_range is None when it spans all prices, which lets the cube serve the request.
+    """
+    unknown = set(params.keys()) - KNOWN_PARAMS
+    if unknown:
+        raise QueryError(f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+
+    selection = {}
+    for name, dim in LIST_PARAMS.items():
+        values = _list_param(params, name)
+        if not values:
+            continue
+        known = set(labels[dim])
+        missing = [v for v in values if v not in known]
+        if missing:
+            raise QueryError(f"Unknown {dim}: {', '.join(missing)}")
+        selection[dim] = sorted(set(values))
+
+    year_min = _int_param(params, 'year_min')
+    year_max = _int_param(params, 'year_max')
+    year_min = year_bounds[0] if year_min is None else max(year_min, year_bounds[0])
+    year_max = year_bounds[1] if year_max is None else min(year_max, year_bounds[1])
+    if year_min > year_max:
+        raise QueryError("year_min is after year_max")
+    if (year_min, year_max) != tuple(year_bounds):
+        selection['Year'] = list(range(year_min, year_max + 1))
+
+    price_min = _int_param(params, 'price_min')
+    price_max = _int_param(params, 'price_max')
+    price_range = (price_bounds[0] if price_min is None else max(price_min, price_bounds[0]),
+                   price_bounds[1] if price_max is None else min(price_max, price_bounds[1]))
+    if price_range[0] > price_range[1]:
+        raise QueryError("price_min is above price_max")
+    if price_range == tuple(price_bounds):
+        price_range = None
+
+    top = _int_param(params, 'top')
+    top = 10 if top is None else top
+    if top < 1:
+        raise QueryError("top must be at least 1")
+    return selection, price_range, top
+
+
+# Aggregates
+
+class DashboardData:
+    """One dataset version's shared frame and cube, answering Dashboard queries"""
+
+    def __init__(self, source):
+        self.source = source
+        self.key = dataset_key(source)
+        self.df = load_shared_data(source)
+        self.cube = load_shared_cube(source)
+        self.catalog = load_catalog(source)
+        self.labels = {dim: self.catalog.domain(dim) for dim in DIMENSIONS}
+        self.year_bounds = self.catalog.bounds('Year')
+        self.price_bounds = self.catalog.bounds('Price_USD')
+
+    def kpis(self, selection, price_range):
+        """The Dashboard KPI row, from the cube when the price range is unrestricted"""
+        rows = apply_selection(self.df, selection, price_range)
+        if price_range is not None:
+            kpis = compute_kpis(rows, catalog=self.catalog)
+            kpis['records'] = len(rows)
+        else:
+            kpis = self.cube.kpis(selection)
+            kpis['median_mileage'] = rows['Mileage_KM'].median()
+        return kpis
+
+    def breakdown(self, name, selection, price_range, top=10):
+        """A Dashboard chart's data as records"""
+        by, aggregate = BREAKDOWNS[name]
+        if price_range is None:
+            data = self.cube.aggregate(by, selection)
+        else:
+            data = apply_selection(self.df, selection, price_range)
+        frame = aggregate(data, top) if name == 'model' else aggregate(data)
+        return _records(frame)
+
+
+_datasets = OrderedDict()
+_datasets_lock = threading.Lock()
+
+
+def dashboard_data(version=None):
+    """DashboardData of the working copy (None) or a stored snapshot version.
+
+    The DATASET_ENTRIES most recently used versions stay loaded; a source whose file changed
+    replaces its stale entry.
+    """
+    try:
+        source = snapshot_source(version)
+    except KeyError as e:
+        raise LookupError(str(e).strip("'")) from None
+    key = (str(source), dataset_key(source))
+    with _datasets_lock:
+        data = _datasets.get(key)
+        if data is not None:
+            _datasets.move_to_end(key)
+    if data is None:
+        data = DashboardData(source)
+        with _datasets_lock:
+            for stale in [k for k in _datasets if k[0] == key[0] and k != key]:
+                del _datasets[stale]
+            data = _datasets.setdefault(key, data)
+            _datasets.move_to_end(key)
+            while len(_datasets) > DATASET_ENTRIES:
+                _datasets.popitem(last=False)
+    return data
+
+
+# HTTP
+
+cache = ResponseCache()
+
+
+def _payload(endpoint, data, name=None, selection=None, price_range=None, top=10):
+    filters = {'selection': selection, 'price_range': price_range}
+    if endpoint == 'kpis':
+        return {'dataset': data.key, 'filters': filters, 'kpis': data.kpis(selection, price_range)}
+    if endpoint == 'breakdown':
+        return {'dataset': data.key, 'filters': filters, 'breakdown': name,
+                'rows': data.breakdown(name, selection, price_range, top)}
+    if endpoint == 'dashboard':
+        return {'dataset': data.key, 'filters': filters,
+                'kpis': data.kpis(selection, price_range),
+                'breakdowns': {b: data.breakdown(b, selection, price_range, top) for b in BREAKDOWNS}}
+    if endpoint == 'dimensions':
+        return {'dataset': data.key, 'records': data.catalog.rows, 'labels': data.labels,
+                'records_missing_labels': data.cube.dropped,
+                'year_range': data.year_bounds, 'price_range': data.price_bounds,
+                'breakdowns': list(BREAKDOWNS)}
+    raise ValueError(endpoint)
+
+
+def _respond(request, entry, status=200):
+    headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if entry.etag in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers=headers)
+    body = entry.body
+    if entry.gzipped is not None and 'gzip' in request.headers.get('accept-encoding', ''):
+        body = entry.gzipped
+        headers['Content-Encoding'] = 'gzip'
+    return Response(body, status_code=status, media_type='application/json', headers=headers)
+
+
+def _error(status, message):
+    return Response(encode({'error': message}), status_code=status, media_type='application/json')
+
+
+async def _serve(request, endpoint, name=None):
+    params = request.query_params
+    try:
+        data = dashboard_data(params.get('version') or None)
+        query = ()
+        if endpoint != 'dimensions':
+            query = parse_filters(params, data.labels, data.year_bounds, data.price_bounds)
+        selection, price_range, top = query or ({}, None, None)
+        frozen = tuple(sorted((dim, tuple(labels)) for dim, labels in selection.items()))
+        # top only changes responses that include the model breakdown
+        key = (data.key, endpoint, name, frozen, price_range,
+               top if endpoint == 'dashboard' or name == 'model' else None)
+    except LookupError as e:
+        return _error(404, str(e))
+    except QueryError as e:
+        return _error(400, str(e))
+
+    entry = cache.get(key)
+    if entry is None:
+        # Aggregations run off the event loop so cached responses keep flowing meanwhile
+        body = await asyncio.to_thread(lambda: encode(_payload(endpoint, data, name, *query)))
+        entry = CachedResponse(body)
+        cache.put(key, entry)
+    return _respond(request, entry)
+
+
+async def kpis_endpoint(request):
+    return await _serve(request, 'kpis')
+
+
+async def breakdown_endpoint(request):
+    name = request.path_params['name']
+    if name not in BREAKDOWNS:
+        return _error(404, f"Unknown breakdown {name!r}; expected one of {', '.join(BREAKDOWNS)}")
+    return await _serve(request, 'breakdown', name)
+
+
+async def dashboard_endpoint(request):
+    return await _serve(request, 'dashboard')
+
+
+async def dimensions_endpoint(request):
+    return await _serve(request, 'dimensions')
+
+
+async def health_endpoint(request):
+    return Response(encode({'status': 'ok', 'cache': cache.stats(),
+                            'uptime_seconds': round(time.monotonic() - _started, 1)}),
+                    media_type='application/json')
+
+
+_started = time.monotonic()
+
+app = Starlette(routes=[
+    Route(f'{API_PREFIX}/kpis', kpis_endpoint),
+    Route(f'{API_PREFIX}/breakdowns/{{name}}', breakdown_endpoint),
+    Route(f'{API_PREFIX}/dashboard', dashboard_endpoint),
+    Route(f'{API_PREFIX}/dimensions', dimensions_endpoint),
+    Route(f'{API_PREFIX}/health', health_endpoint),
+])
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the Dashboard aggregates as a JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes; each attaches the shared memory-mapped dataset")
+    args = parser.parse_args()
+
+    # Build the columnar cache once before workers start attaching it
+    dashboard_data()
+    uvicorn.run('utils.api:app', host=args.host, port=args.port, workers=args.workers,
+                log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Dataset catalog - per-column metadata computed once when a dataset version is ingested
+
+For every column the catalog keeps the row and null counts, min, max, sum and mean of
+numbers, the sorted domain with per-value counts of strings and low-cardinality integers
+(such as Year), and an equal-width histogram of numbers. It is written as JSON beside the
+columnar cache, so pages read filter options, slider bounds and dataset totals from a few
+kilobytes instead of scanning columns on every rerun.
+
+Histograms also size sliders: a step is the round number that splits the central 90% of
+the values into about SLIDER_STEPS positions, and never finer than the values themselves.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+HISTOGRAM_BINS = 50
+# Integer columns with at most this many distinct values also get a domain
+MAX_NUMERIC_DOMAIN = 100
+SLIDER_STEPS = 100
+MAX_DECIMALS = 6
+
+
+def _resolution(values, integer):
+    """Smallest spacing the values are recorded at: a gcd for integers, a power of ten otherwise"""
+    if len(values) < 2:
+        return 1 if integer else 0.0
+    if integer:
+        return int(np.gcd.reduce((values - values.min()).astype(np.int64))) or 1
+    for decimals in range(MAX_DECIMALS + 1):
+        scaled = values * 10 ** decimals
+        if np.allclose(scaled, np.round(scaled), rtol=0, atol=1e-6):
+            return 10.0 ** -decimals
+    return 10.0 ** -MAX_DECIMALS
+
+
+def _profile(column):
+    """Metadata of one Arrow column"""
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    profile = {'nulls': column.null_count, 'distinct': pc.count_distinct(column).as_py()}
+    if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        counts = pc.value_counts(column.drop_null())
+        pairs = sorted(zip(counts.field('values').cast(pa.string()).to_pylist(),
+                           counts.field('counts').to_pylist()))
+        profile.update(kind='categorical', values=[v for v, _ in pairs], counts=[n for _, n in pairs])
+        return profile
+
+    integer = pa.types.is_integer(column.type)
+    values = column.drop_null().to_numpy()
+    bounds = pc.min_max(column).as_py()
+    profile.update(kind='numeric', integer=integer, min=bounds['min'], max=bounds['max'],
+                   sum=pc.sum(column).as_py(), mean=pc.mean(column).as_py())
+    if not len(values):
+        profile.update(resolution=None, histogram={'counts': [], 'edges': []})
+        return profile
+
+    unique, unique_counts = np.unique(values, return_counts=True)
+    profile['resolution'] = _resolution(unique, integer)
+    if integer and len(unique) <= MAX_NUMERIC_DOMAIN:
+        profile.update(values=unique.tolist(), counts=unique_counts.tolist())
+    if integer and bounds['max'] - bounds['min'] < HISTOGRAM_BINS:
+        # One bin per integer value
+        edges = np.arange(bounds['min'], bounds['max'] + 2) - 0.5
+    else:
+        edges = np.linspace(bounds['min'], bounds['max'], HISTOGRAM_BINS + 1)
+    counts, edges = np.histogram(values, bins=edges)
+    profile['histogram'] = {'counts': counts.tolist(), 'edges': edges.tolist()}
+    return profile
+
+
+def _nice(value):
+    """Smallest 1, 2 or 5 x 10^k at or above value"""
+    magnitude = 10.0 ** math.floor(math.log10(value))
+    for factor in (1, 2, 5, 10):
+        if factor * magnitude >= value * (1 - 1e-9):
+            return factor * magnitude
+
+
+class DatasetCatalog:
+    """Row count and per-column profiles of one dataset version"""
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+
+    def domain(self, column):
+        """Sorted distinct values of a string or low-cardinality integer column"""
+        return list(self.columns[column]['values'])
+
+    def value_counts(self, column):
+        profile = self.columns[column]
+        return pd.Series(profile['counts'], index=profile['values'], name=column)
+
+    def bounds(self, column):
+        """(min, max) of a numeric column"""
+        profile = self.columns[column]
+        return profile['min'], profile['max']
+
+    def total(self, column):
+        return self.columns[column]['sum']
+
+    def mean(self, column):
+        return self.columns[column]['mean']
+
+    def histogram(self, column):
+        """(counts, edges) arrays of a numeric column's histogram"""
+        histogram = self.columns[column]['histogram']
+        return np.asarray(histogram['counts']), np.asarray(histogram['edges'])
+
+    def quantile(self, column, q):
+        """Approximate quantile, interpolated within histogram bins"""
+        counts, edges = self.histogram(column)
+        cumulative = np.concatenate([[0], np.cumsum(counts)]) / max(counts.sum(), 1)
+        return float(np.interp(q, cumulative, edges))
+
+    def fraction(self, column, low, high):
+        """Approximate share of rows with low <= value <= high, from the histogram"""
+        counts, edges = self.histogram(column)
+        cumulative = np.concatenate([[0], np.cumsum(counts)]) / max(counts.sum(), 1)
+        below_low, below_high = np.interp([low, high], edges, cumulative)
+        return float(max(below_high - below_low, 0.0))
+
+    def slider_step(self, column, steps=SLIDER_STEPS):
+        """Round step splitting the central 90% of a numeric column into about steps positions"""
+        profile = self.columns[column]
+        resolution = profile['resolution'] or 0
+        span = self.quantile(column, 0.95) - self.quantile(column, 0.05)
+        if span <= 0:
+            span = profile['max'] - profile['min']
+        step = max(_nice(span / steps) if span > 0 else 0, resolution)
+        if profile['integer']:
+            return max(int(round(step)), 1)
+        return round(step, MAX_DECIMALS) if step else 10.0 ** -MAX_DECIMALS
+
+    def to_dict(self):
+        return {'rows': self.rows, 'columns': self.columns}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['rows'], data['columns'])
+
+
+def build_catalog(data):
+    """DatasetCatalog of an Arrow table or DataFrame"""
+    table = pa.Table.from_pandas(data, preserve_index=False) if isinstance(data, pd.DataFrame) else data
+    return DatasetCatalog(table.num_rows, {name: _profile(table.column(name)) for name in table.column_names})
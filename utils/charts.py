@@ -0,0 +1,377 @@
+"""
+Figure builders - turn aggregated frames into Plotly figures for the Dashboard and EDA Gallery
+"""
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+
+# Dashboard
+
+def region_sales_chart(region_sales):
+    fig = px.bar(region_sales,
+                 y='Region',
+                 x='Sales_Volume',
+                 title="Sales Volume by Region",
+                 labels={'Sales_Volume': 'Total Sales', 'Region': 'Region'},
+                 orientation='h',
+                 color='Sales_Volume',
+                 color_continuous_scale='Blues')
+
+    fig.update_layout(height=400, showlegend=False)
+    return fig
+
+
+def fuel_sales_chart(fuel_sales):
+    # Bars rather than a pie: pie slices emit no selection events for linked brushing
+    fuel_sales = fuel_sales.sort_values('Sales_Volume', ascending=True)
+    share = fuel_sales['Sales_Volume'] / fuel_sales['Sales_Volume'].sum() * 100
+    fig = px.bar(fuel_sales,
+                 y='Fuel_Type',
+                 x='Sales_Volume',
+                 title="Sales Distribution by Fuel Type",
+                 labels={'Sales_Volume': 'Total Sales', 'Fuel_Type': 'Fuel Type'},
+                 orientation='h',
+                 text=share.map('{:.1f}%'.format),
+                 color='Fuel_Type',
+                 color_discrete_sequence=px.colors.qualitative.Set3)
+
+    fig.update_layout(height=400, showlegend=False)
+    return fig
+
+
+def sales_trend_chart(sales_trend, forecast=None):
+    fig = go.Figure()
+
+    if forecast is not None and not sales_trend.empty:
+        # Start the forecast at the last actual point so the lines connect
+        last = sales_trend.iloc[-1]
+        years = [last['Year']] + list(forecast['Year'])
+        fig.add_trace(go.Scatter(
+            x=years + years[::-1],
+            y=[last['Sales_Volume']] + list(forecast['Upper']) +
+              list(forecast['Lower'][::-1]) + [last['Sales_Volume']],
+            fill='toself',
+            fillcolor='rgba(31, 119, 180, 0.15)',
+            line=dict(width=0),
+            hoverinfo='skip',
+            name='95% Forecast Band'
+        ))
+        fig.add_trace(go.Scatter(
+            x=years,
+            y=[last['Sales_Volume']] + list(forecast['Forecast']),
+            mode='lines+markers',
+            name='Forecast',
+            line=dict(color='#1f77b4', width=2, dash='dash'),
+            marker=dict(size=6)
+        ))
+
+    fig.add_trace(go.Scatter(
+        x=sales_trend['Year'],
+        y=sales_trend['Sales_Volume'],
+        mode='lines+markers',
+        name='Sales Volume',
+        line=dict(color='#1f77b4', width=3),
+        marker=dict(size=8)
+    ))
+
+    fig.update_layout(
+        title="Sales Volume Trend Over Time",
+        xaxis_title="Year",
+        yaxis_title="Total Sales Volume",
+        height=400,
+        hovermode='x unified'
+    )
+    return fig
+
+
+def top_models_chart(model_sales):
+    fig = px.bar(model_sales,
+                 x='Sales_Volume',
+                 y='Model',
+                 title="Top 10 Models by Sales Volume",
+                 orientation='h',
+                 color='Sales_Volume',
+                 color_continuous_scale='Viridis')
+
+    fig.update_layout(height=500, showlegend=False)
+    return fig
+
+
+def transmission_fuel_chart(trans_data):
+    fig = px.sunburst(trans_data,
+                      path=['Transmission', 'Fuel_Type'],
+                      values='Sales_Volume',
+                      title="Sales by Transmission & Fuel Type",
+                      color='Sales_Volume',
+                      color_continuous_scale='RdYlBu_r')
+
+    fig.update_layout(height=500)
+    return fig
+
+
+def highlight_selected(fig, labels, axis):
+    """Mark the points whose ``axis`` value is in labels as selected, dimming the rest"""
+    selected = set(labels)
+    for trace in fig.data:
+        values = getattr(trace, axis)
+        if values is not None:
+            trace.selectedpoints = [i for i, v in enumerate(values) if v in selected]
+    return fig
+
+
+MAP_METRICS = {'Sales_Volume': 'Total Sales', 'Avg_Price': 'Average Price (USD)'}
+MAP_VIEW = dict(center=dict(lat=25, lon=10), zoom=0.6, style='white-bg')
+
+
+def region_choropleth(metrics, geojson, metric='Sales_Volume'):
+    """Filled region outlines; geojson may be a URL so the browser fetches and caches it once"""
+    fig = go.Figure(go.Choroplethmap(
+        geojson=geojson,
+        featureidkey='properties.Region',
+        locations=metrics['Region'],
+        z=metrics[metric],
+        colorscale='Blues',
+        marker=dict(line=dict(color='white', width=1), opacity=0.85),
+        colorbar=dict(title=MAP_METRICS[metric]),
+        hovertemplate='%{location}<br>' + MAP_METRICS[metric] + ': %{z:,.0f}<extra></extra>'
+    ))
+
+    # uirevision keeps the user's pan and zoom when only the values change
+    fig.update_layout(title=f"{MAP_METRICS[metric]} by Region", height=500, map=MAP_VIEW,
+                      margin=dict(l=0, r=0, t=50, b=0), uirevision='region_map')
+    return fig
+
+
+def region_density_map(metrics, centroids, metric='Sales_Volume', points=None):
+    """Density of a metric at region centroids, or over binned record locations when available"""
+    if points is not None:
+        lat, lon, z = points['lat'], points['lon'], points['Sales_Volume']
+        metric = 'Sales_Volume'
+        radius = 15
+    else:
+        located = centroids.merge(metrics, on='Region')
+        lat, lon, z = located['lat'], located['lon'], located[metric]
+        radius = 60
+
+    fig = go.Figure(go.Densitymap(
+        lat=lat,
+        lon=lon,
+        z=z,
+        radius=radius,
+        colorscale='YlOrRd',
+        colorbar=dict(title=MAP_METRICS[metric]),
+        hovertemplate=MAP_METRICS[metric] + ': %{z:,.0f}<extra></extra>'
+    ))
+
+    fig.update_layout(title=f"{MAP_METRICS[metric]} Density", height=500, map=MAP_VIEW,
+                      margin=dict(l=0, r=0, t=50, b=0), uirevision='region_map')
+    return fig
+
+
+def fit_map_view(bounds):
+    """Map center and zoom showing bounds = (lat_min, lat_max, lon_min, lon_max)"""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    span = max(lon_max - lon_min, (lat_max - lat_min) * 2, 1e-6)
+    return dict(style='white-bg', center=dict(lat=(lat_min + lat_max) / 2, lon=(lon_min + lon_max) / 2),
+                zoom=float(np.clip(np.log2(360 / span), 0, 12)))
+
+
+def dealer_density_map(cells, bounds):
+    """Dealer-credited sales binned over a viewport; only the non-empty bins are sent"""
+    fig = go.Figure(go.Densitymap(
+        lat=cells['lat'],
+        lon=cells['lon'],
+        z=cells['Sales'],
+        radius=12,
+        colorscale='YlOrRd',
+        colorbar=dict(title='Credited Sales'),
+        customdata=cells['Dealers'],
+        hovertemplate='Credited sales: %{z:,.0f}<br>Dealers: %{customdata:,}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title="Dealership Sales Density",
+        height=500,
+        map=fit_map_view(bounds),
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+    return fig
+
+
+# EDA Gallery
+
+def pivot_heatmap(view, metric, title):
+    """Heatmap of a HeatmapView; empty cells stay blank"""
+    labels = {'Sales_Volume': 'Sales Volume', 'Records': 'Records', 'Avg_Price': 'Average Price (USD)'}
+    fig = go.Figure(go.Heatmap(
+        z=view.values(metric),
+        x=view.col_labels,
+        y=view.row_labels,
+        colorscale='YlOrRd',
+        colorbar=dict(title=labels[metric]),
+        hovertemplate='%{y}<br>%{x}<br>' + labels[metric] + ': %{z:,.0f}<extra></extra>'
+    ))
+
+    fig.update_layout(title=title, height=max(500, min(18 * len(view.row_labels), 900)),
+                      yaxis=dict(autorange='reversed', type='category'),
+                      xaxis=dict(type='category'))
+    return fig
+
+
+def pivot_bars(view, metric, title):
+    """Bar variant of a HeatmapView: one bar per row, split into its columns"""
+    labels = {'Sales_Volume': 'Sales Volume', 'Records': 'Records', 'Avg_Price': 'Average Price (USD)'}
+    values = view.values(metric)
+    fig = go.Figure([
+        go.Bar(x=values[:, j], y=view.row_labels, name=str(label), orientation='h')
+        for j, label in enumerate(view.col_labels)
+    ])
+
+    # Sums stack; averages do not add up, so they are grouped instead
+    fig.update_layout(title=title, barmode='group' if metric == 'Avg_Price' else 'stack',
+                      height=max(500, min(18 * len(view.row_labels), 900)),
+                      xaxis_title=labels[metric],
+                      yaxis=dict(autorange='reversed', type='category'))
+    return fig
+
+
+def model_yearly_chart(model_data, model):
+    fig = px.bar(model_data,
+                 x='Year',
+                 y='Sales_Volume',
+                 title=f"BMW {model} Total Sales Volume by Year (2010-2024)",
+                 labels={'Sales_Volume': 'Total Sales Volume', 'Year': 'Year'},
+                 color='Sales_Volume',
+                 color_continuous_scale='Blues')
+
+    fig.update_layout(height=500, showlegend=False)
+    return fig
+
+
+def model_yearly_line(model_data, model):
+    """Line variant of the yearly model sales bar chart"""
+    fig = px.line(model_data,
+                  x='Year',
+                  y='Sales_Volume',
+                  title=f"BMW {model} Total Sales Volume by Year (2010-2024)",
+                  labels={'Sales_Volume': 'Total Sales Volume', 'Year': 'Year'},
+                  markers=True)
+
+    fig.update_traces(line=dict(color='#1c69d4', width=3), marker=dict(size=8))
+    fig.update_layout(height=500, showlegend=False)
+    return fig
+
+
+def fuel_trends_chart(fuel_trends):
+    # Create subplot with two panels
+    fig = make_subplots(
+        rows=2, cols=1,
+        subplot_titles=('Average Price by Fuel Type Over Time',
+                        'Total Sales Volume by Fuel Type Over Time'),
+        vertical_spacing=0.12
+    )
+
+    # Add traces for each fuel type - Price
+    for fuel in fuel_trends['Fuel_Type'].unique():
+        fuel_df = fuel_trends[fuel_trends['Fuel_Type'] == fuel]
+        fig.add_trace(
+            go.Scatter(x=fuel_df['Year'], y=fuel_df['Price_USD'],
+                       name=fuel, mode='lines+markers',
+                       legendgroup=fuel, showlegend=True),
+            row=1, col=1
+        )
+
+    # Add traces for each fuel type - Sales
+    for fuel in fuel_trends['Fuel_Type'].unique():
+        fuel_df = fuel_trends[fuel_trends['Fuel_Type'] == fuel]
+        fig.add_trace(
+            go.Scatter(x=fuel_df['Year'], y=fuel_df['Sales_Volume'],
+                       name=fuel, mode='lines+markers',
+                       legendgroup=fuel, showlegend=False),
+            row=2, col=1
+        )
+
+    fig.update_xaxes(title_text="Year", row=2, col=1)
+    fig.update_yaxes(title_text="Average Price (USD)", row=1, col=1)
+    fig.update_yaxes(title_text="Total Sales Volume", row=2, col=1)
+
+    fig.update_layout(height=800, title_text="Electrification Impact Analysis (2010-2024)")
+    return fig
+
+
+def group_correlation_chart(stats, by):
+    """Mileage/price correlation per group from grouped_stats, one bar per group"""
+    stats = stats.reset_index()
+    stats[by] = stats[by].astype(str)
+    fig = px.bar(stats.sort_values('Correlation'),
+                 x='Correlation',
+                 y=by,
+                 orientation='h',
+                 color='Correlation',
+                 color_continuous_scale='RdBu',
+                 range_color=[-max(stats['Correlation'].abs().max(), 1e-9), max(stats['Correlation'].abs().max(), 1e-9)],
+                 hover_data={'Count': ':,', 'Covariance': ':,.0f'},
+                 title=f"Mileage vs. Price Correlation by {by.replace('_', ' ')}",
+                 labels={by: by.replace('_', ' ')})
+
+    fig.update_layout(height=max(350, min(22 * len(stats), 800)), yaxis=dict(type='category'))
+    return fig
+
+
+def mileage_price_scatter(scatter_df):
+    fig = px.scatter(scatter_df,
+                     x='Mileage_KM',
+                     y='Price_USD',
+                     color='Model_Segment',
+                     size='Sales_Volume',
+                     hover_data=['Model', 'Year', 'Fuel_Type'],
+                     title="Mileage vs. Price Across Model Segments",
+                     labels={'Mileage_KM': 'Mileage (KM)',
+                             'Price_USD': 'Price (USD)',
+                             'Model_Segment': 'Segment'},
+                     trendline="ols",
+                     opacity=0.4,  # Lower opacity
+                     color_discrete_sequence=['#1f77b4', '#ff7f0e', '#2ca02c'])  # Distinct colors
+
+    fig.update_traces(marker=dict(size=8, line=dict(width=0.5, color='white')))  # Add white borders
+    fig.update_layout(height=600)
+    return fig
+
+
+# Route Planner
+
+def delivery_route_map(depot, stops, summary):
+    """One line per delivery route from the depot through its stops and back"""
+    lat = np.concatenate([[depot[0]], stops['Latitude'].to_numpy()])
+    lon = np.concatenate([[depot[1]], stops['Longitude'].to_numpy()])
+    labels = np.concatenate([['Depot'], stops['Name'].astype(str).to_numpy()])
+    demand = np.concatenate([[0], stops['Demand'].to_numpy()])
+    palette = px.colors.qualitative.Bold
+
+    fig = go.Figure()
+    for number, route in enumerate(summary.loc[~summary['Full_Load_Trip'], 'Path']):
+        tour = [0] + list(route) + [0]
+        fig.add_trace(go.Scattermap(
+            lat=lat[tour], lon=lon[tour], mode='lines+markers',
+            line=dict(width=2, color=palette[number % len(palette)]),
+            marker=dict(size=7, color=palette[number % len(palette)]),
+            name=f"Route {number + 1}",
+            customdata=np.column_stack([labels[tour], demand[tour]]),
+            hovertemplate=f'Route {number + 1}<br>%{{customdata[0]}}<br>Demand: %{{customdata[1]}}<extra></extra>'
+        ))
+    fig.add_trace(go.Scattermap(
+        lat=[depot[0]], lon=[depot[1]], mode='markers', name='Depot',
+        marker=dict(size=18, color='#111111'), hovertemplate='Depot<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title="Delivery Routes",
+        height=600,
+        showlegend=len(summary) <= 20,
+        map=fit_map_view((lat.min(), lat.max(), lon.min(), lon.max())),
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+    return fig
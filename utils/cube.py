@@ -0,0 +1,145 @@
+"""
+Pre-aggregated sales cube - dense per-cell sums over the Dashboard's categorical dimensions
+
+Every Year x Model x Region x Fuel_Type x Transmission cell holds its record count, total
+sales volume and total price. Filtering is per-axis indexing and grouping is a sum over the
+remaining axes, so chart aggregates cost O(cells) (a few thousand) instead of O(rows).
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.aggregations import model_trend_stats, model_year_matrix
+from utils.data import DATA_PATH, dataset_key, load_shared_data
+from utils.encoding import codes, dictionary
+from utils.profiling import cache_miss
+
+DIMENSIONS = ['Year', 'Model', 'Region', 'Fuel_Type', 'Transmission']
+
+
+class SalesCube:
+    """Dense count / Sales_Volume / Price_USD sums indexed by DIMENSIONS.
+
+    Rows missing a dimension's label have no cell; dropped counts them.
+    """
+
+    def __init__(self, labels, counts, sales, price_sum, dropped=0):
+        self.labels = labels
+        self.counts = counts
+        self.sales = sales
+        self.price_sum = price_sum
+        self.dropped = dropped
+
+    @classmethod
+    def build(cls, df):
+        """Aggregate rows into the cube in a single pass over the dimensions' codes"""
+        labels = {dim: np.asarray(dictionary(df[dim])) for dim in DIMENSIONS}
+        shape = tuple(len(labels[d]) for d in DIMENSIONS)
+        dim_codes = [codes(df[dim]) for dim in DIMENSIONS]
+        # Missing labels have code -1, which no cell holds
+        valid = np.logical_and.reduce([c >= 0 for c in dim_codes])
+        flat = np.ravel_multi_index([c[valid] for c in dim_codes], shape)
+        size = int(np.prod(shape))
+
+        def cell_sum(weights=None):
+            weights = None if weights is None else weights[valid]
+            return np.bincount(flat, weights=weights, minlength=size).reshape(shape)
+
+        return cls(
+            labels=labels,
+            counts=cell_sum().astype(np.int64),
+            sales=cell_sum(df['Sales_Volume'].to_numpy()).astype(np.int64),
+            price_sum=cell_sum(df['Price_USD'].to_numpy(dtype=np.float64)),
+            dropped=int(len(df) - valid.sum()),
+        )
+
+    def _slice(self, selection):
+        """Cell arrays restricted to the selected labels of each dimension"""
+        index = []
+        for dim in DIMENSIONS:
+            allowed = selection.get(dim)
+            if allowed is None:
+                index.append(np.arange(len(self.labels[dim])))
+            else:
+                index.append(np.flatnonzero(np.isin(self.labels[dim], list(allowed))))
+        grid = np.ix_(*index)
+        labels = {dim: self.labels[dim][idx] for dim, idx in zip(DIMENSIONS, index)}
+        return labels, self.counts[grid], self.sales[grid], self.price_sum[grid]
+
+    def aggregate(self, by, selection):
+        """Group-by over the selected cells.
+
+        Returns one row per non-empty combination of the ``by`` dimensions with total
+        Sales_Volume, mean Price_USD and the number of underlying records (Records), the
+        same shape a row-level groupby would produce.
+        """
+        labels, counts, sales, price_sum = self._slice(selection)
+        keep = [DIMENSIONS.index(d) for d in by]
+        drop = tuple(i for i in range(len(DIMENSIONS)) if i not in keep)
+        # Summed axes disappear; reorder the remaining ones to match ``by``
+        order = np.argsort(np.argsort(keep))
+        counts, sales, price_sum = (a.sum(axis=drop).transpose(order)
+                                    for a in (counts, sales, price_sum))
+
+        keys = np.meshgrid(*[labels[d] for d in by], indexing='ij')
+        frame = pd.DataFrame({d: k.ravel() for d, k in zip(by, keys)})
+        frame['Sales_Volume'] = sales.ravel()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame['Price_USD'] = price_sum.ravel() / counts.ravel()
+        frame['Records'] = counts.ravel()
+        return frame[frame['Records'] > 0].reset_index(drop=True)
+
+    def kpis(self, selection):
+        """Totals behind the Dashboard KPIs that are derivable from cell sums"""
+        labels, counts, sales, price_sum = self._slice(selection)
+        records = counts.sum()
+        model_axis = tuple(i for i, d in enumerate(DIMENSIONS) if d != 'Model')
+        return {
+            'records': int(records),
+            'total_sales': sales.sum(),
+            'overall_sales': self.sales.sum(),
+            'avg_price': price_sum.sum() / records if records else float('nan'),
+            'overall_avg_price': self.price_sum.sum() / self.counts.sum(),
+            'unique_models': int((counts.sum(axis=model_axis) > 0).sum()),
+        }
+
+
+def combine_selection(sidebar, brushes, exclude=None):
+    """Intersect sidebar selections with chart brushes, skipping the ``exclude`` dimension.
+
+    Both arguments map dimension -> allowed labels. A chart excludes its own brush so it
+    keeps showing the alternatives while filtering every other chart.
+    """
+    selection = dict(sidebar)
+    for dim, labels in brushes.items():
+        if dim == exclude:
+            continue
+        allowed = set(labels)
+        current = selection.get(dim)
+        selection[dim] = [v for v in current if v in allowed] if current is not None else list(labels)
+    return selection
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_cube(source):
+    cache_miss('shared_cube')
+    return SalesCube.build(load_shared_data(source))
+
+
+def load_shared_cube(source=DATA_PATH):
+    """The SalesCube of the shared dataset, built once per process"""
+    return _shared_cube(str(source))
+
+
+@st.cache_data(show_spinner=False)
+def _model_year_sales(key, source):
+    cache_miss('model_year_sales')
+    cells = load_shared_cube(source).aggregate(['Model', 'Year'], {})
+    matrix = model_year_matrix(cells)
+    return matrix, model_trend_stats(matrix)
+
+
+def load_model_year_sales(source=DATA_PATH):
+    """Model x Year sales matrix and every model's trend statistics, cached per dataset version"""
+    return _model_year_sales(dataset_key(source), str(source))
@@ -0,0 +1,186 @@
+"""
+Data loading - read the BMW sales dataset and share it across sessions and processes
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from utils.catalog import DatasetCatalog, build_catalog
+from utils.encoding import encode_table
+from utils.profiling import cache_miss
+from utils.quality import QualityMonitor, QualityReport, validate
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_PATH = ROOT / 'assets' / 'BMWdata.csv'
+CACHE_DIR = Path(os.environ.get('PORTFOLIO_CACHE_DIR', ROOT / '.cache'))
+CSV_CHUNK_ROWS = 1_000_000
+
+
+def read_sales_csv(path=DATA_PATH, monitor=None):
+    """Parse a BMW sales CSV into a DataFrame.
+
+    With a QualityMonitor, the file is parsed in chunks and each chunk is validated as
+    soon as it is parsed.
+    """
+    if monitor is None:
+        return pd.read_csv(path)
+    chunks = []
+    with pd.read_csv(path, chunksize=CSV_CHUNK_ROWS) as reader:
+        for chunk in reader:
+            monitor.update(chunk)
+            chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+
+
+# Columnar cache: the CSV is converted once to an uncompressed Arrow IPC file that every
+# process memory-maps, so the OS page cache holds a single copy of the data. Text columns are
+# dictionary-encoded (utils.encoding), so they are stored and held as small integer codes.
+
+def dataset_key(source=DATA_PATH):
+    """Short hash identifying a dataset file version (path, size and modification time)"""
+    source = Path(source).resolve()
+    stat = source.stat()
+    return hashlib.sha1(f'{source}:{stat.st_size}:{stat.st_mtime_ns}'.encode()).hexdigest()[:12]
+
+
+def columnar_cache_path(source=DATA_PATH, cache_dir=CACHE_DIR):
+    """Arrow file for source, keyed by dataset_key"""
+    return Path(cache_dir) / f'{Path(source).stem}-{dataset_key(source)}.arrow'
+
+
+def quality_report_path(source=DATA_PATH, cache_dir=CACHE_DIR):
+    """Data quality report for source, stored beside its columnar cache"""
+    return Path(cache_dir) / f'{Path(source).stem}-{dataset_key(source)}.quality.json'
+
+
+def catalog_path(source=DATA_PATH, cache_dir=CACHE_DIR):
+    """Dataset catalog for source, stored beside its columnar cache"""
+    return Path(cache_dir) / f'{Path(source).stem}-{dataset_key(source)}.catalog.json'
+
+
+def _write_json(data, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp.write_text(json.dumps(data, default=float))
+    os.replace(tmp, path)
+    return path
+
+
+def write_quality_report(report, path):
+    return _write_json(report.to_dict(), path)
+
+
+def write_catalog(catalog, path):
+    return _write_json(catalog.to_dict(), path)
+
+
+def build_columnar_cache(source=DATA_PATH, path=None):
+    """Convert source to an Arrow IPC file laid out for zero-copy attachment.
+
+    The data is validated while it is parsed, and the quality report and dataset catalog
+    are written next to the Arrow file.
+    """
+    path = Path(path or columnar_cache_path(source))
+    monitor = QualityMonitor()
+    table = pa.Table.from_pandas(read_sales_csv(source, monitor), preserve_index=False)
+    write_quality_report(monitor.report(), path.with_suffix('.quality.json'))
+    write_catalog(build_catalog(table), path.with_suffix('.catalog.json'))
+    return write_columnar(table, path)
+
+
+def write_columnar(table, path):
+    """Write an Arrow table as an uncompressed IPC file that attach_columnar maps zero-copy.
+
+    Text columns are written dictionary-encoded against their sorted labels.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A single chunk per column lets to_pandas wrap the buffers without copying
+    table = encode_table(table.combine_chunks())
+    # Write then rename, so concurrent processes never attach a half-written file
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def attach_columnar(path):
+    """Memory-map an Arrow cache file as a read-only, zero-copy DataFrame.
+
+    Text columns become Categoricals over their dictionaries. Files written before text
+    columns were encoded are encoded on attach.
+    """
+    table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    return encode_table(table).to_pandas(split_blocks=True)
+
+
+def load_columnar(source=DATA_PATH):
+    """Attach the columnar cache for source, building it first if needed.
+
+    Arrow sources, such as checked-out dataset snapshots, are attached directly.
+    """
+    if Path(source).suffix == '.arrow':
+        return attach_columnar(source)
+    path = columnar_cache_path(source)
+    if not path.exists():
+        build_columnar_cache(source, path)
+    return attach_columnar(path)
+
+
+@st.cache_resource(show_spinner=False)
+def _shared_dataset(source):
+    cache_miss('shared_dataset')
+    return load_columnar(source)
+
+
+def load_shared_data(source=DATA_PATH):
+    """The BMW dataset, attached once per process and shared by every session.
+
+    Numeric columns are read-only views of the memory-mapped file and text columns are
+    Categoricals sharing one dictionary per column, so no session can modify the shared data.
+    Each caller gets a shallow copy, so adding or replacing columns stays local to that caller
+    without copying data.
+    """
+    return _shared_dataset(str(source)).copy(deep=False)
+
+
+@st.cache_data(show_spinner=False)
+def _quality_report(key, source):
+    cache_miss('quality_report')
+    path = quality_report_path(source)
+    if path.exists():
+        return QualityReport.from_dict(json.loads(path.read_text()))
+    # Columnar caches built before validation existed have no report yet
+    report = validate(load_shared_data(source))
+    write_quality_report(report, path)
+    return report
+
+
+def load_quality_report(source=DATA_PATH):
+    """Data quality report for the dataset version, produced when it was ingested"""
+    return _quality_report(dataset_key(source), str(source))
+
+
+@st.cache_data(show_spinner=False)
+def _catalog(key, source):
+    cache_miss('dataset_catalog')
+    path = catalog_path(source)
+    if path.exists():
+        return DatasetCatalog.from_dict(json.loads(path.read_text()))
+    # Snapshot checkouts and columnar caches built before the catalog existed have none yet
+    catalog = build_catalog(load_shared_data(source))
+    write_catalog(catalog, path)
+    return catalog
+
+
+def load_catalog(source=DATA_PATH):
+    """Dataset catalog (domains, bounds, totals, histograms) for the dataset version"""
+    return _catalog(dataset_key(source), str(source))
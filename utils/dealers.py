@@ -0,0 +1,211 @@
+"""
+Dealerships - spatially indexed dealer locations joined to regional sales
+
+Dealer points come from a local CSV with Latitude, Longitude and Region columns (plus optional
+Dealer_ID, Name and Weight). Each dealer is credited with a share of its region's filtered sales,
+proportional to its Weight, so the density map follows the Dashboard filters.
+
+Two indexes answer map queries without scanning every point:
+- a uniform lat/lon grid with points sorted by cell (CSR offsets), so a viewport reads only
+  the points in the cells it overlaps and bins their weights into density cells
+- a KD-tree over unit-sphere coordinates for nearest-dealer queries
+
+Usage (from the repository root):
+    python -m utils.dealers --rows 1000000 --output dealers_1m.csv   # synthetic dealer file
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy.spatial import cKDTree
+
+from utils.data import ROOT, dataset_key
+from utils.profiling import cache_miss
+
+DEALERS_PATH = Path(os.environ.get('PORTFOLIO_DEALERS_PATH', ROOT / 'assets' / 'dealerships.csv'))
+REQUIRED_COLUMNS = ['Latitude', 'Longitude', 'Region']
+GRID_DEGREES = 0.25
+DENSITY_BINS = 120
+EARTH_RADIUS_KM = 6371.0
+
+
+def read_dealers(path=DEALERS_PATH):
+    """Parse a dealer CSV, filling optional columns and dropping rows without coordinates"""
+    dealers = pd.read_csv(path)
+    missing = [c for c in REQUIRED_COLUMNS if c not in dealers.columns]
+    if missing:
+        raise ValueError(f"Dealer file is missing columns: {', '.join(missing)}")
+    dealers = dealers.dropna(subset=['Latitude', 'Longitude'])
+    dealers = dealers[dealers['Latitude'].between(-90, 90) & dealers['Longitude'].between(-180, 180)]
+    if 'Dealer_ID' not in dealers:
+        dealers['Dealer_ID'] = np.arange(len(dealers))
+    if 'Weight' not in dealers:
+        dealers['Weight'] = 1.0
+    return dealers.reset_index(drop=True)
+
+
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+class DealerIndex:
+    """Grid and KD-tree indexes over dealer points, with per-point region codes and weights"""
+
+    def __init__(self, dealers, grid=GRID_DEGREES):
+        self.grid = grid
+        self.n_rows = int(np.ceil(180 / grid))
+        self.n_cols = int(np.ceil(360 / grid))
+        row = np.minimum(((dealers['Latitude'].to_numpy() + 90) / grid).astype(np.int64), self.n_rows - 1)
+        col = np.minimum(((dealers['Longitude'].to_numpy() + 180) / grid).astype(np.int64), self.n_cols - 1)
+        cell = row * self.n_cols + col
+
+        # Sort points by cell; cell_start[c]:cell_start[c + 1] are the points in cell c
+        order = np.argsort(cell, kind='stable')
+        self.dealers = dealers.iloc[order].reset_index(drop=True)
+        self.lat = self.dealers['Latitude'].to_numpy(dtype=np.float64)
+        self.lon = self.dealers['Longitude'].to_numpy(dtype=np.float64)
+        self.region_codes, self.regions = pd.factorize(self.dealers['Region'], sort=True)
+        self.base_weight = self.dealers['Weight'].to_numpy(dtype=np.float64)
+        self.cell_start = np.searchsorted(cell[order], np.arange(self.n_rows * self.n_cols + 1))
+        self.tree = cKDTree(unit_vectors(self.lat, self.lon))
+
+    def __len__(self):
+        return len(self.dealers)
+
+    def point_weights(self, region_sales):
+        """Sales credited to each dealer: its region's sales split in proportion to Weight.
+
+        region_sales maps Region -> Sales_Volume for the current filters.
+        """
+        region_totals = np.bincount(self.region_codes, weights=self.base_weight,
+                                    minlength=len(self.regions))
+        sales = pd.Series(region_sales).reindex(self.regions).fillna(0).to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            per_weight = np.where(region_totals > 0, sales / region_totals, 0.0)
+        return self.base_weight * per_weight[self.region_codes]
+
+    def viewport(self, bounds):
+        """Indices of the points inside bounds = (lat_min, lat_max, lon_min, lon_max).
+
+        Only the grid rows and column spans overlapping the viewport are read; points in
+        boundary cells are then filtered exactly.
+        """
+        lat_min, lat_max, lon_min, lon_max = bounds
+        r0 = max(int((lat_min + 90) // self.grid), 0)
+        r1 = min(int((lat_max + 90) // self.grid), self.n_rows - 1)
+        c0 = max(int((lon_min + 180) // self.grid), 0)
+        c1 = min(int((lon_max + 180) // self.grid), self.n_cols - 1)
+        if r0 > r1 or c0 > c1:
+            return np.array([], dtype=np.int64)
+        rows = np.arange(r0, r1 + 1) * self.n_cols
+        starts = self.cell_start[rows + c0]
+        ends = self.cell_start[rows + c1 + 1]
+        lengths = ends - starts
+        # Concatenate the per-row index ranges without a Python loop
+        idx = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) \
+            + np.arange(lengths.sum())
+        inside = ((self.lat[idx] >= lat_min) & (self.lat[idx] <= lat_max) &
+                  (self.lon[idx] >= lon_min) & (self.lon[idx] <= lon_max))
+        return idx[inside]
+
+    def density(self, bounds, weights, bins=DENSITY_BINS):
+        """Summed weights on a bins x bins grid over the viewport, as non-empty lat/lon/z cells"""
+        idx = self.viewport(bounds)
+        lat_min, lat_max, lon_min, lon_max = bounds
+        lat_step = (lat_max - lat_min) / bins or 1.0
+        lon_step = (lon_max - lon_min) / bins or 1.0
+        row = np.minimum(((self.lat[idx] - lat_min) / lat_step).astype(np.int64), bins - 1)
+        col = np.minimum(((self.lon[idx] - lon_min) / lon_step).astype(np.int64), bins - 1)
+        z = np.bincount(row * bins + col, weights=weights[idx], minlength=bins * bins)
+        count = np.bincount(row * bins + col, minlength=bins * bins)
+        cells = np.flatnonzero(count)
+        return pd.DataFrame({
+            'lat': lat_min + (cells // bins + 0.5) * lat_step,
+            'lon': lon_min + (cells % bins + 0.5) * lon_step,
+            'Sales': z[cells],
+            'Dealers': count[cells],
+        })
+
+    def nearest(self, lat, lon, k=5):
+        """The k dealers closest to (lat, lon), with great-circle distance in km"""
+        k = min(k, len(self))
+        chord, idx = self.tree.query(unit_vectors([lat], [lon])[0], k=k)
+        idx = np.atleast_1d(idx)
+        return self.dealers.iloc[idx].assign(Distance_KM=_chord_to_km(np.atleast_1d(chord)), _index=idx)
+
+
+@st.cache_resource(show_spinner=False)
+def _dealer_index(key, path):
+    cache_miss('dealer_index')
+    return DealerIndex(read_dealers(path))
+
+
+def load_dealer_index(path=DEALERS_PATH):
+    """The spatial index for the dealer file, built once per file version; None without a file"""
+    if not Path(path).exists():
+        return None
+    return _dealer_index(dataset_key(path), str(path))
+
+
+# Synthetic dealer networks for demos and scale tests
+
+# (Region, latitude, longitude, relative size) of metropolitan areas dealers cluster around
+METRO_AREAS = [
+    ('North America', 40.7, -74.0, 5), ('North America', 34.1, -118.2, 4), ('North America', 41.9, -87.6, 3),
+    ('North America', 29.8, -95.4, 2), ('North America', 43.7, -79.4, 2), ('North America', 19.4, -99.1, 2),
+    ('North America', 47.6, -122.3, 1), ('North America', 25.8, -80.2, 2),
+    ('South America', -23.5, -46.6, 4), ('South America', -34.6, -58.4, 3), ('South America', -33.4, -70.6, 2),
+    ('South America', 4.7, -74.1, 2), ('South America', -12.0, -77.0, 1), ('South America', -22.9, -43.2, 2),
+    ('Europe', 48.1, 11.6, 5), ('Europe', 52.5, 13.4, 4), ('Europe', 51.5, -0.1, 4), ('Europe', 48.9, 2.4, 3),
+    ('Europe', 45.5, 9.2, 3), ('Europe', 40.4, -3.7, 2), ('Europe', 52.2, 21.0, 2), ('Europe', 59.3, 18.1, 1),
+    ('Africa', -26.2, 28.0, 4), ('Africa', 30.0, 31.2, 3), ('Africa', 6.5, 3.4, 2), ('Africa', -1.3, 36.8, 2),
+    ('Africa', 33.6, -7.6, 2), ('Africa', -33.9, 18.4, 2),
+    ('Middle East', 25.2, 55.3, 4), ('Middle East', 24.7, 46.7, 3), ('Middle East', 41.0, 29.0, 3),
+    ('Middle East', 35.7, 51.4, 2), ('Middle East', 32.1, 34.8, 2), ('Middle East', 29.4, 48.0, 1),
+    ('Asia', 31.2, 121.5, 5), ('Asia', 39.9, 116.4, 4), ('Asia', 35.7, 139.7, 4), ('Asia', 37.6, 127.0, 3),
+    ('Asia', 22.3, 114.2, 2), ('Asia', 1.35, 103.8, 2), ('Asia', 19.1, 72.9, 3), ('Asia', -33.9, 151.2, 2),
+]
+
+
+def generate_dealers(n_rows, seed=42):
+    """Dealers scattered around METRO_AREAS, with lognormal weights"""
+    rng = np.random.default_rng(seed)
+    metros = pd.DataFrame(METRO_AREAS, columns=['Region', 'lat', 'lon', 'size'])
+    pick = rng.choice(len(metros), size=n_rows, p=metros['size'] / metros['size'].sum())
+    spread = rng.exponential(1.5, n_rows)
+    angle = rng.uniform(0, 2 * np.pi, n_rows)
+    lat = np.clip(metros['lat'].to_numpy()[pick] + spread * np.sin(angle), -89.9, 89.9)
+    lon = (metros['lon'].to_numpy()[pick] + spread * np.cos(angle) / np.cos(np.radians(lat)) + 180) % 360 - 180
+    return pd.DataFrame({
+        'Dealer_ID': np.arange(1, n_rows + 1),
+        'Name': [f'BMW Dealer {i:07d}' for i in range(1, n_rows + 1)],
+        'Region': metros['Region'].to_numpy()[pick],
+        'Latitude': lat.round(5),
+        'Longitude': lon.round(5),
+        'Weight': rng.lognormal(0, 0.5, n_rows).round(3),
+    })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic dealer location file")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--output', type=Path, required=True)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+    generate_dealers(args.rows, args.seed).to_csv(args.output, index=False)
+    print(f"Wrote {args.rows:,} dealers to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Price elasticity - per-segment estimates and vectorized what-if scenario evaluation
+
+Each Model x Region segment gets a constant-elasticity demand curve
+Sales_Volume ~ Price_USD ** elasticity, estimated by a within-segment log-log regression.
+Scenarios are evaluated for every segment at once as (scenarios, segments) arrays.
+"""
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data import DATA_PATH, dataset_key, load_shared_data
+from utils.profiling import cache_miss
+
+SEGMENT_DIMENSIONS = ['Model', 'Region']
+
+# Pseudo-records pulling small segments toward the pooled elasticity
+SHRINKAGE_RECORDS = 100
+
+
+def estimate_elasticities(df, shrinkage=SHRINKAGE_RECORDS):
+    """One row per segment with its elasticity and baseline volume, price and revenue.
+
+    The slope of log(volume) on log(price) comes from per-segment sufficient statistics
+    (counts and sums of x, y, x^2, xy) gathered in one bincount pass over the rows. Rows
+    missing a segment label belong to no segment.
+    """
+    labelled = df[SEGMENT_DIMENSIONS].notna().all(axis=1).to_numpy()
+    if not labelled.all():
+        df = df[labelled]
+    codes, keys = pd.MultiIndex.from_frame(df[SEGMENT_DIMENSIONS]).factorize(sort=True)
+    n_segments = len(keys)
+    x = np.log(df['Price_USD'].to_numpy(dtype=np.float64))
+    y = np.log(df['Sales_Volume'].to_numpy(dtype=np.float64))
+
+    def total(weights=None):
+        return np.bincount(codes, weights=weights, minlength=n_segments)
+
+    n, sx, sy, sxx, sxy = total(), total(x), total(y), total(x * x), total(x * y)
+    sxx_c = sxx - sx * sx / n
+    sxy_c = sxy - sx * sy / n
+    pooled = sxy_c.sum() / sxx_c.sum()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(sxx_c > 0, sxy_c / sxx_c, pooled)
+    elasticity = (n * slope + shrinkage * pooled) / (n + shrinkage)
+
+    volume = df['Sales_Volume'].to_numpy(dtype=np.float64)
+    revenue = total(volume * df['Price_USD'].to_numpy(dtype=np.float64))
+    base_volume = total(volume)
+
+    segments = pd.DataFrame(keys.tolist(), columns=SEGMENT_DIMENSIONS)
+    segments['Records'] = n.astype(np.int64)
+    segments['Elasticity'] = elasticity
+    segments['Base_Volume'] = base_volume
+    segments['Base_Revenue'] = revenue
+    segments['Avg_Price'] = revenue / base_volume
+    return segments
+
+
+def simulate(segments, price_changes):
+    """Project volume and revenue for each scenario and segment.
+
+    price_changes is a (scenarios, segments) array of fractional price changes (0.05 = +5%),
+    or anything that broadcasts to it. Returns (volume, revenue) arrays of that shape.
+    """
+    factor = 1 + np.asarray(price_changes, dtype=np.float64)
+    volume = segments['Base_Volume'].to_numpy() * factor ** segments['Elasticity'].to_numpy()
+    revenue = segments['Base_Revenue'].to_numpy() * factor * factor ** segments['Elasticity'].to_numpy()
+    return volume, revenue
+
+
+@st.cache_data(show_spinner=False)
+def _elasticities_for(key, source):
+    cache_miss('elasticities')
+    return estimate_elasticities(load_shared_data(source))
+
+
+def load_elasticities(source=DATA_PATH):
+    """Segment elasticities for the shared dataset, cached per dataset hash"""
+    return _elasticities_for(dataset_key(source), str(source))
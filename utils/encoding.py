@@ -0,0 +1,116 @@
+"""
+Dictionary encoding - text columns held as small integer codes into one dictionary per column
+
+Model, Region, Color, Fuel_Type, Transmission and Sales_Classification repeat a handful of
+labels over every row. The columnar cache stores each as Arrow dictionary<int8, string>
+whose dictionary is the column's sorted distinct labels - the same order as the catalog's
+domain, so code i of a column is always catalog.domain(column)[i]. Attached frames hold
+them as pandas Categoricals; the dictionary (CategoricalDtype) is created once per process
+and shared by every session and every frame filtered from the shared dataset.
+
+Filters and group-bys then run on the codes: a label filter becomes a boolean table over the
+dictionary indexed by the codes, and grouping bins codes directly. Labels are decoded only
+when results are rendered.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def is_text(data_type):
+    """True for Arrow string types and dictionaries of strings"""
+    if pa.types.is_dictionary(data_type):
+        data_type = data_type.value_type
+    return pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+
+
+def index_type(size):
+    """Smallest signed integer type holding codes of a size-label dictionary"""
+    for bits, data_type in ((8, pa.int8()), (16, pa.int16())):
+        if size < 2 ** (bits - 1):
+            return data_type
+    return pa.int32()
+
+
+def encode_column(column, labels=None):
+    """Dictionary-encoded copy of a text column against labels (default: its sorted distinct values)"""
+    values = column.cast(pa.string())
+    if labels is None:
+        distinct = pc.unique(values).drop_null()
+        labels = distinct.take(pc.sort_indices(distinct))
+    labels = pa.array(labels, type=pa.string())
+    indices = pc.index_in(values, value_set=labels).cast(index_type(len(labels)))
+    if isinstance(indices, pa.ChunkedArray):
+        indices = indices.combine_chunks()
+    return pa.DictionaryArray.from_arrays(indices, labels)
+
+
+def _is_sorted_dictionary(column):
+    if not pa.types.is_dictionary(column.type) or column.num_chunks != 1:
+        return False
+    labels = column.chunk(0).dictionary
+    return labels.equals(labels.take(pc.sort_indices(labels)))
+
+
+def encode_table(table):
+    """table with every text column dictionary-encoded against its sorted labels.
+
+    Columns already encoded that way, such as those of a columnar cache, are left as they are.
+    """
+    columns = [column if not is_text(column.type) or _is_sorted_dictionary(column) else encode_column(column)
+               for column in table.columns]
+    return pa.table(columns, names=table.column_names)
+
+
+def decode_table(table):
+    """table with every text column, dictionary-encoded or not, as plain large_string - the type
+    pandas text columns convert to, so decoded tables of any origin share one schema"""
+    columns = [column.cast(pa.large_string()) if is_text(column.type) else column
+               for column in table.columns]
+    return pa.table(columns, names=table.column_names)
+
+
+def is_encoded(series):
+    return isinstance(series.dtype, pd.CategoricalDtype)
+
+
+def factorize(series):
+    """(codes, labels) of a series: its own codes and categories when dictionary-encoded,
+    otherwise codes into its sorted distinct values. Missing values get code -1."""
+    if is_encoded(series):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    series_codes, labels = pd.factorize(series, sort=True)
+    return series_codes, pd.Index(labels)
+
+
+def dictionary(series):
+    """Labels of a series' codes"""
+    return series.cat.categories if is_encoded(series) else factorize(series)[1]
+
+
+def codes(series):
+    """Integer code of every value in dictionary(series); -1 for missing values"""
+    return series.cat.codes.to_numpy() if is_encoded(series) else factorize(series)[0]
+
+
+def recode(series, labels):
+    """Code of every value in labels (-1 where absent), mapped once per dictionary entry"""
+    series_codes, series_labels = factorize(series)
+    return np.append(pd.Index(labels).get_indexer(series_labels), -1)[series_codes]
+
+
+def label_mask(series, labels):
+    """Boolean mask of the values in labels, from a lookup table over the dictionary"""
+    if not is_encoded(series):
+        return series.isin(labels).to_numpy()
+    table = np.append(series.cat.categories.isin(list(labels)), False)
+    return table[series.cat.codes.to_numpy()]
+
+
+def decode_labels(frame):
+    """frame with encoded columns turned back into labels, for small results about to be rendered"""
+    labels = {col: frame[col].astype(frame[col].cat.categories.dtype)
+              for col in frame.columns if is_encoded(frame[col])}
+    return frame.assign(**labels) if labels else frame
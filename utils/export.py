@@ -0,0 +1,258 @@
+"""
+Export service - streamed data downloads and chart images rendered off the script thread
+
+Data exports never serialize the whole frame at once: rows are encoded in chunks by a
+generator and compressed as they go (gzip for CSV, zstd row groups for Parquet), so memory
+holds one uncompressed chunk plus the compressed output. Download buttons receive a
+callable, which Streamlit runs on its own thread only when the button is clicked.
+
+Chart exports (PNG, SVG, HTML) are rendered by a small worker pool shared by all sessions.
+Results are cached by chart and filter state, and concurrent requests for the same image
+wait on one render instead of starting another.
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import io
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import streamlit as st
+
+from utils.data import DATA_PATH, dataset_key, load_shared_data
+
+# Rows encoded per chunk
+CHUNK_ROWS = 50_000
+
+DATA_FORMATS = {
+    'csv': {'label': 'CSV (gzip)', 'extension': '.csv.gz', 'mime': 'application/gzip'},
+    'parquet': {'label': 'Parquet', 'extension': '.parquet', 'mime': 'application/vnd.apache.parquet'},
+}
+CHART_FORMATS = {
+    'png': {'label': 'PNG', 'mime': 'image/png'},
+    'svg': {'label': 'SVG', 'mime': 'image/svg+xml'},
+    'html': {'label': 'HTML', 'mime': 'text/html'},
+}
+
+# Chart renders run at most EXPORT_WORKERS at a time, and rendered files are kept up to
+# CACHE_BYTES in total
+EXPORT_WORKERS = 2
+CACHE_BYTES = 64 * 1024 * 1024
+IMAGE_SIZE = (1200, 700)
+
+
+def csv_chunks(df, chunk_rows=CHUNK_ROWS, level=3):
+    """Gzip-compressed CSV of df, yielded as compressed byte chunks.
+
+    Chunks are encoded by Arrow's CSV writer, about ten times faster than DataFrame.to_csv;
+    gzip level 3 is roughly three times faster than the default for files ~12% larger.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for start in range(0, max(len(df), 1), chunk_rows):
+        text = io.BytesIO()
+        pacsv.write_csv(pa.Table.from_pandas(df.iloc[start:start + chunk_rows], schema=schema,
+                                             preserve_index=False),
+                        text, pacsv.WriteOptions(include_header=start == 0))
+        block = compressor.compress(text.getvalue())
+        if block:
+            yield block
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands its bytes over whenever drained"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def parquet_chunks(df, chunk_rows=CHUNK_ROWS, compression='zstd'):
+    """Parquet file of df with one compressed row group per chunk, yielded as written"""
+    sink = _ChunkSink()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        for start in range(0, len(df), chunk_rows):
+            writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk_rows],
+                                                    schema=schema, preserve_index=False))
+            block = sink.drain()
+            if block:
+                yield block
+    yield sink.drain()
+
+
+def export_chunks(df, fmt, chunk_rows=CHUNK_ROWS):
+    """Byte chunks of df in a DATA_FORMATS format"""
+    if fmt == 'csv':
+        return csv_chunks(df, chunk_rows)
+    if fmt == 'parquet':
+        return parquet_chunks(df, chunk_rows)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file over an iterator of byte chunks, pulled only as it is read"""
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def data_download(df, fmt):
+    """Deferred download data: a callable streaming df in fmt when the button is clicked"""
+    return lambda: ChunkStream(export_chunks(df, fmt))
+
+
+def image_export_available():
+    """True when kaleido, which renders Plotly figures to PNG and SVG, is installed"""
+    return importlib.util.find_spec('kaleido') is not None
+
+
+def chart_formats():
+    """CHART_FORMATS that can be rendered in this environment"""
+    return [fmt for fmt in CHART_FORMATS if fmt == 'html' or image_export_available()]
+
+
+def render_chart(fig, fmt, size=IMAGE_SIZE):
+    """Bytes of fig as a CHART_FORMATS file"""
+    if fmt == 'html':
+        return fig.to_html(include_plotlyjs='cdn', full_html=True).encode('utf-8')
+    if fmt in ('png', 'svg'):
+        return fig.to_image(format=fmt, width=size[0], height=size[1])
+    raise ValueError(f"Unknown chart format: {fmt}")
+
+
+def filter_state_key(source=DATA_PATH, selection=None, price_range=None, *extra):
+    """Short hash of a dataset version, a filter state and any chart options"""
+    frozen = tuple(sorted((dim, tuple(labels)) for dim, labels in (selection or {}).items()
+                          if labels is not None))
+    return hashlib.sha1(repr((dataset_key(source), frozen, price_range, extra)).encode()).hexdigest()[:16]
+
+
+class ChartExporter:
+    """Bounded pool rendering chart files, with an LRU cache of the results by key"""
+
+    def __init__(self, max_workers=EXPORT_WORKERS, cache_bytes=CACHE_BYTES):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chart-export')
+        self._cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.renders = 0
+        self.hits = 0
+
+    def submit(self, key, fig, fmt):
+        """Future of fig rendered as fmt, shared with any render of the same key in flight"""
+        key = (key, fmt)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                future = Future()
+                future.set_result(self._cache[key])
+                return future
+            if key in self._pending:
+                return self._pending[key]
+            future = self._pool.submit(self._render, key, fig, fmt)
+            self._pending[key] = future
+            return future
+
+    def render(self, key, fig, fmt, timeout=120):
+        """Rendered bytes of fig, waiting for the pool if needed"""
+        return self.submit(key, fig, fmt).result(timeout=timeout)
+
+    def download(self, key, get_figure, fmt):
+        """Deferred download data rendering get_figure() in the pool when the button is clicked.
+
+        The figure is looked up at click time, so charts still being computed when the button
+        is laid out can be exported.
+        """
+        return lambda: self.render(key, get_figure(), fmt)
+
+    def _render(self, key, fig, fmt):
+        try:
+            data = render_chart(fig, fmt)
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+            raise
+        with self._lock:
+            self._pending.pop(key, None)
+            self.renders += 1
+            self._cache[key] = data
+            while sum(len(v) for v in self._cache.values()) > self._cache_bytes and len(self._cache) > 1:
+                self._cache.popitem(last=False)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {'renders': self.renders, 'hits': self.hits, 'cached': len(self._cache),
+                    'cached_bytes': sum(len(v) for v in self._cache.values()),
+                    'in_flight': len(self._pending)}
+
+
+@st.cache_resource(show_spinner=False)
+def get_chart_exporter():
+    """The chart export pool shared by all sessions of this server"""
+    return ChartExporter()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the dataset to a compressed CSV or Parquet file")
+    parser.add_argument('output', type=Path)
+    parser.add_argument('--format', choices=list(DATA_FORMATS), default='parquet')
+    parser.add_argument('--source', type=Path, default=DATA_PATH)
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    df = load_shared_data(args.source)
+    written = 0
+    with open(args.output, 'wb') as f:
+        for chunk in export_chunks(df, args.format, args.chunk_rows):
+            f.write(chunk)
+            written += len(chunk)
+    print(f"Wrote {len(df):,} rows to {args.output} ({written / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
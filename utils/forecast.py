@@ -0,0 +1,117 @@
+"""
+Sales forecasting - batched damped-trend exponential smoothing over every yearly series
+
+Each Model x Region x Fuel_Type combination is one yearly Sales_Volume series. All series
+are fitted at once: the smoothing recursions run over time with numpy arrays of shape
+(parameter grid, series), and each series keeps the grid point with the lowest one-step
+squared error.
+"""
+
+from itertools import product
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data import DATA_PATH, dataset_key, load_shared_data
+from utils.profiling import cache_miss
+
+SERIES_DIMENSIONS = ['Model', 'Region', 'Fuel_Type']
+DEFAULT_HORIZON = 3
+Z_95 = 1.959964
+
+ALPHAS = np.linspace(0.05, 0.95, 10)
+BETAS = np.array([0.01, 0.05, 0.1, 0.2, 0.3])
+PHIS = np.array([0.8, 0.9, 0.98])
+
+
+def yearly_panel(df):
+    """Series keys, years and an (n_series, n_years) matrix of yearly Sales_Volume"""
+    wide = (df.groupby(SERIES_DIMENSIONS + ['Year'])['Sales_Volume'].sum()
+              .unstack('Year', fill_value=0)
+              .sort_index(axis=1))
+    keys = wide.index.to_frame(index=False)
+    return keys, wide.columns.to_numpy(), wide.to_numpy(dtype=np.float64)
+
+
+def _fit_batch(values, horizon):
+    """Grid-search damped Holt smoothing for a batch of series; returns (mean, variance)"""
+    grid = np.array(list(product(ALPHAS, BETAS, PHIS)))
+    alpha, beta, phi = (grid[:, i, None] for i in range(3))
+
+    n_series, n_years = values.shape
+    level = np.broadcast_to(values[:, 0], (len(grid), n_series)).copy()
+    # A single year gives no slope to start from
+    initial_trend = values[:, 1] - values[:, 0] if n_years > 1 else np.zeros(n_series)
+    trend = np.broadcast_to(initial_trend, (len(grid), n_series)).copy()
+    sse = np.zeros((len(grid), n_series))
+    for t in range(1, n_years):
+        y = values[:, t]
+        error = y - (level + phi * trend)
+        sse += error ** 2
+        new_level = alpha * y + (1 - alpha) * (level + phi * trend)
+        trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        level = new_level
+
+    best = sse.argmin(axis=0)
+    cols = np.arange(n_series)
+    a, b, p = alpha[best, 0], beta[best, 0], phi[best, 0]
+    level, trend = level[best, cols], trend[best, cols]
+    sigma2 = sse[best, cols] / max(n_years - 3, 1)
+
+    steps = np.arange(1, horizon + 1)
+    # Cumulative damping phi + phi^2 + ... + phi^h for each series and step
+    damping = np.cumsum(p[:, None] ** steps[None, :], axis=1)
+    mean = np.maximum(level[:, None] + damping * trend[:, None], 0)
+    # Forecast-error variance multiplier 1 + sum_{j<h} (alpha + alpha*beta*damping_j)^2
+    c = (a[:, None] + a[:, None] * b[:, None] * damping) ** 2
+    multiplier = 1 + np.concatenate([np.zeros((n_series, 1)), np.cumsum(c, axis=1)[:, :-1]], axis=1)
+    return mean, sigma2[:, None] * multiplier
+
+
+class SalesForecast:
+    """Per-series forecasts with variances, aggregable over any series selection"""
+
+    def __init__(self, keys, years, mean, variance):
+        self.keys = keys
+        self.years = years
+        self.mean = mean
+        self.variance = variance
+
+    @classmethod
+    def fit(cls, df, horizon=DEFAULT_HORIZON):
+        """Fit every series in df"""
+        keys, years, values = yearly_panel(df)
+        mean, variance = _fit_batch(values, horizon)
+        forecast_years = years[-1] + np.arange(1, horizon + 1)
+        return cls(keys, forecast_years, mean, variance)
+
+    def total(self, selection):
+        """Summed forecast with a 95% band for the series matching selection.
+
+        selection maps dimension -> allowed labels; series errors are treated as independent.
+        """
+        mask = np.ones(len(self.keys), dtype=bool)
+        for dim in SERIES_DIMENSIONS:
+            allowed = selection.get(dim)
+            if allowed is not None:
+                mask &= self.keys[dim].isin(allowed).to_numpy()
+        mean = self.mean[mask].sum(axis=0)
+        half_width = Z_95 * np.sqrt(self.variance[mask].sum(axis=0))
+        return pd.DataFrame({
+            'Year': self.years,
+            'Forecast': mean,
+            'Lower': np.maximum(mean - half_width, 0),
+            'Upper': mean + half_width,
+        })
+
+
+@st.cache_data(show_spinner=False)
+def _forecast_for(key, source, horizon):
+    cache_miss('sales_forecast')
+    return SalesForecast.fit(load_shared_data(source), horizon)
+
+
+def load_forecast(source=DATA_PATH, horizon=DEFAULT_HORIZON):
+    """Forecasts for the shared dataset, cached per dataset hash"""
+    return _forecast_for(dataset_key(source), str(source), horizon)
@@ -0,0 +1,189 @@
+"""
+Geography - region geometries and per-region aggregates for map traces
+
+Region outlines ship in assets/regions.geojson. They are simplified once (Douglas-Peucker)
+and written under static/, which Streamlit serves as static files, so map traces reference
+the geometry by URL: the browser downloads and caches it once, and each rerender sends only
+the per-region values. Without static serving the simplified geometry is embedded instead.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.aggregations import apply_selection
+from utils.cube import load_shared_cube
+from utils.data import DATA_PATH, ROOT, dataset_key, load_shared_data
+from utils.profiling import cache_miss
+
+REGIONS_GEOJSON = ROOT / 'assets' / 'regions.geojson'
+STATIC_DIR = ROOT / 'static' / 'geo'
+STATIC_URL = 'app/static/geo'
+LOCATION_KEY = 'properties.Region'
+
+# Simplification tolerance in degrees; outlines are drawn at continental scale
+SIMPLIFY_TOLERANCE = 0.5
+
+# Optional point coordinates; when present, density maps bin records instead of using centroids
+LOCATION_COLUMNS = ['Latitude', 'Longitude']
+DENSITY_CELL_DEGREES = 1.0
+
+
+def simplify_ring(ring, tolerance=SIMPLIFY_TOLERANCE):
+    """Douglas-Peucker simplification of a closed ring of (lon, lat) points"""
+    points = np.asarray(ring, dtype=np.float64)
+    if len(points) <= 4:
+        return points.tolist()
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        segment = points[start + 1:end]
+        direction = b - a
+        length = np.hypot(*direction)
+        if length == 0:
+            distance = np.hypot(*(segment - a).T)
+        else:
+            distance = np.abs(np.cross(direction, segment - a)) / length
+        farthest = int(distance.argmax())
+        if distance[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack += [(start, split), (split, end)]
+    simplified = points[keep]
+    # A ring needs at least three distinct points
+    return (simplified if len(simplified) >= 4 else points).tolist()
+
+
+def simplify_geometry(geojson, tolerance=SIMPLIFY_TOLERANCE):
+    """Copy of a (Multi)Polygon FeatureCollection with every ring simplified"""
+    features = []
+    for feature in geojson['features']:
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        coordinates = [[simplify_ring(ring, tolerance) for ring in polygon] for polygon in polygons]
+        features.append({**feature, 'geometry': {'type': 'MultiPolygon', 'coordinates': coordinates}})
+    return {**geojson, 'features': features}
+
+
+def region_centroids(geojson):
+    """Area-weighted centroid of every region's outer rings, as a Region/lat/lon frame"""
+    rows = []
+    for feature in geojson['features']:
+        total_area, cx, cy = 0.0, 0.0, 0.0
+        for polygon in feature['geometry']['coordinates']:
+            x, y = np.asarray(polygon[0], dtype=np.float64).T
+            cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+            area = cross.sum() / 2
+            if area == 0:
+                continue
+            cx += ((x[:-1] + x[1:]) * cross).sum() / 6
+            cy += ((y[:-1] + y[1:]) * cross).sum() / 6
+            total_area += area
+        rows.append({'Region': feature['properties']['Region'],
+                     'lat': cy / total_area, 'lon': cx / total_area})
+    return pd.DataFrame(rows)
+
+
+def region_bounds(geojson):
+    """(lat_min, lat_max, lon_min, lon_max) of every region's outline"""
+    bounds = {}
+    for feature in geojson['features']:
+        points = np.concatenate([np.asarray(ring, dtype=np.float64)
+                                 for polygon in feature['geometry']['coordinates'] for ring in polygon])
+        lon, lat = points.T
+        bounds[feature['properties']['Region']] = (lat.min(), lat.max(), lon.min(), lon.max())
+    return bounds
+
+
+class RegionGeometry:
+    """Simplified region outlines, their centroids and bounds, and the static URL they are served from"""
+
+    def __init__(self, geojson, centroids, url):
+        self.geojson = geojson
+        self.centroids = centroids
+        self.bounds = region_bounds(geojson)
+        self.url = url
+
+    def trace_geojson(self):
+        """What a map trace's geojson attribute should carry: the URL when served, else the data"""
+        if self.url is not None and st.get_option('server.enableStaticServing'):
+            return self.url
+        return self.geojson
+
+
+@st.cache_resource(show_spinner=False)
+def load_region_geometry(path=str(REGIONS_GEOJSON), tolerance=SIMPLIFY_TOLERANCE):
+    """Region geometry simplified once per process and published as a static file"""
+    cache_miss('region_geometry')
+    raw = open(path, 'rb').read()
+    geojson = simplify_geometry(json.loads(raw), tolerance)
+    # The file name carries a content hash, so browsers never reuse a stale cached copy
+    digest = hashlib.sha1(raw + str(tolerance).encode()).hexdigest()[:12]
+    name = f'regions-{digest}.geojson'
+    url = None
+    try:
+        STATIC_DIR.mkdir(parents=True, exist_ok=True)
+        target = STATIC_DIR / name
+        if not target.exists():
+            tmp = target.with_suffix('.tmp')
+            tmp.write_text(json.dumps(geojson, separators=(',', ':')))
+            tmp.replace(target)
+        url = f'{STATIC_URL}/{name}'
+    except OSError:
+        pass
+    return RegionGeometry(geojson, region_centroids(geojson), url)
+
+
+def region_metrics(data):
+    """Sales volume, average price and record count per Region from rows or cube cells"""
+    if 'Records' in data:
+        # Cube cells carry a mean price per cell; weight it by the cell's record count
+        weighted = data.assign(Price_Total=data['Price_USD'] * data['Records'])
+        grouped = weighted.groupby('Region')[['Sales_Volume', 'Price_Total', 'Records']].sum()
+    else:
+        grouped = data.groupby('Region').agg(Sales_Volume=('Sales_Volume', 'sum'),
+                                             Price_Total=('Price_USD', 'sum'),
+                                             Records=('Price_USD', 'size'))
+    grouped['Avg_Price'] = grouped['Price_Total'] / grouped['Records']
+    return grouped.drop(columns='Price_Total').reset_index()
+
+
+def point_density(rows, cell=DENSITY_CELL_DEGREES):
+    """Sales volume summed on a lat/lon grid, as lat/lon/Sales_Volume cell centres"""
+    lat = np.floor(rows['Latitude'].to_numpy(dtype=np.float64) / cell)
+    lon = np.floor(rows['Longitude'].to_numpy(dtype=np.float64) / cell)
+    cells = pd.DataFrame({'lat': (lat + 0.5) * cell, 'lon': (lon + 0.5) * cell,
+                          'Sales_Volume': rows['Sales_Volume'].to_numpy()})
+    return cells.groupby(['lat', 'lon'], as_index=False)['Sales_Volume'].sum()
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _region_map_values(key, source, selection, price_range):
+    cache_miss('region_map_values')
+    selection = dict(selection)
+    df = load_shared_data(source)
+    has_points = all(col in df.columns for col in LOCATION_COLUMNS)
+    if price_range is None and not has_points:
+        metrics = region_metrics(load_shared_cube(source).aggregate(['Region'], selection))
+        return metrics, None
+    rows = apply_selection(df, selection, price_range)
+    return region_metrics(rows), point_density(rows) if has_points else None
+
+
+def region_map_values(source=DATA_PATH, selection=None, price_range=None):
+    """Per-region metrics (and point density cells when coordinates exist) for a filter state.
+
+    Results are cached per dataset version and filter state, so toggling back to an earlier
+    selection costs nothing. price_range=None means the full price range (served by the cube).
+    """
+    frozen = tuple(sorted((dim, tuple(labels)) for dim, labels in (selection or {}).items()
+                          if labels is not None))
+    return _region_map_values(dataset_key(source), str(source), frozen, price_range)
@@ -0,0 +1,215 @@
+"""
+Heatmap engine - sparse pivots over any dimension combination, served as aggregated tiles
+
+A pivot of rows x columns (each axis one or more categorical dimensions, e.g. Model by
+Color x Year) is kept as three scipy CSR matrices - sales, record counts and price sums - with
+only the combinations that occur. Averages are ratios of sums, so they stay exact under
+aggregation.
+
+Large pivots are not sent whole. Each axis has zoom levels: level k merges blocks of 2**k
+adjacent rows (or columns) by summing, computed on demand as sparse products. A view of a
+window picks, per axis, the finest level that fits the display budget, and is assembled from
+fixed-size dense tiles of that level, which are cached and reused by neighbouring windows.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from scipy import sparse
+
+from utils.data import DATA_PATH, dataset_key, load_shared_data
+from utils.profiling import cache_miss
+
+HEATMAP_DIMENSIONS = ['Model', 'Color', 'Year', 'Region', 'Fuel_Type', 'Transmission', 'Sales_Classification']
+HEATMAP_METRICS = {'Sales_Volume': 'Total Sales Volume', 'Records': 'Records', 'Avg_Price': 'Average Price (USD)'}
+LABEL_SEPARATOR = ' · '
+
+# Cells per axis sent to the browser, tile edge length in cells, and tiles kept per pivot
+MAX_VIEW_CELLS = 120
+TILE_CELLS = 64
+MAX_TILES = 512
+
+
+def axis_codes(df, dims):
+    """Code of every row's combination of dims, and the label of each code.
+
+    Only combinations that occur get a code; codes follow the sorted order of dims' values.
+    Missing values are a value of their own, sorted last.
+    """
+    codes, uniques = [], []
+    for dim in dims:
+        dim_codes, dim_uniques = pd.factorize(df[dim], sort=True, use_na_sentinel=False)
+        codes.append(dim_codes)
+        uniques.append(np.asarray(dim_uniques))
+    shape = tuple(len(u) for u in uniques)
+    present, inverse = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+    parts = [u[i].astype(str) for u, i in zip(uniques, np.unravel_index(present, shape))]
+    labels = parts[0]
+    for part in parts[1:]:
+        labels = np.char.add(np.char.add(labels, LABEL_SEPARATOR), part)
+    return inverse.ravel(), labels.astype(object)
+
+
+def _block_sum(n, k):
+    """Sparse (ceil(n / 2**k) x n) matrix summing consecutive blocks of 2**k"""
+    size = 1 << k
+    return sparse.csr_matrix((np.ones(n), (np.arange(n) // size, np.arange(n))),
+                             shape=(-(-n // size), n))
+
+
+def _block_labels(labels, k):
+    """Labels of level-k blocks: the label itself, or 'first … last' for merged blocks"""
+    if k == 0:
+        return list(labels)
+    size = 1 << k
+    return [labels[i] if min(i + size, len(labels)) - i == 1
+            else f"{labels[i]} … {labels[min(i + size, len(labels)) - 1]}"
+            for i in range(0, len(labels), size)]
+
+
+class HeatmapView:
+    """Dense block of a pivot at one zoom level, ready for a figure"""
+
+    def __init__(self, sales, counts, price_sum, row_labels, col_labels, row_level, col_level):
+        self.sales = sales
+        self.counts = counts
+        self.price_sum = price_sum
+        self.row_labels = row_labels
+        self.col_labels = col_labels
+        self.row_level = row_level
+        self.col_level = col_level
+
+    @property
+    def shape(self):
+        return self.sales.shape
+
+    def values(self, metric):
+        """Cell values of a HEATMAP_METRICS metric; empty cells are NaN"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if metric == 'Sales_Volume':
+                z = self.sales.astype(np.float64)
+            elif metric == 'Records':
+                z = self.counts.astype(np.float64)
+            elif metric == 'Avg_Price':
+                z = self.price_sum / self.counts
+            else:
+                raise ValueError(f"Unknown heatmap metric: {metric}")
+        return np.where(self.counts > 0, z, np.nan)
+
+    def frame(self, metric):
+        return pd.DataFrame(self.values(metric), index=self.row_labels, columns=self.col_labels)
+
+
+class SparseHeatmap:
+    """Sparse pivot with lazily built zoom levels and a cache of dense tiles"""
+
+    def __init__(self, rows, cols, row_labels, col_labels, sales, prices, row_dims=(), col_dims=()):
+        self.row_dims, self.col_dims = tuple(row_dims), tuple(col_dims)
+        self.row_labels, self.col_labels = row_labels, col_labels
+        shape = (len(row_labels), len(col_labels))
+        # Duplicate (row, col) entries are summed on conversion to CSR
+        self._levels = {(0, 0): tuple(
+            sparse.csr_matrix((values, (rows, cols)), shape=shape)
+            for values in (np.asarray(sales, dtype=np.float64), np.ones(len(rows)),
+                           np.asarray(prices, dtype=np.float64))
+        )}
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df, row_dims, col_dims, order='label'):
+        """Pivot of df's Sales_Volume and Price_USD by row_dims x col_dims.
+
+        order='label' sorts each axis by its labels; order='total' puts the rows and columns
+        with the largest total sales first, so zoomed-out views lead with the busiest cells.
+        """
+        rows, row_labels = axis_codes(df, row_dims)
+        cols, col_labels = axis_codes(df, col_dims)
+        sales = df['Sales_Volume'].to_numpy()
+        if order == 'total':
+            row_rank = np.argsort(np.argsort(-np.bincount(rows, weights=sales), kind='stable'))
+            col_rank = np.argsort(np.argsort(-np.bincount(cols, weights=sales), kind='stable'))
+            row_labels = row_labels[np.argsort(row_rank)]
+            col_labels = col_labels[np.argsort(col_rank)]
+            rows, cols = row_rank[rows], col_rank[cols]
+        return cls(rows, cols, row_labels, col_labels, sales, df['Price_USD'].to_numpy(), row_dims, col_dims)
+
+    @property
+    def shape(self):
+        return len(self.row_labels), len(self.col_labels)
+
+    @property
+    def nnz(self):
+        """Non-empty cells at full resolution"""
+        return self._levels[(0, 0)][1].nnz
+
+    def level_for(self, length, max_cells=MAX_VIEW_CELLS):
+        """Finest level at which length cells fit in max_cells"""
+        return max(int(np.ceil(np.log2(max(length, 1) / max_cells))), 0)
+
+    def level(self, row_level, col_level):
+        """(sales, counts, price_sum) CSR matrices with 2**row_level x 2**col_level blocks merged"""
+        key = (row_level, col_level)
+        with self._lock:
+            if key in self._levels:
+                return self._levels[key]
+        left = _block_sum(self.shape[0], row_level)
+        right = _block_sum(self.shape[1], col_level).T.tocsr()
+        matrices = tuple((left @ m @ right).tocsr() for m in self._levels[(0, 0)])
+        with self._lock:
+            return self._levels.setdefault(key, matrices)
+
+    def tile(self, row_level, col_level, tile_row, tile_col):
+        """Dense (sales, counts, price_sum) arrays of one TILE_CELLS x TILE_CELLS tile"""
+        key = (row_level, col_level, tile_row, tile_col)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+        rows = slice(tile_row * TILE_CELLS, (tile_row + 1) * TILE_CELLS)
+        cols = slice(tile_col * TILE_CELLS, (tile_col + 1) * TILE_CELLS)
+        block = tuple(m[rows, cols].toarray() for m in self.level(row_level, col_level))
+        with self._lock:
+            self._tiles[key] = block
+            while len(self._tiles) > MAX_TILES:
+                self._tiles.popitem(last=False)
+        return block
+
+    def view(self, row_window=None, col_window=None, max_rows=MAX_VIEW_CELLS, max_cols=MAX_VIEW_CELLS):
+        """The cells of a window at the finest levels fitting max_rows x max_cols.
+
+        Windows are (start, stop) positions at full resolution and default to the whole axis;
+        they are widened to whole blocks of the chosen levels.
+        """
+        row_window = row_window or (0, self.shape[0])
+        col_window = col_window or (0, self.shape[1])
+        row_level = self.level_for(row_window[1] - row_window[0], max_rows)
+        col_level = self.level_for(col_window[1] - col_window[0], max_cols)
+        # Block ranges covering the window at each level
+        r0, r1 = row_window[0] >> row_level, -(-row_window[1] // (1 << row_level))
+        c0, c1 = col_window[0] >> col_level, -(-col_window[1] // (1 << col_level))
+
+        tile_rows = range(r0 // TILE_CELLS, (r1 - 1) // TILE_CELLS + 1)
+        tile_cols = range(c0 // TILE_CELLS, (c1 - 1) // TILE_CELLS + 1)
+        blocks = [[self.tile(row_level, col_level, tr, tc) for tc in tile_cols] for tr in tile_rows]
+        offset_r, offset_c = tile_rows.start * TILE_CELLS, tile_cols.start * TILE_CELLS
+        arrays = [np.block([[tile[i] for tile in row] for row in blocks])
+                  [r0 - offset_r:r1 - offset_r, c0 - offset_c:c1 - offset_c] for i in range(3)]
+        return HeatmapView(*arrays,
+                           _block_labels(self.row_labels, row_level)[r0:r1],
+                           _block_labels(self.col_labels, col_level)[c0:c1],
+                           row_level, col_level)
+
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _heatmap(key, source, row_dims, col_dims, order):
+    cache_miss('heatmap_engine')
+    return SparseHeatmap.from_frame(load_shared_data(source), list(row_dims), list(col_dims), order)
+
+
+def load_heatmap(row_dims, col_dims, order='label', source=DATA_PATH):
+    """The sparse pivot for a dimension choice, built once per dataset version and shared"""
+    return _heatmap(dataset_key(source), str(source), tuple(row_dims), tuple(col_dims), order)
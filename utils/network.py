@@ -0,0 +1,207 @@
+"""
+Network analysis helpers - graph metrics and Plotly network figures
+"""
+
+import networkx as nx
+import plotly.graph_objects as go
+from networkx.algorithms import community
+
+
+def calculate_metrics(G):
+    """Calculate various network metrics"""
+    metrics = {}
+    
+    # Degree centrality
+    degree_cent = nx.degree_centrality(G)
+    metrics['degree'] = degree_cent
+    
+    # Betweenness centrality
+    betweenness_cent = nx.betweenness_centrality(G)
+    metrics['betweenness'] = betweenness_cent
+    
+    # Closeness centrality
+    closeness_cent = nx.closeness_centrality(G)
+    metrics['closeness'] = closeness_cent
+    
+    # Find most influential (highest betweenness)
+    most_influential = max(betweenness_cent.items(), key=lambda x: x[1])[0]
+    metrics['most_influential'] = most_influential
+    
+    # Community detection
+    communities = community.greedy_modularity_communities(G)
+    metrics['communities'] = communities
+    
+    return metrics
+
+
+def create_network_viz(G, metrics, highlight_influential=True):
+    """Create interactive network visualization with Plotly"""
+    
+    # Use spring layout for positioning
+    pos = nx.spring_layout(G, k=0.5, iterations=50, seed=42)
+    
+    # Create edge traces
+    edge_x = []
+    edge_y = []
+    for edge in G.edges():
+        x0, y0 = pos[edge[0]]
+        x1, y1 = pos[edge[1]]
+        edge_x.extend([x0, x1, None])
+        edge_y.extend([y0, y1, None])
+    
+    edge_trace = go.Scatter(
+        x=edge_x, y=edge_y,
+        line=dict(width=2, color='#888'),
+        hoverinfo='none',
+        mode='lines',
+        name='Friendships'
+    )
+    
+    # Create node traces with colors based on influence
+    node_x = []
+    node_y = []
+    node_text = []
+    node_colors = []
+    node_sizes = []
+    
+    most_influential = metrics['most_influential']
+    
+    for node in G.nodes():
+        x, y = pos[node]
+        node_x.append(x)
+        node_y.append(y)
+        
+        # Get metrics for hover text
+        degree = G.degree(node)
+        betweenness = metrics['betweenness'][node]
+        closeness = metrics['closeness'][node]
+        
+        node_text.append(
+            f"<b>{node}</b><br>"
+            f"Connections: {degree}<br>"
+            f"Betweenness: {betweenness:.3f}<br>"
+            f"Closeness: {closeness:.3f}"
+        )
+        
+        # Color the most influential person differently
+        if highlight_influential and node == most_influential:
+            node_colors.append('#FF4B4B')  # Red for most influential
+            node_sizes.append(30)
+        else:
+            node_colors.append('#1f77b4')  # Blue for others
+            node_sizes.append(20)
+    
+    node_trace = go.Scatter(
+        x=node_x, y=node_y,
+        mode='markers+text',
+        text=[node for node in G.nodes()],
+        textposition="top center",
+        hovertext=node_text,
+        hoverinfo='text',
+        marker=dict(
+            size=node_sizes,
+            color=node_colors,
+            line=dict(width=2, color='white')
+        ),
+        name='Students'
+    )
+    
+    # Create figure
+    fig = go.Figure(data=[edge_trace, node_trace])
+    
+    fig.update_layout(
+        title=dict(
+            text="Friendship Network - Most Influential Person Highlighted in Red",
+            font=dict(size=16)
+        ),
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=0, l=0, r=0, t=40),
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        height=600,
+        plot_bgcolor='white'
+    )
+    
+    return fig
+
+
+def create_community_viz(G, communities):
+    """Create network visualization with community colors"""
+    
+    pos = nx.spring_layout(G, k=0.5, iterations=50, seed=42)
+    
+    # Create edge traces
+    edge_x = []
+    edge_y = []
+    for edge in G.edges():
+        x0, y0 = pos[edge[0]]
+        x1, y1 = pos[edge[1]]
+        edge_x.extend([x0, x1, None])
+        edge_y.extend([y0, y1, None])
+    
+    edge_trace = go.Scatter(
+        x=edge_x, y=edge_y,
+        line=dict(width=2, color='#888'),
+        hoverinfo='none',
+        mode='lines'
+    )
+    
+    # Color palette for communities
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+    
+    # Create node color mapping
+    node_colors_map = {}
+    for idx, comm in enumerate(communities):
+        for node in comm:
+            node_colors_map[node] = colors[idx % len(colors)]
+    
+    # Create node traces
+    node_x = []
+    node_y = []
+    node_text = []
+    node_colors = []
+    
+    for node in G.nodes():
+        x, y = pos[node]
+        node_x.append(x)
+        node_y.append(y)
+        
+        # Find which community this node belongs to
+        comm_num = None
+        for idx, comm in enumerate(communities, 1):
+            if node in comm:
+                comm_num = idx
+                break
+        
+        node_text.append(f"<b>{node}</b><br>Community {comm_num}")
+        node_colors.append(node_colors_map[node])
+    
+    node_trace = go.Scatter(
+        x=node_x, y=node_y,
+        mode='markers+text',
+        text=[node for node in G.nodes()],
+        textposition="top center",
+        hovertext=node_text,
+        hoverinfo='text',
+        marker=dict(
+            size=25,
+            color=node_colors,
+            line=dict(width=2, color='white')
+        )
+    )
+    
+    fig = go.Figure(data=[edge_trace, node_trace])
+    
+    fig.update_layout(
+        title="Friendship Network - Colored by Community",
+        showlegend=False,
+        hovermode='closest',
+        margin=dict(b=0, l=0, r=0, t=40),
+        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+        height=600,
+        plot_bgcolor='white'
+    )
+    
+    return fig
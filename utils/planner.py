@@ -0,0 +1,284 @@
+"""
+Query planner - estimate how many rows a filter selects, then pick the cheapest way to run it
+
+Selections are estimated before anything is executed: each dimension's selectivity comes
+from the catalog's per-value counts and the price range's from the Price_USD histogram,
+combined assuming independence. The estimate then prices three strategies:
+
+- index: a row index keeps, per dimension, the row ids of every label (posting lists). The
+  most selective dimension's lists give the candidate rows; the other filters are checked
+  on those candidates only, so narrow selections never touch the rest of the data.
+- scan: every row's dimension codes are checked against per-dimension lookup tables, a few
+  byte-array passes over the whole dataset.
+- cube: the pre-aggregated SalesCube answers group-bys from cell sums, whatever the
+  selection size. It has no price axis, so it only applies to the full price range.
+
+Row strategies materialize the selected rows; charts then group those rows. The costs are
+rough per-element constants measured on the bundled data - only their ratios matter.
+"""
+
+import threading
+import time
+
+import numpy as np
+import streamlit as st
+
+from utils.aggregations import compute_kpis
+from utils.cube import DIMENSIONS, load_shared_cube
+from utils.data import DATA_PATH, load_catalog, load_shared_data
+from utils.encoding import recode
+from utils.profiling import cache_miss
+
+# Approximate cost in microseconds of each step, per element or per chart
+COST_SCAN = 0.004           # one dimension's lookup over one row
+COST_GATHER = 0.02          # one candidate row id gathered and checked
+COST_TAKE = 0.15            # one selected row materialized
+COST_GROUP = 0.05           # one selected row grouped for one chart
+COST_GROUP_FIXED = 2000.0   # pandas groupby overhead per chart
+COST_CUBE_CELL = 0.05       # one cube cell summed for one chart
+COST_CUBE_FIXED = 4000.0    # cube slicing, frame building and regrouping per chart
+
+
+class Plan:
+    """The strategy chosen for one query, with the estimate and costs behind the choice.
+
+    strategy is where chart data comes from (index, scan or cube); access is how selected
+    rows are fetched when they are needed (index or scan).
+    """
+
+    def __init__(self, strategy, access, estimated_rows, candidate_rows, driver, costs):
+        self.strategy = strategy
+        self.access = access
+        self.estimated_rows = estimated_rows
+        self.candidate_rows = candidate_rows
+        self.driver = driver
+        self.costs = costs
+        self.actual_rows = None
+        self.seconds = None
+
+    def summary(self):
+        """One row for the debug panel"""
+        return {
+            'Strategy': self.strategy,
+            'Row_Access': self.access,
+            'Estimated_Rows': int(round(self.estimated_rows)),
+            'Actual_Rows': self.actual_rows,
+            'Driver': self.driver or '',
+            'Candidates': self.candidate_rows,
+            **{f'Cost_{name}_ms': round(cost / 1000, 2) for name, cost in self.costs.items()},
+            'Elapsed_ms': None if self.seconds is None else round(self.seconds * 1000, 2),
+        }
+
+
+class RowIndex:
+    """Per-dimension label codes and posting lists over the rows of a frame.
+
+    Rows missing a dimension's label have code -1 there and are in none of its posting lists.
+    """
+
+    def __init__(self, df, labels):
+        self.rows = len(df)
+        self.labels = labels
+        self.codes, self.postings, self.offsets = {}, {}, {}
+        for dim in DIMENSIONS:
+            codes = recode(df[dim], labels[dim]).astype(np.int16)
+            self.codes[dim] = codes
+            labelled = np.flatnonzero(codes >= 0)
+            self.postings[dim] = labelled[np.argsort(codes[labelled], kind='stable')].astype(np.int32)
+            counts = np.bincount(codes[labelled], minlength=len(labels[dim]))
+            self.offsets[dim] = np.concatenate([[0], np.cumsum(counts)])
+        self.price = df['Price_USD'].to_numpy()
+
+    def allowed(self, selection):
+        """Selected label codes of every filtered dimension"""
+        return {dim: np.flatnonzero(np.isin(self.labels[dim], list(values)))
+                for dim, values in selection.items() if values is not None}
+
+    def candidates(self, dim, codes):
+        """Rows in the posting lists of codes"""
+        offsets = self.offsets[dim]
+        return int((offsets[codes + 1] - offsets[codes]).sum())
+
+    def _lookup_table(self, dim, codes):
+        # The extra last entry is what code -1 (a missing label) looks up: never selected
+        table = np.zeros(len(self.labels[dim]) + 1, dtype=bool)
+        table[codes] = True
+        return table
+
+    def lookup(self, allowed, price_range, driver):
+        """Sorted ids of selected rows, starting from driver's posting lists"""
+        postings, offsets = self.postings[driver], self.offsets[driver]
+        ids = np.concatenate([postings[offsets[c]:offsets[c + 1]] for c in allowed[driver]] or
+                             [np.empty(0, np.int32)])
+        for dim, codes in allowed.items():
+            if dim != driver:
+                ids = ids[self._lookup_table(dim, codes)[self.codes[dim][ids]]]
+        if price_range is not None:
+            price = self.price[ids]
+            ids = ids[(price >= price_range[0]) & (price <= price_range[1])]
+        ids.sort()
+        return ids
+
+    def scan(self, allowed, price_range):
+        """Sorted ids of selected rows, checking every row"""
+        mask = np.ones(self.rows, dtype=bool)
+        for dim, codes in allowed.items():
+            mask &= self._lookup_table(dim, codes)[self.codes[dim]]
+        if price_range is not None:
+            mask &= (self.price >= price_range[0]) & (self.price <= price_range[1])
+        return np.flatnonzero(mask)
+
+
+class QueryPlanner:
+    """Plans and runs Dashboard queries over one dataset version"""
+
+    def __init__(self, df, cube, catalog):
+        self.df = df
+        self.cube = cube
+        self.catalog = catalog
+        self.index = RowIndex(df, cube.labels)
+        self.cells = int(cube.counts.size)
+
+    def estimate(self, selection, price_range=None):
+        """Estimated selected rows from catalog value counts and the price histogram"""
+        rows = float(self.catalog.rows)
+        estimate = rows
+        for dim, values in selection.items():
+            if values is None:
+                continue
+            counts = self.catalog.value_counts(dim)
+            estimate *= counts[counts.index.isin(list(values))].sum() / rows
+        if price_range is not None:
+            estimate *= self.catalog.fraction('Price_USD', *price_range)
+        return estimate
+
+    def plan(self, selection, price_range=None, charts=1, fetched=False):
+        """Cheapest strategy for charts group-bys (0 for rows only) under a filter state.
+
+        fetched=True means the selected rows are already in hand, so row strategies cost only
+        their grouping.
+        """
+        estimate = self.estimate(selection, price_range)
+        allowed = self.index.allowed(selection)
+        filters = len(allowed) + (price_range is not None)
+
+        candidates, driver = self.index.rows, None
+        for dim, codes in allowed.items():
+            count = self.index.candidates(dim, codes)
+            if count < candidates:
+                candidates, driver = count, dim
+
+        # Fetching rows, then grouping them for every chart, or summing cube cells
+        take = COST_TAKE * estimate
+        costs = {'scan': COST_SCAN * self.index.rows * max(filters, 1) + take}
+        if driver is not None:
+            costs['index'] = COST_GATHER * candidates + take
+        access = min(costs, key=costs.get)
+        grouping = charts * (COST_GROUP_FIXED + COST_GROUP * estimate)
+        costs = {name: (0.0 if fetched else float(cost)) + grouping for name, cost in costs.items()}
+        if price_range is None and charts:
+            costs['cube'] = charts * (COST_CUBE_FIXED + COST_CUBE_CELL * self.cells)
+        strategy = min(costs, key=costs.get)
+        return Plan(strategy, access, estimate, candidates, driver, costs)
+
+    def rows(self, selection, price_range=None, plan=None):
+        """Selected rows, fetched by index lookup or scan as planned"""
+        plan = plan or self.plan(selection, price_range, charts=0)
+        start = time.perf_counter()
+        allowed = self.index.allowed(selection)
+        if plan.access == 'index':
+            ids = self.index.lookup(allowed, price_range, plan.driver)
+        else:
+            ids = self.index.scan(allowed, price_range)
+        rows = self.df.take(ids)
+        plan.actual_rows, plan.seconds = len(rows), time.perf_counter() - start
+        return rows
+
+    def run(self, price_range=None, on_plan=None):
+        """A QueryRun for one script rerun under a price range (None for all prices)"""
+        return QueryRun(self, price_range, on_plan)
+
+
+class QueryRun:
+    """The queries of one script rerun under one price range.
+
+    Rows fetched for a selection are reused by later queries with the same selection, and
+    every plan is passed to on_plan(name, plan), e.g. for the debug panel. Safe to use from
+    worker threads.
+    """
+
+    def __init__(self, planner, price_range=None, on_plan=None):
+        self.planner = planner
+        self.price_range = price_range
+        self.on_plan = on_plan
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(selection):
+        return tuple(sorted((dim, tuple(labels)) for dim, labels in selection.items()
+                            if labels is not None))
+
+    def _fetched(self, selection):
+        with self._lock:
+            return self._rows.get(self._key(selection))
+
+    def _log(self, name, plan):
+        if self.on_plan is not None:
+            self.on_plan(name, plan)
+
+    def rows(self, name, selection):
+        """Selected rows, by index lookup or scan"""
+        rows = self._fetched(selection)
+        plan = self.planner.plan(selection, self.price_range, charts=0, fetched=rows is not None)
+        if rows is None:
+            rows = self.planner.rows(selection, self.price_range, plan)
+            with self._lock:
+                self._rows[self._key(selection)] = rows
+        else:
+            plan.strategy, plan.actual_rows = 'reuse', len(rows)
+        self._log(name, plan)
+        return rows
+
+    def kpis(self, name, selection, rows):
+        """The Dashboard KPIs for selection's rows, from cube totals when that is cheaper"""
+        plan = self.planner.plan(selection, self.price_range, fetched=True)
+        start = time.perf_counter()
+        if plan.strategy == 'cube':
+            kpis = self.planner.cube.kpis(selection)
+        else:
+            kpis = compute_kpis(rows, catalog=self.planner.catalog)
+            kpis['records'] = len(rows)
+            plan.strategy = 'reuse'
+        kpis['median_mileage'] = rows['Mileage_KM'].median()
+        plan.actual_rows, plan.seconds = len(rows), time.perf_counter() - start
+        self._log(name, plan)
+        return kpis
+
+    def chart_data(self, name, by, selection):
+        """Rows or cube cells for one chart, whichever is cheaper"""
+        rows = self._fetched(selection)
+        plan = self.planner.plan(selection, self.price_range, fetched=rows is not None)
+        if plan.strategy == 'cube':
+            start = time.perf_counter()
+            data = self.planner.cube.aggregate(by, selection)
+            plan.actual_rows, plan.seconds = int(data['Records'].sum()), time.perf_counter() - start
+        elif rows is not None:
+            plan.strategy, plan.actual_rows, data = 'reuse', len(rows), rows
+        else:
+            data = self.planner.rows(selection, self.price_range, plan)
+            with self._lock:
+                self._rows[self._key(selection)] = data
+        self._log(name, plan)
+        return data
+
+
+@st.cache_resource(show_spinner=False)
+def _planner(source):
+    cache_miss('query_planner')
+    return QueryPlanner(load_shared_data(source), load_shared_cube(source), load_catalog(source))
+
+
+def load_query_planner(source=DATA_PATH):
+    """The QueryPlanner of a dataset version, with its row index built once per process"""
+    return _planner(str(source))
@@ -0,0 +1,238 @@
+"""
+Price model - ridge regression of Price_USD on precomputed feature encodings
+
+Features are encoded once per dataset version (categorical codes plus standardized
+numerics and mileage hinge terms) and stored as an Arrow file next to the columnar cache.
+The fitted model is persisted beside it, so sessions and processes load it instead of
+retraining. Inference never builds one-hot matrices: each categorical contributes a
+coefficient gathered by code, so what-if grids are evaluated as plain array operations.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+
+from utils.data import CACHE_DIR, DATA_PATH, dataset_key, load_shared_data
+from utils.encoding import recode
+from utils.profiling import cache_miss
+
+TARGET = 'Price_USD'
+CATEGORICAL_FEATURES = ['Model', 'Region', 'Color', 'Fuel_Type', 'Transmission']
+NUMERIC_FEATURES = ['Year', 'Engine_Size_L', 'Mileage_KM']
+MILEAGE_KNOTS = [50_000, 100_000, 150_000]
+RIDGE_ALPHA = 1.0
+HOLDOUT_FRACTION = 0.2
+FIT_CHUNK_ROWS = 500_000
+
+
+def _numeric_block(numerics, spec):
+    """Standardized numeric columns followed by standardized mileage hinge terms"""
+    raw = [np.asarray(numerics[col], dtype=np.float64) for col in NUMERIC_FEATURES]
+    mileage = np.asarray(numerics['Mileage_KM'], dtype=np.float64)
+    raw += [np.maximum(mileage - knot, 0) for knot in MILEAGE_KNOTS]
+    raw = np.broadcast_arrays(*raw)
+    return (np.stack(raw, axis=-1) - spec['means']) / spec['stds']
+
+
+def feature_spec(df):
+    """Category domains and numeric scaling learned from df"""
+    spec = {'categories': {col: sorted(df[col].dropna().unique().tolist()) for col in CATEGORICAL_FEATURES}}
+    raw = _numeric_block(df, {'means': 0.0, 'stds': 1.0})
+    spec['means'] = raw.mean(axis=0)
+    spec['stds'] = np.where(raw.std(axis=0) > 0, raw.std(axis=0), 1.0)
+    return spec
+
+
+def encode_codes(values, categories):
+    """Map labels to category codes (-1 for unknown labels)"""
+    return pd.Index(categories).get_indexer(np.asarray(values).ravel()).reshape(np.shape(values))
+
+
+def encode_features(df, spec):
+    """Categorical codes and the scaled numeric block for every row of df"""
+    codes = {col: recode(df[col], spec['categories'][col]).astype(np.int16) for col in CATEGORICAL_FEATURES}
+    return codes, _numeric_block(df, spec).astype(np.float32)
+
+
+# Feature store: encodings persisted next to the columnar dataset
+
+def features_path(source=DATA_PATH, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f'{Path(source).stem}-{dataset_key(source)}.features.arrow'
+
+
+def model_path(source=DATA_PATH, cache_dir=CACHE_DIR):
+    return Path(cache_dir) / f'{Path(source).stem}-{dataset_key(source)}.price_model.npz'
+
+
+def _spec_to_json(spec):
+    return json.dumps({'categories': spec['categories'], 'means': spec['means'].tolist(),
+                       'stds': spec['stds'].tolist()})
+
+
+def _spec_from_json(text):
+    spec = json.loads(text)
+    spec['means'] = np.array(spec['means'])
+    spec['stds'] = np.array(spec['stds'])
+    return spec
+
+
+def build_feature_store(df, path):
+    """Encode df and write codes, scaled numerics and the target as an Arrow file"""
+    spec = feature_spec(df)
+    codes, numeric = encode_features(df, spec)
+    columns = {col: pa.array(codes[col]) for col in CATEGORICAL_FEATURES}
+    columns.update({f'x{j}': pa.array(numeric[:, j]) for j in range(numeric.shape[1])})
+    columns[TARGET] = pa.array(df[TARGET].to_numpy(dtype=np.float64))
+    table = pa.table(columns).replace_schema_metadata({'feature_spec': _spec_to_json(spec)})
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so concurrent processes never read a half-written file
+    tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+    with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp, path)
+    return path
+
+
+def load_feature_store(path):
+    """Memory-map a feature store; returns (spec, codes, numeric block, target)"""
+    table = pa.ipc.open_file(pa.memory_map(str(path), 'r')).read_all()
+    spec = _spec_from_json(table.schema.metadata[b'feature_spec'].decode())
+    codes = {col: table.column(col).to_numpy() for col in CATEGORICAL_FEATURES}
+    n_numeric = len(spec['means'])
+    numeric = np.column_stack([table.column(f'x{j}').to_numpy() for j in range(n_numeric)])
+    return spec, codes, numeric, table.column(TARGET).to_numpy()
+
+
+class PriceModel:
+    """Ridge regression with one coefficient per category level and per numeric term"""
+
+    def __init__(self, spec, intercept, cat_coefs, num_coefs, metrics):
+        self.spec = spec
+        self.intercept = intercept
+        self.cat_coefs = cat_coefs
+        self.num_coefs = num_coefs
+        self.metrics = metrics
+
+    @classmethod
+    def fit(cls, spec, codes, numeric, target, alpha=RIDGE_ALPHA, rows=None):
+        """Solve the ridge normal equations, accumulated over row chunks"""
+        rows = np.arange(len(target)) if rows is None else rows
+        sizes = [len(spec['categories'][col]) for col in CATEGORICAL_FEATURES]
+        offsets = np.concatenate([[1], 1 + np.cumsum(sizes)])
+        n_params = offsets[-1] + numeric.shape[1]
+
+        xtx = np.zeros((n_params, n_params))
+        xty = np.zeros(n_params)
+        for start in range(0, len(rows), FIT_CHUNK_ROWS):
+            idx = rows[start:start + FIT_CHUNK_ROWS]
+            X = np.zeros((len(idx), n_params))
+            X[:, 0] = 1.0
+            for col, offset in zip(CATEGORICAL_FEATURES, offsets):
+                # A missing label (code -1) sets no indicator
+                known = np.flatnonzero(codes[col][idx] >= 0)
+                X[known, offset + codes[col][idx][known]] = 1.0
+            X[:, offsets[-1]:] = numeric[idx]
+            xtx += X.T @ X
+            xty += X.T @ target[idx]
+
+        penalty = np.full(n_params, alpha)
+        penalty[0] = 0.0  # never shrink the intercept
+        beta = np.linalg.solve(xtx + np.diag(penalty), xty)
+        cat_coefs = {col: beta[offset:offset + size]
+                     for col, offset, size in zip(CATEGORICAL_FEATURES, offsets, sizes)}
+        return cls(spec, beta[0], cat_coefs, beta[offsets[-1]:], metrics={})
+
+    @classmethod
+    def train(cls, spec, codes, numeric, target, seed=42):
+        """Fit on a training split to score a holdout, then refit on all rows"""
+        rng = np.random.default_rng(seed)
+        holdout = rng.random(len(target)) < HOLDOUT_FRACTION
+        trial = cls.fit(spec, codes, numeric, target, rows=np.flatnonzero(~holdout))
+        predicted = trial._predict_encoded({c: codes[c][holdout] for c in CATEGORICAL_FEATURES},
+                                           numeric[holdout])
+        actual = target[holdout]
+        residual = actual - predicted
+        model = cls.fit(spec, codes, numeric, target)
+        model.metrics = {
+            'r2': float(1 - (residual ** 2).sum() / ((actual - actual.mean()) ** 2).sum()),
+            'mae': float(np.abs(residual).mean()),
+            'rmse': float(np.sqrt((residual ** 2).mean())),
+            'train_rows': int((~holdout).sum()),
+            'holdout_rows': int(holdout.sum()),
+        }
+        return model
+
+    def _predict_encoded(self, codes, numeric):
+        price = self.intercept + numeric @ self.num_coefs
+        for col in CATEGORICAL_FEATURES:
+            # Code -1 (a missing label) reads the appended zero
+            price = price + np.append(self.cat_coefs[col], 0.0)[codes[col]]
+        return price
+
+    def predict(self, **columns):
+        """Predict prices for raw feature values; arrays broadcast against each other.
+
+        Pass every feature in CATEGORICAL_FEATURES and NUMERIC_FEATURES, e.g.
+        ``predict(Model=models[:, None], Mileage_KM=mileage[None, :], Year=2020, ...)``
+        returns a (models, mileage) grid.
+        """
+        codes = {}
+        for col in CATEGORICAL_FEATURES:
+            codes[col] = encode_codes(columns[col], self.spec['categories'][col])
+            if (codes[col] < 0).any():
+                raise ValueError(f"Unknown {col} value for the price model")
+        numeric = _numeric_block({col: columns[col] for col in NUMERIC_FEATURES}, self.spec)
+        shape = np.broadcast_shapes(numeric.shape[:-1], *(c.shape for c in codes.values()))
+        numeric = np.broadcast_to(numeric, shape + numeric.shape[-1:])
+        return self._predict_encoded({c: np.broadcast_to(v, shape) for c, v in codes.items()},
+                                     numeric)
+
+    # Persistence
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {f'cat_{col}': coefs for col, coefs in self.cat_coefs.items()}
+        # Write then rename, so concurrent processes never load a half-written model
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, intercept=self.intercept, num_coefs=self.num_coefs,
+                     spec=_spec_to_json(self.spec), metrics=json.dumps(self.metrics), **arrays)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                spec=_spec_from_json(str(data['spec'])),
+                intercept=float(data['intercept']),
+                cat_coefs={col: data[f'cat_{col}'] for col in CATEGORICAL_FEATURES},
+                num_coefs=data['num_coefs'],
+                metrics=json.loads(str(data['metrics'])),
+            )
+
+
+@st.cache_resource(show_spinner=False)
+def _price_model(key, source):
+    cache_miss('price_model')
+    saved = model_path(source)
+    if saved.exists():
+        return PriceModel.load(saved)
+    store = features_path(source)
+    if not store.exists():
+        build_feature_store(load_shared_data(source), store)
+    model = PriceModel.train(*load_feature_store(store))
+    model.save(saved)
+    return model
+
+
+def load_price_model(source=DATA_PATH):
+    """The persisted price model for the dataset version, trained on first use"""
+    return _price_model(dataset_key(source), str(source))
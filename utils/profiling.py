@@ -0,0 +1,254 @@
+"""
+Hot-path instrumentation - per-rerun timers, memory counters and cache statistics
+
+Profiling is opt-in: add ``?profile=1`` to the page URL or set ``PORTFOLIO_PROFILE=1``.
+When disabled every span is a no-op, so instrumented code pays almost nothing.
+"""
+
+import json
+import os
+import secrets
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+ENV_FLAG = 'PORTFOLIO_PROFILE'
+QUERY_PARAM = 'profile'
+# The repository root, as utils.data.ROOT (which imports this module)
+ROOT = Path(__file__).resolve().parent.parent
+TRACE_DIR = Path(os.environ.get('PORTFOLIO_TRACE_DIR', ROOT / 'traces'))
+
+_TRUTHY = {'1', 'true', 'yes', 'on'}
+
+# Streamlit's caches keep no hit/miss counters, so cached functions report their own misses
+_cache_stats = defaultdict(lambda: {'calls': 0, 'misses': 0})
+_cache_lock = threading.Lock()
+_cache_local = threading.local()
+
+# tracemalloc slows every allocation in the process, so it runs only while a profiled rerun
+# is open. Tracers count themselves in and out; whoever started tracing is the one to stop it.
+_tracing_lock = threading.Lock()
+_tracing = {'tracers': 0, 'started': False}
+
+
+def profiling_enabled():
+    """True when the query param or environment variable turns profiling on"""
+    if os.environ.get(ENV_FLAG, '').lower() in _TRUTHY:
+        return True
+    return str(st.query_params.get(QUERY_PARAM, '')).lower() in _TRUTHY
+
+
+def cache_miss(name):
+    """Call from inside an @st.cache_data / @st.cache_resource body; it only runs on a miss"""
+    with _cache_lock:
+        _cache_stats[name]['misses'] += 1
+    _cache_local.missed = True
+
+
+def _acquire_tracing():
+    with _tracing_lock:
+        if _tracing['tracers'] == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing['started'] = True
+        _tracing['tracers'] += 1
+
+
+def _release_tracing():
+    with _tracing_lock:
+        _tracing['tracers'] -= 1
+        if _tracing['tracers'] == 0 and _tracing['started']:
+            tracemalloc.stop()
+            _tracing['started'] = False
+
+
+def cache_stats():
+    """Process-wide hit/miss counts for functions reporting through cache_miss"""
+    with _cache_lock:
+        return pd.DataFrame([
+            {'Function': name, 'Calls': s['calls'], 'Hits': s['calls'] - s['misses'],
+             'Misses': s['misses'],
+             'Hit Rate': (s['calls'] - s['misses']) / s['calls'] if s['calls'] else 0.0}
+            for name, s in sorted(_cache_stats.items())
+        ])
+
+
+class Tracer:
+    """Collect timed spans for one script rerun.
+
+    Spans may be opened from worker threads (e.g. ProgressiveRenderer computations); each
+    thread keeps its own parent stack. Memory is the net change in tracemalloc-traced
+    allocations over the span, so it is approximate when spans overlap across threads.
+    Tracing runs from an enabled tracer's creation until close() (called by render_panel) or
+    until the tracer is garbage collected, e.g. after a rerun that raised.
+    """
+
+    def __init__(self, enabled, page):
+        self.enabled = enabled
+        self.page = page
+        self.trace_id = secrets.token_hex(16)
+        self.spans = []
+        self.plans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin_ns = time.time_ns()
+        self._origin = time.perf_counter_ns()
+        self._release = None
+        if enabled:
+            _acquire_tracing()
+            self._release = weakref.finalize(self, _release_tracing)
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, attributes)
+
+    @contextmanager
+    def _span(self, name, attributes):
+        stack = self._local.__dict__.setdefault('stack', [])
+        span_id = secrets.token_hex(8)
+        parent_id = stack[-1] if stack else None
+        stack.append(span_id)
+        mem_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        try:
+            yield attributes
+        finally:
+            end = time.perf_counter_ns()
+            stack.pop()
+            record = {
+                'name': name,
+                'span_id': span_id,
+                'parent_id': parent_id,
+                'thread': threading.current_thread().name,
+                'start_ms': (start - self._origin) / 1e6,
+                'duration_ms': (end - start) / 1e6,
+                'mem_delta_kb': (tracemalloc.get_traced_memory()[0] - mem_before) / 1024,
+                'start_ns': self._origin_ns + (start - self._origin),
+                'end_ns': self._origin_ns + (end - self._origin),
+                'attributes': attributes,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    def call_cached(self, name, func, *args, **kwargs):
+        """Call a cached function, counting the call and tagging the span hit/miss"""
+        with _cache_lock:
+            _cache_stats[name]['calls'] += 1
+        _cache_local.missed = False
+        with self.span(name) as attributes:
+            result = func(*args, **kwargs)
+            if attributes is not None:
+                attributes['cache'] = 'miss' if _cache_local.missed else 'hit'
+        return result
+
+    def record_plan(self, query, plan):
+        """Keep a query's execution plan (utils.planner.Plan) for the panel and trace export"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.plans.append({'Query': query, **plan.summary()})
+
+    def close(self):
+        """Stop tracing allocations for this rerun, unless other profiled reruns are still open"""
+        if self._release is not None:
+            self._release()
+
+    # Export
+
+    def to_json(self):
+        return {'page': self.page, 'trace_id': self.trace_id,
+                'peak_traced_kb': tracemalloc.get_traced_memory()[1] / 1024,
+                'plans': self.plans,
+                'spans': [{k: v for k, v in s.items() if k not in ('start_ns', 'end_ns')}
+                          for s in self.spans]}
+
+    def to_otlp(self):
+        """Spans in the OpenTelemetry OTLP/JSON layout"""
+        return {'resourceSpans': [{
+            'resource': {'attributes': [_otlp_attr('service.name', 'bmw-portfolio'),
+                                        _otlp_attr('page', self.page)]},
+            'scopeSpans': [{
+                'scope': {'name': 'utils.profiling'},
+                'spans': [{
+                    'traceId': self.trace_id,
+                    'spanId': s['span_id'],
+                    'parentSpanId': s['parent_id'] or '',
+                    'name': s['name'],
+                    'kind': 1,
+                    'startTimeUnixNano': str(s['start_ns']),
+                    'endTimeUnixNano': str(s['end_ns']),
+                    'attributes': [_otlp_attr('thread.name', s['thread']),
+                                   _otlp_attr('memory.delta_kb', s['mem_delta_kb'])] +
+                                  [_otlp_attr(k, v) for k, v in s['attributes'].items()],
+                } for s in self.spans],
+            }],
+        }]}
+
+    def export(self, fmt='json', directory=TRACE_DIR):
+        """Write this rerun's trace to a local file and return its path"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        payload = self.to_otlp() if fmt == 'otlp' else self.to_json()
+        path = directory / f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{self.trace_id[:8]}.{fmt}.json"
+        path.write_text(json.dumps(payload, indent=2, default=str))
+        return path
+
+    # Sidebar panel
+
+    def render_panel(self):
+        """Show the per-rerun waterfall, cache stats and export controls in the sidebar"""
+        if not self.enabled:
+            return
+        with self._lock:
+            spans = pd.DataFrame(self.spans)
+        with st.sidebar.expander("⏱️ Performance Trace", expanded=True):
+            if spans.empty:
+                st.caption("No spans recorded in this rerun.")
+            else:
+                spans = spans.sort_values('start_ms')
+                total = (spans['start_ms'] + spans['duration_ms']).max()
+                st.caption(f"Rerun wall time: {total:,.1f} ms across {len(spans)} spans")
+                fig = px.bar(spans, x='duration_ms', y='name', base='start_ms', orientation='h',
+                             color='thread', hover_data=['mem_delta_kb'],
+                             labels={'duration_ms': 'ms', 'name': ''})
+                fig.update_yaxes(autorange='reversed')
+                fig.update_layout(height=max(250, 22 * len(spans)), showlegend=False,
+                                  margin=dict(l=0, r=0, t=10, b=0))
+                st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(spans[['name', 'duration_ms', 'mem_delta_kb', 'thread']].round(2),
+                             use_container_width=True, hide_index=True)
+
+            if self.plans:
+                st.markdown("**Query plans**")
+                st.dataframe(pd.DataFrame(self.plans), use_container_width=True, hide_index=True)
+                st.caption("Strategy: index = row index lookup, scan = coded column scan, "
+                           "cube = pre-aggregated cells, reuse = rows already fetched this rerun")
+
+            st.markdown("**Cache statistics**")
+            st.dataframe(cache_stats(), use_container_width=True, hide_index=True)
+
+            fmt = st.radio("Export format", ['json', 'otlp'], horizontal=True,
+                           format_func=lambda f: {'json': 'JSON', 'otlp': 'OpenTelemetry'}[f])
+            if st.button("💾 Export trace"):
+                st.success(f"Trace written to {self.export(fmt)}")
+        self.close()
+
+
+def _otlp_attr(key, value):
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
@@ -0,0 +1,277 @@
+"""
+Data quality - schema, range and domain checks plus streaming anomaly scores for sales data
+
+QualityMonitor validates the dataset one chunk at a time, so it runs inside the same pass
+that parses the CSV. Every check is a vectorized mask over the chunk. Anomaly detection
+keeps only per-segment running statistics between chunks:
+- records are scored with a z-score of Price_USD and Sales_Volume against the running mean
+  and standard deviation of their Model x Region segment
+- yearly Sales_Volume per segment is scored with a rolling median/MAD over previous years
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SEGMENT_DIMENSIONS = ['Model', 'Region']
+
+STRING_COLUMNS = ['Model', 'Region', 'Color', 'Fuel_Type', 'Transmission', 'Sales_Classification']
+INTEGER_COLUMNS = ['Year', 'Mileage_KM', 'Price_USD', 'Sales_Volume']
+FLOAT_COLUMNS = ['Engine_Size_L']
+EXPECTED_COLUMNS = ['Model', 'Year', 'Region', 'Color', 'Fuel_Type', 'Transmission',
+                    'Engine_Size_L', 'Mileage_KM', 'Price_USD', 'Sales_Volume', 'Sales_Classification']
+
+# Inclusive plausible bounds; None leaves a side open
+VALUE_RANGES = {
+    'Year': (2000, 2030),
+    'Engine_Size_L': (0.0, 8.0),
+    'Mileage_KM': (0, 1_000_000),
+    'Price_USD': (1_000, 1_000_000),
+    'Sales_Volume': (0, None),
+}
+
+CATEGORY_DOMAINS = {
+    'Model': ['3 Series', '5 Series', '7 Series', 'M3', 'M5', 'X1', 'X3', 'X5', 'X6', 'i3', 'i8'],
+    'Region': ['Africa', 'Asia', 'Europe', 'Middle East', 'North America', 'South America'],
+    'Color': ['Black', 'Blue', 'Grey', 'Red', 'Silver', 'White'],
+    'Fuel_Type': ['Diesel', 'Electric', 'Hybrid', 'Petrol'],
+    'Transmission': ['Automatic', 'Manual'],
+    'Sales_Classification': ['High', 'Low'],
+}
+
+SCORED_COLUMNS = ['Price_USD', 'Sales_Volume']
+Z_THRESHOLD = 4.0
+ROLLING_YEARS = 5
+MAD_THRESHOLD = 3.5
+MAX_EXAMPLES = 1_000
+
+FIRST_YEAR = VALUE_RANGES['Year'][0]
+N_YEARS = VALUE_RANGES['Year'][1] - FIRST_YEAR + 1
+
+
+class QualityMonitor:
+    """Accumulate check results and segment statistics over the chunks of one dataset"""
+
+    def __init__(self):
+        self.rows = 0
+        self.issues = {}
+        self._examples = []
+        self._n_segments = len(CATEGORY_DOMAINS['Model']) * len(CATEGORY_DOMAINS['Region'])
+        # Running count, mean and sum of squared deviations per segment and scored column
+        self._count = np.zeros(self._n_segments)
+        self._mean = np.zeros((self._n_segments, len(SCORED_COLUMNS)))
+        self._m2 = np.zeros((self._n_segments, len(SCORED_COLUMNS)))
+        # Yearly Sales_Volume per segment over the valid Year range
+        self._yearly = np.zeros((self._n_segments, N_YEARS))
+        self._years_seen = np.zeros(N_YEARS, dtype=bool)
+        self._anomalous_records = 0
+
+    def _flag(self, check, column, severity, count, detail):
+        if count:
+            key = (check, column)
+            if key in self.issues:
+                self.issues[key]['rows'] += int(count)
+            else:
+                self.issues[key] = dict(check=check, column=column, severity=severity,
+                                        rows=int(count), detail=detail)
+
+    def update(self, chunk):
+        """Validate one DataFrame chunk and fold it into the running statistics"""
+        offset = self.rows
+        self.rows += len(chunk)
+
+        missing = [c for c in EXPECTED_COLUMNS if c not in chunk.columns]
+        extra = [c for c in chunk.columns if c not in EXPECTED_COLUMNS]
+        for col in missing:
+            self._flag('schema', col, 'error', len(chunk), "column is missing")
+        for col in extra:
+            self._flag('schema', col, 'warning', len(chunk), "unexpected column")
+
+        numeric = {}
+        for col in INTEGER_COLUMNS + FLOAT_COLUMNS:
+            if col not in chunk.columns:
+                continue
+            series = chunk[col]
+            if not pd.api.types.is_numeric_dtype(series):
+                self._flag('dtype', col, 'error', len(chunk), f"expected numeric, found {series.dtype}")
+                series = pd.to_numeric(series, errors='coerce')
+            elif col in INTEGER_COLUMNS and not pd.api.types.is_integer_dtype(series):
+                values = series.to_numpy(dtype=np.float64)
+                self._flag('dtype', col, 'warning', (values != np.round(values)).sum(),
+                           "non-integer values")
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            self._flag('missing', col, 'error', np.isnan(values).sum(), "null or unparseable values")
+            low, high = VALUE_RANGES.get(col, (None, None))
+            out_of_range = np.zeros(len(values), dtype=bool)
+            if low is not None:
+                out_of_range |= values < low
+            if high is not None:
+                out_of_range |= values > high
+            self._flag('range', col, 'error', out_of_range.sum(),
+                       f"outside [{low if low is not None else '-inf'}, "
+                       f"{high if high is not None else 'inf'}]")
+            numeric[col] = values
+
+        codes = {}
+        for col in STRING_COLUMNS:
+            if col not in chunk.columns:
+                continue
+            series = chunk[col]
+            # Dictionary-encoded text (utils.encoding) is checked by its labels
+            text = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series
+            if not (pd.api.types.is_string_dtype(text) or pd.api.types.is_object_dtype(text)):
+                self._flag('dtype', col, 'error', len(chunk), f"expected text, found {series.dtype}")
+            labels = pa.array(series, from_pandas=True)
+            if pa.types.is_dictionary(labels.type):
+                labels = labels.cast(labels.type.value_type)
+            self._flag('missing', col, 'error', labels.null_count, "null values")
+            # A hash lookup against the small domain; string columns are already Arrow-backed
+            index = pc.index_in(labels, value_set=pa.array(CATEGORY_DOMAINS[col], labels.type))
+            unknown = pc.and_(pc.is_null(index), pc.is_valid(labels))
+            n_unknown = pc.sum(unknown).as_py() or 0
+            if n_unknown:
+                examples = sorted(map(str, pc.unique(labels.filter(unknown))[:5].to_pylist()))
+                self._flag('domain', col, 'error', n_unknown, f"unknown values, e.g. {examples}")
+            codes[col] = index.fill_null(-1).to_numpy()
+
+        if all(c in codes for c in SEGMENT_DIMENSIONS) and all(c in numeric for c in SCORED_COLUMNS):
+            self._score_records(chunk, offset, codes, numeric)
+
+    def _score_records(self, chunk, offset, codes, numeric):
+        segment = codes['Model'].astype(np.int64) * len(CATEGORY_DOMAINS['Region']) + codes['Region']
+        columns = [numeric[c] for c in SCORED_COLUMNS]
+        year = numeric.get('Year')
+        valid = segment >= 0
+        for values in columns:
+            valid &= ~np.isnan(values)
+        positions = np.flatnonzero(valid)
+        if len(positions) < len(segment):
+            segment = segment[valid]
+            columns = [values[valid] for values in columns]
+            year = None if year is None else year[valid]
+
+        # Merge the chunk's per-segment moments into the running ones (Chan et al.)
+        n = np.bincount(segment, minlength=self._n_segments).astype(np.float64)
+        total = self._count + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(total > 0, n / total, 0.0)
+            for j, values in enumerate(columns):
+                chunk_mean = np.bincount(segment, weights=values, minlength=self._n_segments) / n
+                chunk_mean[n == 0] = 0.0
+                deviation = values - chunk_mean[segment]
+                chunk_m2 = np.bincount(segment, weights=deviation * deviation, minlength=self._n_segments)
+                delta = chunk_mean - self._mean[:, j]
+                self._m2[:, j] += chunk_m2 + delta ** 2 * self._count * weight
+                self._mean[:, j] += delta * weight
+        self._count = total
+
+        # Score each record against its segment's running mean and standard deviation
+        z = np.zeros(len(segment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            inv_std = 1 / np.sqrt(self._m2 / np.maximum(self._count - 1, 1)[:, None])
+        inv_std[~np.isfinite(inv_std)] = 0.0
+        for j, values in enumerate(columns):
+            np.maximum(z, np.abs(values - self._mean[segment, j]) * inv_std[segment, j], out=z)
+        flagged = np.flatnonzero(z > Z_THRESHOLD)
+        self._anomalous_records += len(flagged)
+        room = MAX_EXAMPLES - sum(len(e) for e in self._examples)
+        if len(flagged) and room > 0:
+            flagged = flagged[:room]
+            example = chunk.iloc[positions[flagged]][SEGMENT_DIMENSIONS + ['Year'] + SCORED_COLUMNS]
+            example = example.assign(Row=offset + positions[flagged], Z_Score=z[flagged])
+            self._examples.append(example.reset_index(drop=True))
+
+        if year is not None:
+            year = year - FIRST_YEAR
+            known = (year >= 0) & (year < N_YEARS)
+            year = year[known].astype(np.int64)
+            volume = columns[SCORED_COLUMNS.index('Sales_Volume')][known]
+            self._yearly += np.bincount(segment[known] * N_YEARS + year, weights=volume,
+                                        minlength=self._yearly.size).reshape(self._yearly.shape)
+            self._years_seen |= np.bincount(year, minlength=N_YEARS) > 0
+
+    def _series_anomalies(self):
+        """Segment-years whose Sales_Volume deviates from the rolling median of prior years"""
+        seen = np.flatnonzero(self._years_seen)
+        if len(seen) <= ROLLING_YEARS:
+            return _series_frame([], [], [], [])
+        years = np.arange(seen[0], seen[-1] + 1)
+        segments = np.flatnonzero(self._count > 0)
+        panel = self._yearly[np.ix_(segments, years)]
+        years = years + FIRST_YEAR
+
+        # Window t covers years [t, t + ROLLING_YEARS) and scores year t + ROLLING_YEARS
+        windows = np.lib.stride_tricks.sliding_window_view(panel, ROLLING_YEARS, axis=1)[:, :-1]
+        median = np.median(windows, axis=2)
+        mad = np.median(np.abs(windows - median[..., None]), axis=2)
+        current = panel[:, ROLLING_YEARS:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            robust_z = np.where(mad > 0, 0.6745 * (current - median) / mad, 0.0)
+        rows, cols = np.nonzero(np.abs(robust_z) > MAD_THRESHOLD)
+        return _series_frame(segments[rows], years[ROLLING_YEARS + cols],
+                             current[rows, cols], robust_z[rows, cols])
+
+    def report(self):
+        """The QualityReport for every chunk seen so far"""
+        examples = (pd.concat(self._examples, ignore_index=True) if self._examples
+                    else pd.DataFrame(columns=SEGMENT_DIMENSIONS + ['Year'] + SCORED_COLUMNS
+                                      + ['Row', 'Z_Score']))
+        return QualityReport(self.rows, list(self.issues.values()), self._anomalous_records,
+                             examples, self._series_anomalies())
+
+
+def _series_frame(segments, years, volume, robust_z):
+    n_regions = len(CATEGORY_DOMAINS['Region'])
+    segments = np.asarray(segments, dtype=np.int64)
+    return pd.DataFrame({
+        'Model': np.array(CATEGORY_DOMAINS['Model'])[segments // n_regions],
+        'Region': np.array(CATEGORY_DOMAINS['Region'])[segments % n_regions],
+        'Year': np.asarray(years, dtype=np.int64),
+        'Sales_Volume': np.asarray(volume, dtype=np.float64),
+        'Robust_Z': np.asarray(robust_z, dtype=np.float64),
+    })
+
+
+class QualityReport:
+    """Check results and anomalies for one dataset version"""
+
+    def __init__(self, rows, issues, anomalous_records, record_anomalies, series_anomalies):
+        self.rows = rows
+        self.issues = issues
+        self.anomalous_records = anomalous_records
+        self.record_anomalies = record_anomalies
+        self.series_anomalies = series_anomalies
+
+    @property
+    def errors(self):
+        return [i for i in self.issues if i['severity'] == 'error']
+
+    @property
+    def passed(self):
+        return not self.errors
+
+    def issues_frame(self):
+        return pd.DataFrame(self.issues, columns=['check', 'column', 'severity', 'rows', 'detail'])
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'issues': self.issues,
+            'anomalous_records': self.anomalous_records,
+            'record_anomalies': self.record_anomalies.to_dict(orient='list'),
+            'series_anomalies': self.series_anomalies.to_dict(orient='list'),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['rows'], data['issues'], data['anomalous_records'],
+                   pd.DataFrame(data['record_anomalies']), pd.DataFrame(data['series_anomalies']))
+
+
+def validate(chunks):
+    """Validate a DataFrame or an iterable of DataFrame chunks; returns a QualityReport"""
+    monitor = QualityMonitor()
+    for chunk in [chunks] if isinstance(chunks, pd.DataFrame) else chunks:
+        monitor.update(chunk)
+    return monitor.report()
@@ -0,0 +1,50 @@
+"""
+Progressive rendering - fill chart placeholders as their data becomes ready
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class ProgressiveRenderer:
+    """Run chart computations in a thread pool and render each one as it finishes.
+
+    Call ``add`` while laying out the page: it reserves an ``st.empty`` placeholder in
+    ``target`` and starts ``compute`` in a worker thread. ``compute`` must not call Streamlit.
+    Call ``drain`` at the end of the script to hand each result to ``render`` on the script
+    thread, in completion order. With ``enabled=False`` every block is computed and rendered
+    inline, top-to-bottom.
+    """
+
+    def __init__(self, enabled=True, max_workers=4):
+        self.enabled = enabled
+        self._pool = ThreadPoolExecutor(max_workers=max_workers) if enabled else None
+        self._pending = {}
+
+    def add(self, target, compute, render):
+        placeholder = target.empty()
+        if not self.enabled:
+            self._show(placeholder, render, compute)
+            return
+        placeholder.info("⏳ Loading chart...")
+        self._pending[self._pool.submit(compute)] = (placeholder, render)
+
+    def drain(self):
+        if not self.enabled:
+            return
+        try:
+            for future in as_completed(self._pending):
+                placeholder, render = self._pending[future]
+                self._show(placeholder, render, future.result)
+        finally:
+            self._pending.clear()
+            self._pool.shutdown(wait=False)
+
+    @staticmethod
+    def _show(placeholder, render, get_result):
+        try:
+            result = get_result()
+        except Exception as e:
+            placeholder.error(f"Unable to render chart: {e}")
+            return
+        with placeholder.container():
+            render(result)
@@ -0,0 +1,381 @@
+"""
+Delivery routing - multi-vehicle routes from a depot to dealers, sized by sales concentration
+
+Each dealer becomes a stop whose demand (vehicles to deliver) is its share of the filtered
+regional sales, using the dealer locations in the local dealer file. Routes are built with a
+capacitated vehicle routing heuristic:
+- a great-circle distance matrix computed in one matrix product over unit vectors
+- Clarke-Wright savings over each stop's nearest neighbours, merging routes while the
+  transporter has room
+- local search until no move improves or the time budget runs out: 2-opt within every route
+  (all segment reversals scored at once) and or-opt, moving chains of up to three stops to
+  the cheapest position in any route with spare capacity
+
+Usage (from the repository root):
+    python -m utils.routing --stops 3000 --capacity 40 --budget 5   # time a synthetic instance
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.cube import load_shared_cube
+from utils.data import DATA_PATH, dataset_key
+from utils.dealers import DEALERS_PATH, EARTH_RADIUS_KM, generate_dealers, load_dealer_index, unit_vectors
+from utils.profiling import cache_miss
+
+# Great-circle distance understates driving distance; scale it to an approximate road distance
+ROAD_FACTOR = 1.3
+# Savings are evaluated only between each stop and its nearest neighbours
+SAVINGS_NEIGHBOURS = 40
+# Longest chain of consecutive stops an or-opt move relocates, and how many of its end stops'
+# nearest neighbours define the edges it may be inserted into
+OR_OPT_LENGTH = 3
+OR_OPT_NEIGHBOURS = 15
+DEFAULT_CAPACITY = 40
+DEFAULT_BUDGET = 3.0
+# Smallest improvement (km) a move must make; guards against float32 rounding cycles
+_EPSILON = 1e-3
+
+
+def distance_matrix(lat, lon):
+    """Approximate road distances in km between all points, as a float32 matrix"""
+    units = unit_vectors(np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64))
+    cosine = np.clip(units @ units.T, -1.0, 1.0)
+    return (np.arccos(cosine) * (EARTH_RADIUS_KM * ROAD_FACTOR)).astype(np.float32)
+
+
+def route_length(route, dist):
+    """Length of depot -> route -> depot; node 0 is the depot"""
+    tour = np.concatenate([[0], route, [0]]).astype(np.int64)
+    return float(dist[tour[:-1], tour[1:]].sum())
+
+
+def nearest_stops(dist, k):
+    """Row s holds stop s's k nearest other stops (ordered by distance); row 0 (the depot) is unused"""
+    n = len(dist) - 1
+    k = min(k, n - 1)
+    near = np.zeros((n + 1, max(k, 0)), dtype=np.int64)
+    if k > 0:
+        block = dist[1:, 1:].copy()
+        np.fill_diagonal(block, np.inf)
+        candidates = np.argpartition(block, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(block, candidates, axis=1), axis=1)
+        near[1:] = np.take_along_axis(candidates, order, axis=1) + 1
+    return near
+
+
+def savings_routes(dist, demand, capacity, near):
+    """Clarke-Wright parallel savings; returns a list of routes (lists of stop nodes).
+
+    demand[0] belongs to the depot. Only pairs of a stop and one of its nearest neighbours
+    (near, from nearest_stops) are considered, which keeps the candidate list linear in the
+    number of stops.
+    """
+    n = len(dist) - 1
+    if n == 0:
+        return []
+    stops = np.arange(1, n + 1)
+    if near.shape[1] > 0:
+        near = near[1:]
+        i = np.repeat(stops, near.shape[1])
+        j = near.ravel()
+        pairs = np.unique(np.sort(np.column_stack([i, j]), axis=1), axis=0)
+        saving = dist[0, pairs[:, 0]] + dist[0, pairs[:, 1]] - dist[pairs[:, 0], pairs[:, 1]]
+        order = np.argsort(-saving, kind='stable')
+        pairs = pairs[order[saving[order] > 0]]
+    else:
+        pairs = np.empty((0, 2), dtype=np.int64)
+
+    routes = {int(s): [int(s)] for s in stops}
+    route_of = np.arange(n + 1)
+    load = {int(s): float(demand[s]) for s in stops}
+    for a, b in pairs.tolist():
+        ra, rb = route_of[a], route_of[b]
+        if ra == rb or load[ra] + load[rb] > capacity:
+            continue
+        first, second = routes[ra], routes[rb]
+        # Both stops must be route ends, so the merge links them with a single new edge
+        if first[-1] == a and second[0] == b:
+            merged = first + second
+        elif first[0] == a and second[-1] == b:
+            merged = second + first
+        elif first[-1] == a and second[-1] == b:
+            merged = first + second[::-1]
+        elif first[0] == a and second[0] == b:
+            merged = first[::-1] + second
+        else:
+            continue
+        keep_id, drop_id = (ra, rb) if len(first) >= len(second) else (rb, ra)
+        route_of[routes[drop_id]] = keep_id
+        routes[keep_id] = merged
+        load[keep_id] += load.pop(drop_id)
+        del routes[drop_id]
+    return list(routes.values())
+
+
+def two_opt(route, dist, deadline):
+    """Best-improvement 2-opt on one route; returns (route, whether it improved)"""
+    tour = np.concatenate([[0], route, [0]]).astype(np.int64)
+    improved = False
+    while len(tour) > 4 and time.perf_counter() < deadline:
+        a, b = tour[:-1], tour[1:]
+        # Reversing tour[i + 1:j + 1] replaces edges (a_i, b_i), (a_j, b_j) by (a_i, a_j), (b_i, b_j)
+        delta = (dist[a[:, None], a[None, :]] + dist[b[:, None], b[None, :]]
+                 - dist[a, b][:, None] - dist[a, b][None, :])
+        delta = np.triu(delta, 2)
+        i, j = np.unravel_index(int(delta.argmin()), delta.shape)
+        if delta[i, j] >= -_EPSILON:
+            break
+        tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+        improved = True
+    return tour[1:-1].tolist(), improved
+
+
+def _edges(routes, n_points):
+    """Every route edge as parallel arrays (from, to, owning route, position within the route),
+    plus each stop's leaving and entering edge"""
+    tours = [np.concatenate([[0], r, [0]]).astype(np.int64) for r in routes]
+    sizes = np.array([len(t) - 1 for t in tours])
+    u = np.concatenate([t[:-1] for t in tours])
+    v = np.concatenate([t[1:] for t in tours])
+    owner = np.repeat(np.arange(len(routes)), sizes)
+    position = np.arange(len(u)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    leaving = np.zeros(n_points, dtype=np.int64)
+    entering = np.zeros(n_points, dtype=np.int64)
+    leaving[u[u > 0]] = np.flatnonzero(u > 0)
+    entering[v[v > 0]] = np.flatnonzero(v > 0)
+    return u, v, owner, position, np.column_stack([leaving, entering])
+
+
+def or_opt(routes, loads, dist, demand, capacity, near, deadline):
+    """One pass of or-opt moves across all routes; returns the number of moves applied.
+
+    Every chain of 1..OR_OPT_LENGTH consecutive stops is scored at once against insertion (in
+    either orientation) into the edges touching the nearest neighbours of its end stops, in any
+    route, and moved when that shortens the plan. Distant edges are never an improving
+    position in practice, and skipping them keeps each chain's scan independent of plan size.
+    routes and loads are updated in place; routes emptied by a move are removed.
+    """
+    moves = 0
+    near = near[:, :OR_OPT_NEIGHBOURS]
+    # With fewer than two stops there is no other position to move a chain to
+    if not routes or near.shape[1] == 0:
+        return moves
+    u, v, owner, position, touching = _edges(routes, len(dist))
+    for length in range(1, OR_OPT_LENGTH + 1):
+        r = 0
+        while r < len(routes):
+            s = 0
+            while s + length <= len(routes[r]):
+                if time.perf_counter() >= deadline:
+                    return moves
+                route = routes[r]
+                first, last = route[s], route[s + length - 1]
+                before = route[s - 1] if s > 0 else 0
+                after = route[s + length] if s + length < len(route) else 0
+                removal = dist[before, first] + dist[last, after] - dist[before, after]
+                chain_load = float(demand[route[s:s + length]].sum())
+
+                edges = np.unique(touching[near[[first, last]]].ravel())
+                eu, ev, eowner, eposition = u[edges], v[edges], owner[edges], position[edges]
+                forward = dist[eu, first] + dist[last, ev]
+                backward = dist[eu, last] + dist[first, ev]
+                insertion = np.minimum(forward, backward) - dist[eu, ev]
+                # The chain's own edges are not insertion points, and other routes need room
+                own = (eowner == r) & (eposition >= s) & (eposition <= s + length)
+                full = (eowner != r) & (np.asarray(loads)[eowner] + chain_load > capacity)
+                insertion[own | full] = np.inf
+                best = int(insertion.argmin())
+                if insertion[best] - removal >= -_EPSILON:
+                    s += 1
+                    continue
+
+                chain = route[s:s + length]
+                if backward[best] < forward[best]:
+                    chain = chain[::-1]
+                target, at = int(eowner[best]), int(eposition[best])
+                remaining = route[:s] + route[s + length:]
+                if target == r:
+                    at = at - length if at > s else at
+                    routes[r] = remaining[:at] + chain + remaining[at:]
+                else:
+                    routes[r] = remaining
+                    routes[target] = routes[target][:at] + chain + routes[target][at:]
+                    loads[r] -= chain_load
+                    loads[target] += chain_load
+                moves += 1
+                if not routes[r]:
+                    del routes[r]
+                    del loads[r]
+                u, v, owner, position, touching = _edges(routes, len(dist))
+                if r >= len(routes):
+                    break
+            r += 1
+    return moves
+
+
+def solve(lat, lon, demand, capacity=DEFAULT_CAPACITY, time_budget=DEFAULT_BUDGET):
+    """Capacitated routes over points whose first entry is the depot.
+
+    demand has one entry per point (the depot's is ignored); a stop that needs more than a full
+    transporter gets dedicated full-load trips for the excess. Any number of stops is solved,
+    including none or one. Returns (routes, loads, stats), routes being lists of point indices
+    without the depot.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget
+    demand = np.asarray(demand, dtype=np.float64).copy()
+    demand[0] = 0
+    full_trips = np.floor(np.maximum(demand - _EPSILON, 0) / capacity).astype(np.int64)
+    demand -= full_trips * capacity
+
+    dist = distance_matrix(lat, lon)
+    matrix_seconds = time.perf_counter() - start
+    near = nearest_stops(dist, max(SAVINGS_NEIGHBOURS, OR_OPT_NEIGHBOURS))
+    routes = savings_routes(dist, demand, capacity, near)
+    savings_km = sum(route_length(r, dist) for r in routes)
+    construction_seconds = time.perf_counter() - start
+
+    loads = [float(demand[r].sum()) for r in routes]
+    moves, converged = 0, False
+    while time.perf_counter() < deadline:
+        improved = False
+        for i, route in enumerate(routes):
+            routes[i], changed = two_opt(route, dist, deadline)
+            improved |= changed
+        applied = or_opt(routes, loads, dist, demand, capacity, near, deadline)
+        moves += applied
+        if not improved and not applied:
+            converged = True
+            break
+
+    shuttles = [[int(s)] for s in np.repeat(np.arange(len(demand)), full_trips)]
+    routes = routes + shuttles
+    loads = loads + [float(capacity)] * len(shuttles)
+    lengths = [route_length(r, dist) for r in routes]
+    stats = {
+        'stops': len(demand) - 1,
+        'vehicles': len(routes),
+        'full_load_trips': len(shuttles),
+        'savings_km': savings_km + sum(route_length(r, dist) for r in shuttles),
+        'total_km': sum(lengths),
+        'route_km': lengths,
+        'local_search_moves': moves,
+        'converged': converged,
+        'matrix_seconds': matrix_seconds,
+        'construction_seconds': construction_seconds,
+        'seconds': time.perf_counter() - start,
+    }
+    return routes, loads, stats
+
+
+def delivery_stops(dealers, credited_sales, vehicles, max_stops):
+    """The max_stops dealers with the most credited sales, with integer vehicle demand.
+
+    vehicles (the size of the delivery wave) is split across the stops in proportion to their
+    credited sales, by largest remainder so the demands add up exactly; every stop gets at least one.
+    """
+    top = np.argsort(-credited_sales, kind='stable')[:max_stops]
+    top = top[credited_sales[top] > 0]
+    stops = dealers.iloc[top].reset_index(drop=True)
+    share = credited_sales[top] / credited_sales[top].sum() * max(vehicles, len(top))
+    demand = np.floor(share).astype(np.int64)
+    shortfall = max(vehicles, len(top)) - demand.sum()
+    demand[np.argsort(demand - share, kind='stable')[:shortfall]] += 1
+    return stops.assign(Credited_Sales=credited_sales[top], Demand=np.maximum(demand, 1))
+
+
+def depot_location(stops):
+    """The stop closest to the demand-weighted centre of the stops, as (lat, lon)"""
+    units = unit_vectors(stops['Latitude'].to_numpy(), stops['Longitude'].to_numpy())
+    centre = (units * stops['Demand'].to_numpy()[:, None]).sum(axis=0)
+    nearest = int((units @ centre).argmax())
+    return float(stops['Latitude'].iat[nearest]), float(stops['Longitude'].iat[nearest])
+
+
+def plan_stops(stops, depot, capacity=DEFAULT_CAPACITY, time_budget=DEFAULT_BUDGET):
+    """Solve routes for a stop frame; returns (stops with Route/Sequence columns, route summary, stats)"""
+    lat = np.concatenate([[depot[0]], stops['Latitude'].to_numpy(dtype=np.float64)])
+    lon = np.concatenate([[depot[1]], stops['Longitude'].to_numpy(dtype=np.float64)])
+    demand = np.concatenate([[0], stops['Demand'].to_numpy(dtype=np.float64)])
+    routes, loads, stats = solve(lat, lon, demand, capacity, time_budget)
+
+    # Routes are numbered longest first; full-load trips (the last routes) come after them
+    lengths = stats.pop('route_km')
+    regular = len(routes) - stats['full_load_trips']
+    order = sorted(range(regular), key=lambda i: -lengths[i]) + list(range(regular, len(routes)))
+    route_id = np.zeros(len(lat), dtype=np.int64)
+    sequence = np.zeros(len(lat), dtype=np.int64)
+    summary = []
+    for number, i in enumerate(order, start=1):
+        route = np.asarray(routes[i])
+        if i < regular:
+            route_id[route] = number
+            sequence[route] = np.arange(1, len(route) + 1)
+        summary.append({'Route': number, 'Stops': len(route), 'Load': int(round(loads[i])),
+                        'Distance_KM': lengths[i], 'Full_Load_Trip': i >= regular,
+                        'Path': route.tolist()})
+    stops = stops.assign(Route=route_id[1:], Sequence=sequence[1:])
+    return stops, pd.DataFrame(summary), stats
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _delivery_plan(key, dealers_key, source, dealers_path, region, selection, vehicles, max_stops,
+                   capacity, time_budget):
+    cache_miss('delivery_plan')
+    index = load_dealer_index(dealers_path)
+    sales = load_shared_cube(source).aggregate(['Region'], dict(selection))
+    credited = index.point_weights(sales.set_index('Region')['Sales_Volume'])
+    in_region = (index.dealers['Region'] == region).to_numpy()
+    stops = delivery_stops(index.dealers[in_region], credited[in_region], vehicles, max_stops)
+    if stops.empty:
+        return None
+    depot = depot_location(stops)
+    stops, summary, stats = plan_stops(stops, depot, capacity, time_budget)
+    return depot, stops, summary, stats
+
+
+def delivery_plan(region, selection=None, vehicles=2000, max_stops=300, capacity=DEFAULT_CAPACITY,
+                  time_budget=DEFAULT_BUDGET, source=DATA_PATH, dealers_path=DEALERS_PATH):
+    """Routes delivering a wave of vehicles to a region's dealers, cached per input.
+
+    Returns (depot, stops, route summary, stats), or None when no dealer in the region has sales
+    under the selection. Requires the dealer file (see utils.dealers).
+    """
+    frozen = tuple(sorted((dim, tuple(labels)) for dim, labels in (selection or {}).items()
+                          if labels is not None))
+    return _delivery_plan(dataset_key(source), dataset_key(dealers_path), str(source), str(dealers_path),
+                          region, frozen, vehicles, max_stops, capacity, time_budget)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve delivery routes for synthetic dealers")
+    parser.add_argument('--stops', type=int, default=3000)
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument('--vehicles', type=int, default=None, help="Vehicles to deliver; default 4 per stop")
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="Seconds of local search")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    dealers = generate_dealers(args.stops * 6, args.seed)
+    dealers = dealers[dealers['Region'] == 'Europe'].reset_index(drop=True)
+    stops = delivery_stops(dealers, dealers['Weight'].to_numpy(), args.vehicles or 4 * args.stops, args.stops)
+    stops, summary, stats = plan_stops(stops, depot_location(stops), args.capacity, args.budget)
+    print(f"{stats['stops']:,} stops, {stats['vehicles']:,} routes "
+          f"({stats['full_load_trips']:,} full-load trips)", file=sys.stderr)
+    print(f"  distance matrix    {stats['matrix_seconds']:.2f}s", file=sys.stderr)
+    print(f"  savings            {stats['construction_seconds']:.2f}s  {stats['savings_km']:,.0f} km",
+          file=sys.stderr)
+    print(f"  local search       {stats['seconds']:.2f}s  {stats['total_km']:,.0f} km, "
+          f"{stats['local_search_moves']:,} or-opt moves"
+          f"{'' if stats['converged'] else ' (time budget reached)'}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
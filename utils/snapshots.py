@@ -0,0 +1,401 @@
+"""
+Dataset snapshots - versioned copies of the sales data in content-addressed columnar chunks
+
+A version is a JSON manifest listing chunk hashes. Chunk boundaries are content-defined: a
+chunk ends after any row whose hash has its top bits zero, so inserting or editing a few rows
+changes only the chunks around them and every other chunk is shared with earlier versions.
+Each chunk is stored once, as a zstd-compressed Arrow file named by its hash, together with
+the hash of every row. Diffs compare chunk hash lists first and read only the chunks that
+differ, matching their rows by hash.
+
+Usage (from the repository root):
+    python -m utils.snapshots commit -m "Initial import"
+    python -m utils.snapshots commit --source updated.csv -m "March refresh"
+    python -m utils.snapshots log
+    python -m utils.snapshots diff 1a2b3c 4d5e6f
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import pyarrow as pa
+import streamlit as st
+from pandas.util import hash_array
+
+from utils.cube import load_shared_cube
+from utils.data import CACHE_DIR, DATA_PATH, ROOT, dataset_key, load_shared_data, read_sales_csv, write_columnar
+from utils.encoding import decode_table
+from utils.profiling import cache_miss
+
+SNAPSHOT_DIR = Path(os.environ.get('PORTFOLIO_SNAPSHOT_DIR', ROOT / 'snapshots'))
+
+# Content-defined chunking: a boundary follows about one row in AVERAGE_CHUNK_ROWS
+AVERAGE_CHUNK_ROWS = 8_192
+MIN_CHUNK_ROWS = 1_024
+MAX_CHUNK_ROWS = 65_536
+
+ROW_HASH_COLUMN = '__row_hash'
+_NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+_HASH_PRIME = np.uint64(0x100000001B3)
+
+
+def row_hashes(df):
+    """64-bit content hash of every row of df.
+
+    Text columns are hashed per distinct label and gathered by code, which is several times
+    faster than hashing every string.
+    """
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series):
+            column_hashes = hash_array(series.to_numpy())
+        else:
+            codes, uniques = pd.factorize(series)
+            # Code -1 (null) picks the sentinel appended at the end
+            column_hashes = np.append(hash_array(np.asarray(uniques, dtype=object)), _NULL_HASH)[codes]
+        hashes = (hashes ^ column_hashes) * _HASH_PRIME
+    return hashes
+
+
+def chunk_boundaries(hashes, average=AVERAGE_CHUNK_ROWS, minimum=MIN_CHUNK_ROWS,
+                     maximum=MAX_CHUNK_ROWS):
+    """End offsets of content-defined chunks over a row-hash array"""
+    mask = np.uint64(average - 1)
+    candidates = np.flatnonzero((hashes >> np.uint64(40)) & mask == 0) + 1
+    ends, start = [], 0
+    for end in np.append(candidates, len(hashes)):
+        while end - start > maximum:
+            start += maximum
+            ends.append(start)
+        if end - start >= minimum or (end == len(hashes) and end > start):
+            ends.append(int(end))
+            start = end
+    return ends
+
+
+def _schema_signature(df):
+    # Dictionary-encoded text columns sign as their labels' type, so the same rows chunk alike
+    # whether they come from the CSV or the columnar cache
+    return json.dumps([[col, str(dtype.categories.dtype if isinstance(dtype, pd.CategoricalDtype) else dtype)]
+                       for col, dtype in df.dtypes.items()])
+
+
+class SnapshotDiff:
+    """Rows added and removed between two versions, and how many chunks they share"""
+
+    def __init__(self, old, new, shared_chunks, old_chunks, new_chunks, added, removed):
+        self.old = old
+        self.new = new
+        self.shared_chunks = shared_chunks
+        self.old_chunks = old_chunks
+        self.new_chunks = new_chunks
+        self.added = added
+        self.removed = removed
+
+    def summary(self):
+        return (f"{len(self.added):,} rows added, {len(self.removed):,} rows removed; "
+                f"{self.shared_chunks} of {self.new_chunks} chunks unchanged")
+
+
+class SnapshotStore:
+    """Chunk objects under objects/ and one manifest per version under versions/"""
+
+    def __init__(self, root=SNAPSHOT_DIR, checkout_dir=CACHE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / 'objects'
+        self.manifests = self.root / 'versions'
+        self.checkouts = Path(checkout_dir)
+
+    def _object_path(self, chunk_hash):
+        return self.objects / chunk_hash[:2] / f'{chunk_hash}.arrow'
+
+    def _chunks(self, df):
+        """(hash, row hashes, start, end) for each content-defined chunk of df"""
+        hashes = row_hashes(df)
+        signature = _schema_signature(df).encode()
+        chunks, start = [], 0
+        for end in chunk_boundaries(hashes):
+            digest = hashlib.sha256(signature + hashes[start:end].tobytes()).hexdigest()
+            chunks.append((digest, hashes[start:end], start, end))
+            start = end
+        return chunks
+
+    def _write_object(self, chunk_hash, rows, hashes):
+        path = self._object_path(chunk_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Objects store text as large_string, so chunks concatenate whichever frame they came from
+        table = decode_table(pa.Table.from_pandas(rows, preserve_index=False)).append_column(
+            ROW_HASH_COLUMN, pa.array(hashes))
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+        with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+        return path.stat().st_size
+
+    def _read_object(self, chunk_hash):
+        # Objects written with string columns are cast to the same large_string schema
+        return decode_table(pa.ipc.open_file(pa.memory_map(str(self._object_path(chunk_hash)), 'r')).read_all())
+
+    # Versions
+
+    def commit(self, df, message='', parent=None):
+        """Store df as a version; returns its manifest (unchanged if the content already exists)"""
+        chunks = self._chunks(df)
+        version = hashlib.sha256(''.join(c[0] for c in chunks).encode()).hexdigest()[:12]
+        path = self.manifests / f'{version}.json'
+        if path.exists():
+            return self.manifest(version)
+
+        written_bytes = new_chunks = 0
+        for chunk_hash, hashes, start, end in chunks:
+            if not self._object_path(chunk_hash).exists():
+                written_bytes += self._write_object(chunk_hash, df.iloc[start:end], hashes)
+                new_chunks += 1
+
+        manifest = {
+            'version': version,
+            'parent': parent,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'message': message,
+            'rows': len(df),
+            'columns': list(df.columns),
+            'chunks': [{'hash': c[0], 'rows': c[3] - c[2]} for c in chunks],
+            'new_chunks': new_chunks,
+            'written_bytes': written_bytes,
+        }
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(manifest, indent=2))
+        return manifest
+
+    def versions(self):
+        """Manifests of every version, newest first"""
+        if not self.manifests.exists():
+            return []
+        manifests = [json.loads(p.read_text()) for p in self.manifests.glob('*.json')]
+        return sorted(manifests, key=lambda m: m['created'], reverse=True)
+
+    def resolve(self, version):
+        """Full version id for a unique prefix"""
+        matches = [p.stem for p in self.manifests.glob(f'{version}*.json')]
+        if len(matches) != 1:
+            raise KeyError(f"{'Ambiguous' if matches else 'Unknown'} dataset version: {version}")
+        return matches[0]
+
+    def manifest(self, version):
+        return json.loads((self.manifests / f'{self.resolve(version)}.json').read_text())
+
+    def load(self, version):
+        """Reassemble a version as a DataFrame"""
+        tables = [self._read_object(c['hash']) for c in self.manifest(version)['chunks']]
+        return pa.concat_tables(tables).drop_columns(ROW_HASH_COLUMN).to_pandas()
+
+    def checkout(self, version):
+        """Materialize a version as an Arrow file usable as a data source; returns its path"""
+        manifest = self.manifest(version)
+        path = self.checkouts / f"snapshot-{manifest['version']}.arrow"
+        if not path.exists():
+            tables = [self._read_object(c['hash']) for c in manifest['chunks']]
+            write_columnar(pa.concat_tables(tables).drop_columns(ROW_HASH_COLUMN), path)
+        return path
+
+    # Diffs
+
+    def _side(self, version):
+        """Chunk hashes plus loaders for a version id or an uncommitted DataFrame"""
+        if isinstance(version, pd.DataFrame):
+            df = version
+            chunks = {c[0]: c for c in self._chunks(df)}
+            hashes = list(chunks)
+
+            def rows(chunk_hash):
+                _, row_hash, start, end = chunks[chunk_hash]
+                return df.iloc[start:end].reset_index(drop=True), row_hash
+        else:
+            hashes = [c['hash'] for c in self.manifest(version)['chunks']]
+
+            def rows(chunk_hash):
+                table = self._read_object(chunk_hash)
+                row_hash = table.column(ROW_HASH_COLUMN).to_numpy()
+                return table.drop_columns(ROW_HASH_COLUMN).to_pandas(), row_hash
+        return hashes, rows
+
+    def diff(self, old, new):
+        """Rows of new that are not in old (added) and of old that are not in new (removed).
+
+        old and new are version ids or DataFrames. Shared chunks are skipped without reading
+        them; rows of the remaining chunks are matched by content hash, so an edited row shows
+        up as one removal and one addition.
+        """
+        old_hashes, old_rows = self._side(old)
+        new_hashes, new_rows = self._side(new)
+        shared = set(old_hashes) & set(new_hashes)
+        removed_parts = [old_rows(h) for h in dict.fromkeys(old_hashes) if h not in shared]
+        added_parts = [new_rows(h) for h in dict.fromkeys(new_hashes) if h not in shared]
+
+        def only_in(parts, other_parts):
+            other = np.concatenate([p[1] for p in other_parts]) if other_parts else np.array([], np.uint64)
+            frames = [rows[~np.isin(hashes, other)] for rows, hashes in parts]
+            return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        return SnapshotDiff(
+            old=old if isinstance(old, str) else None,
+            new=new if isinstance(new, str) else None,
+            shared_chunks=sum(h in shared for h in new_hashes),
+            old_chunks=len(old_hashes),
+            new_chunks=len(new_hashes),
+            added=only_in(added_parts, removed_parts),
+            removed=only_in(removed_parts, added_parts),
+        )
+
+
+# Streamlit integration: pinned versions are checked out once and then behave like any other
+# data source, so every per-source cache (dataset, cube, forecast) is kept per version.
+
+WORKING_COPY = 'Working copy'
+
+
+def default_store():
+    return SnapshotStore(SNAPSHOT_DIR)
+
+
+@st.cache_resource(show_spinner=False)
+def _checkout(version):
+    cache_miss('snapshot_checkout')
+    return str(default_store().checkout(version))
+
+
+def snapshot_source(version=None):
+    """Data source for a version id, or the working-copy CSV for None"""
+    return DATA_PATH if version is None else Path(_checkout(version))
+
+
+@st.cache_data(show_spinner=False)
+def _diff_for(old, new, working_key):
+    cache_miss('snapshot_diff')
+    store = default_store()
+    return store.diff(load_shared_data() if old is None else old,
+                      load_shared_data() if new is None else new)
+
+
+def version_diff(old, new):
+    """Cached diff between two version ids, where None is the working copy"""
+    return _diff_for(old, new, dataset_key(DATA_PATH))
+
+
+def version_sidebar(page):
+    """Sidebar controls to pin a dataset version and pick one to compare with.
+
+    Returns (pinned, compare, comparing); version ids of None mean the working copy.
+    """
+    versions = default_store().versions()
+    if not versions:
+        return None, None, False
+    labels = {m['version']: f"{m['version'][:8]} · {m['created'][:10]} · {m['message'] or 'no message'}"
+              for m in versions}
+
+    st.sidebar.header("🗂️ Dataset Version")
+    label = lambda v: WORKING_COPY if v is None else labels[v]
+    options = [None] + list(labels)
+    pinned = st.sidebar.selectbox("Pin version", options, format_func=label,
+                                  key=f'{page}_pinned_version')
+    compare = None
+    if st.sidebar.toggle("Compare with another version", key=f'{page}_compare_versions'):
+        compare = st.sidebar.selectbox("Compare with", [v for v in options if v != pinned],
+                                       format_func=label, key=f'{page}_compare_version')
+        return pinned, compare, True
+    return pinned, compare, False
+
+
+def render_comparison(pinned, compare, selection=None):
+    """Diff summary, KPI deltas and per-Model sales changes between two versions.
+
+    Aggregates come from each version's cached SalesCube, restricted to selection.
+    """
+    selection = selection or {}
+    name = lambda v: WORKING_COPY if v is None else v[:8]
+    diff = version_diff(compare, pinned)
+    cube = load_shared_cube(snapshot_source(pinned))
+    other = load_shared_cube(snapshot_source(compare))
+
+    st.subheader(f"🆚 Version Comparison: {name(pinned)} vs. {name(compare)}")
+    st.caption(diff.summary())
+
+    kpis, other_kpis = cube.kpis(selection), other.kpis(selection)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Rows Added", f"{len(diff.added):,}")
+    with col2:
+        st.metric("Rows Removed", f"{len(diff.removed):,}")
+    with col3:
+        st.metric("Total Sales Volume", f"{kpis['total_sales']:,.0f}",
+                  delta=f"{kpis['total_sales'] - other_kpis['total_sales']:+,.0f}")
+    with col4:
+        st.metric("Average Price", f"${kpis['avg_price']:,.0f}",
+                  delta=f"{kpis['avg_price'] - other_kpis['avg_price']:+,.0f}")
+
+    by_model = (cube.aggregate(['Model'], selection).set_index('Model')['Sales_Volume']
+                .sub(other.aggregate(['Model'], selection).set_index('Model')['Sales_Volume'],
+                     fill_value=0)
+                .rename('Sales_Change').reset_index())
+    if by_model['Sales_Change'].any():
+        fig = px.bar(by_model, x='Model', y='Sales_Change',
+                     title=f"Sales Volume Change by Model ({name(compare)} → {name(pinned)})",
+                     labels={'Sales_Change': 'Change in Sales Volume'},
+                     color='Sales_Change', color_continuous_scale='RdBu', color_continuous_midpoint=0)
+        fig.update_layout(height=400, coloraxis_showscale=False)
+        st.plotly_chart(fig, use_container_width=True)
+
+    if len(diff.added) or len(diff.removed):
+        with st.expander("📝 Changed Rows"):
+            st.markdown("**Added**")
+            st.dataframe(diff.added.head(1_000), hide_index=True, use_container_width=True)
+            st.markdown("**Removed**")
+            st.dataframe(diff.removed.head(1_000), hide_index=True, use_container_width=True)
+
+
+# Command line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--store', type=Path, default=SNAPSHOT_DIR, help="Snapshot store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commit = commands.add_parser('commit', help="Store a CSV as a new version")
+    commit.add_argument('--source', type=Path, default=DATA_PATH)
+    commit.add_argument('-m', '--message', default='')
+    commands.add_parser('log', help="List versions, newest first")
+    diff = commands.add_parser('diff', help="Row-level diff between two versions")
+    diff.add_argument('old')
+    diff.add_argument('new')
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.store)
+    if args.command == 'commit':
+        versions = store.versions()
+        manifest = store.commit(read_sales_csv(args.source), args.message,
+                                parent=versions[0]['version'] if versions else None)
+        print(f"{manifest['version']}: {manifest['rows']:,} rows in {len(manifest['chunks'])} chunks, "
+              f"{manifest['new_chunks']} new ({manifest['written_bytes'] / 1e6:.2f} MB written)")
+    elif args.command == 'log':
+        for m in store.versions():
+            print(f"{m['version']}  {m['created']}  {m['rows']:>12,} rows  {m['message']}")
+    else:
+        result = store.diff(store.resolve(args.old), store.resolve(args.new))
+        print(result.summary())
+        for label, rows in (('+', result.added), ('-', result.removed)):
+            for row in rows.head(20).itertuples(index=False):
+                print(label, ', '.join(map(str, row)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
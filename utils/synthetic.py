@@ -0,0 +1,239 @@
+"""
+Synthetic BMW sales data - learn the distributions of the real dataset and sample
+arbitrarily large look-alike datasets in constant memory
+
+The model draws Model from its marginal, every other categorical column (including Year)
+from its distribution conditional on Model, and the numeric columns from a Gaussian copula
+whose marginals are per-Model empirical quantile functions. Sales_Classification is
+re-derived from Sales_Volume using the class boundaries observed in the source file.
+
+Usage (from the repository root):
+    python -m utils.synthetic --rows 5000000 --output bmw_5m.parquet
+    python -m utils.synthetic --rows 50000000 --output bmw_50m.csv --processes 8
+"""
+
+import argparse
+import sys
+import time
+from itertools import islice
+from multiprocessing import Pool, cpu_count
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from utils.data import DATA_PATH, read_sales_csv
+
+GROUP_COLUMN = 'Model'
+CATEGORICAL_COLUMNS = ['Year', 'Region', 'Color', 'Fuel_Type', 'Transmission']
+NUMERIC_COLUMNS = ['Engine_Size_L', 'Mileage_KM', 'Price_USD', 'Sales_Volume']
+CLASS_COLUMN = 'Sales_Classification'
+CLASS_SOURCE = 'Sales_Volume'
+
+N_QUANTILES = 257
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+class SyntheticSalesModel:
+    """Fitted distributions of the BMW sales columns, picklable for worker processes"""
+
+    def __init__(self, columns, models, model_probs, conditionals, quantiles, decimals,
+                 integer_columns, correlation, class_labels, class_lower_bounds):
+        self.columns = columns
+        self.models = models
+        self.model_probs = model_probs
+        self.conditionals = conditionals
+        self.quantiles = quantiles
+        self.decimals = decimals
+        self.integer_columns = integer_columns
+        self.correlation = correlation
+        self.class_labels = class_labels
+        self.class_lower_bounds = class_lower_bounds
+        self._cholesky = np.linalg.cholesky(correlation)
+
+    @classmethod
+    def fit(cls, df):
+        """Learn marginal and Model-conditional distributions from a sales DataFrame"""
+        counts = df[GROUP_COLUMN].value_counts().sort_index()
+        models = counts.index.to_numpy()
+        model_probs = (counts / counts.sum()).to_numpy()
+        grid = np.linspace(0, 1, N_QUANTILES)
+
+        conditionals = {}
+        for col in CATEGORICAL_COLUMNS:
+            table = pd.crosstab(df[GROUP_COLUMN], df[col], normalize='index').reindex(models)
+            conditionals[col] = (table.columns.to_numpy(), table.to_numpy())
+
+        quantiles, decimals, integer_columns = {}, {}, []
+        scores = np.empty((len(df), len(NUMERIC_COLUMNS)))
+        groups = df.groupby(GROUP_COLUMN)
+        group_sizes = df[GROUP_COLUMN].map(counts).to_numpy()
+        for j, col in enumerate(NUMERIC_COLUMNS):
+            quantiles[col] = np.vstack([np.quantile(groups.get_group(m)[col], grid) for m in models])
+            decimals[col] = _decimals(df[col])
+            if pd.api.types.is_integer_dtype(df[col]):
+                integer_columns.append(col)
+            # Normal scores of within-Model ranks feed the copula correlation
+            pct = groups[col].rank(method='average', pct=True).to_numpy()
+            scores[:, j] = ndtri(np.clip(pct - 0.5 / group_sizes, 1e-9, 1 - 1e-9))
+
+        correlation = _nearest_correlation(np.corrcoef(scores, rowvar=False))
+
+        bounds = df.groupby(CLASS_COLUMN)[CLASS_SOURCE].min().sort_values()
+
+        return cls(
+            columns=list(df.columns),
+            models=models,
+            model_probs=model_probs,
+            conditionals=conditionals,
+            quantiles=quantiles,
+            decimals=decimals,
+            integer_columns=integer_columns,
+            correlation=correlation,
+            class_labels=bounds.index.to_numpy(),
+            class_lower_bounds=bounds.to_numpy(),
+        )
+
+    def sample(self, n_rows, rng):
+        """Draw n_rows synthetic records as a DataFrame"""
+        model_idx = rng.choice(len(self.models), size=n_rows, p=self.model_probs)
+        out = {GROUP_COLUMN: self.models[model_idx]}
+
+        for col in CATEGORICAL_COLUMNS:
+            values, probs = self.conditionals[col]
+            codes = np.empty(n_rows, dtype=np.int64)
+            for m in range(len(self.models)):
+                rows = model_idx == m
+                codes[rows] = rng.choice(len(values), size=rows.sum(), p=probs[m])
+            out[col] = values[codes]
+
+        uniforms = ndtr(rng.standard_normal((n_rows, len(NUMERIC_COLUMNS))) @ self._cholesky.T)
+        grid = np.linspace(0, 1, N_QUANTILES)
+        for j, col in enumerate(NUMERIC_COLUMNS):
+            values = np.empty(n_rows)
+            for m in range(len(self.models)):
+                rows = model_idx == m
+                values[rows] = np.interp(uniforms[rows, j], grid, self.quantiles[col][m])
+            values = np.round(values, self.decimals[col])
+            out[col] = values.astype(np.int64) if col in self.integer_columns else values
+
+        class_idx = np.searchsorted(self.class_lower_bounds, out[CLASS_SOURCE], side='right') - 1
+        out[CLASS_COLUMN] = self.class_labels[np.clip(class_idx, 0, len(self.class_labels) - 1)]
+
+        return pd.DataFrame(out, columns=self.columns)
+
+
+def _decimals(series, max_decimals=6):
+    """Smallest number of decimals that represents every value in series"""
+    if pd.api.types.is_integer_dtype(series):
+        return 0
+    values = series.to_numpy(dtype=float)
+    for d in range(max_decimals + 1):
+        if np.allclose(values, np.round(values, d)):
+            return d
+    return max_decimals
+
+
+def _nearest_correlation(matrix, eps=1e-6):
+    """Clip negative eigenvalues so the matrix is a valid (positive definite) correlation"""
+    eigvals, eigvecs = np.linalg.eigh(matrix)
+    fixed = eigvecs @ np.diag(np.maximum(eigvals, eps)) @ eigvecs.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+# Chunked, multi-process generation
+
+_worker_model = None
+
+
+def _init_worker(model):
+    global _worker_model
+    _worker_model = model
+
+
+def _sample_chunk(task):
+    n_rows, seed = task
+    return _worker_model.sample(n_rows, np.random.default_rng(seed))
+
+
+def iter_chunks(model, n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42, processes=None):
+    """Yield synthetic DataFrames of at most chunk_rows rows, n_rows in total.
+
+    Chunks are sampled in a process pool but requested in bounded windows, so at most
+    two chunks per worker are held in memory regardless of n_rows. Each chunk has its own
+    child seed, so the output is reproducible for a given seed and chunk size.
+    """
+    n_chunks = -(-n_rows // chunk_rows)
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    tasks = ((min(chunk_rows, n_rows - i * chunk_rows), seeds[i]) for i in range(n_chunks))
+    processes = processes or cpu_count()
+
+    if processes == 1:
+        _init_worker(model)
+        for task in tasks:
+            yield _sample_chunk(task)
+        return
+
+    with Pool(processes, initializer=_init_worker, initargs=(model,)) as pool:
+        while True:
+            window = list(islice(tasks, processes * 2))
+            if not window:
+                break
+            yield from pool.imap(_sample_chunk, window)
+
+
+def write_dataset(path, chunks):
+    """Stream DataFrame chunks to a CSV or Parquet file (chosen by suffix); returns rows written"""
+    path = Path(path)
+    rows = 0
+    if path.suffix == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table.cast(writer.schema))
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, 'w', newline='') as f:
+            for chunk in chunks:
+                chunk.to_csv(f, header=rows == 0, index=False)
+                rows += len(chunk)
+    return rows
+
+
+def generate(path, n_rows, source=DATA_PATH, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42, processes=None):
+    """Fit the model on source and write n_rows synthetic records to path"""
+    model = SyntheticSalesModel.fit(read_sales_csv(source))
+    return write_dataset(path, iter_chunks(model, n_rows, chunk_rows, seed, processes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--output', type=Path, required=True,
+                        help='Destination file; .parquet writes Parquet, anything else CSV')
+    parser.add_argument('--source', type=Path, default=DATA_PATH)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = generate(args.output, args.rows, args.source, args.chunk_rows, args.seed, args.processes)
+    print(f"Wrote {rows:,} rows to {args.output} in {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,403 @@
+"""
+Telemetry - A/B variant assignment and engagement events for the EDA Gallery charts
+
+Each browser session is assigned one variant per experiment, kept in session state so it
+stays fixed across reruns. Exposures, chart selections and helpfulness votes are appended to
+an in-memory ring buffer; a background thread drains the buffer in batches to a local SQLite
+database (or Parquet files), so recording an event never waits on disk.
+
+Privacy: events carry a random per-session token, the experiment, variant, event type, a
+numeric value and a timestamp, and nothing else - no IP address, user agent, user name or
+query content. Sessions that send "Do Not Track", opt out in the sidebar or run with
+PORTFOLIO_TELEMETRY=0 record nothing.
+
+Usage (from the repository root):
+    python -m utils.telemetry --simulate 2000    # record simulated sessions for the A/B Tests page
+"""
+
+import argparse
+import atexit
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+from scipy import stats
+
+from utils.data import ROOT
+
+TELEMETRY_DIR = Path(os.environ.get('PORTFOLIO_TELEMETRY_DIR', ROOT / 'telemetry'))
+ENV_FLAG = 'PORTFOLIO_TELEMETRY'
+SINK_ENV = 'PORTFOLIO_TELEMETRY_SINK'
+
+# Experiments on the EDA Gallery; the first variant is the original chart
+EXPERIMENTS = {
+    'model_color_chart': {
+        'title': "Chart 1: Sales by Model and Color",
+        'variants': ['heatmap', 'stacked_bar'],
+    },
+    'model_yearly_chart': {
+        'title': "Chart 2: Model Sales by Year",
+        'variants': ['bar', 'line'],
+    },
+}
+EVENT_COLUMNS = ['ts', 'session', 'experiment', 'variant', 'event', 'value']
+
+# Ring buffer size, and the batch size / interval at which the background thread flushes
+BUFFER_EVENTS = 65536
+FLUSH_EVENTS = 512
+FLUSH_SECONDS = 2.0
+ALPHA = 0.05
+
+_FALSY = {'0', 'false', 'no', 'off'}
+
+
+class RingBuffer:
+    """Bounded event buffer; when full, the oldest events are overwritten and counted as dropped"""
+
+    def __init__(self, capacity=BUFFER_EVENTS):
+        self._events = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._events)
+
+    def append(self, event):
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+
+    def drain(self, limit):
+        """Remove and return up to limit of the oldest events"""
+        with self._lock:
+            return [self._events.popleft() for _ in range(min(limit, len(self._events)))]
+
+
+class SQLiteSink:
+    """Events table in a local SQLite database; each batch is one transaction"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS events '
+                         '(ts REAL, session TEXT, experiment TEXT, variant TEXT, event TEXT, value REAL)')
+
+    def write(self, rows):
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany('INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def read(self):
+        if not self.path.exists():
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        with sqlite3.connect(self.path) as conn:
+            return pd.read_sql_query('SELECT * FROM events', conn)
+
+
+class ParquetSink:
+    """One Parquet file per batch in a directory"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def write(self, rows):
+        table = pa.Table.from_pandas(pd.DataFrame(rows, columns=EVENT_COLUMNS), preserve_index=False)
+        name = f'events-{time.time_ns()}-{os.getpid()}'
+        tmp = self.directory / f'{name}.tmp'
+        pq.write_table(table, tmp)
+        os.replace(tmp, self.directory / f'{name}.parquet')
+
+    def read(self):
+        files = sorted(self.directory.glob('events-*.parquet'))
+        if not files:
+            return pd.DataFrame(columns=EVENT_COLUMNS)
+        return pd.concat([pq.read_table(f).to_pandas() for f in files], ignore_index=True)
+
+
+def open_sink(kind=None, directory=TELEMETRY_DIR):
+    """The configured sink: SQLite by default, Parquet with PORTFOLIO_TELEMETRY_SINK=parquet"""
+    kind = kind or os.environ.get(SINK_ENV, 'sqlite')
+    if kind == 'parquet':
+        return ParquetSink(Path(directory) / 'events')
+    if kind == 'sqlite':
+        return SQLiteSink(Path(directory) / 'events.sqlite')
+    raise ValueError(f"Unknown telemetry sink: {kind}")
+
+
+class Telemetry:
+    """Ring buffer plus the background thread that flushes it to a sink in batches"""
+
+    def __init__(self, sink, capacity=BUFFER_EVENTS, flush_events=FLUSH_EVENTS, flush_seconds=FLUSH_SECONDS):
+        self.sink = sink
+        self.buffer = RingBuffer(capacity)
+        self.flush_events = flush_events
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.failed = 0
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='telemetry-flush', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record(self, session, experiment, variant, event, value=None):
+        """Buffer one event; never touches disk"""
+        self.buffer.append((time.time(), session, experiment, variant, event,
+                            None if value is None else float(value)))
+        if len(self.buffer) >= self.flush_events:
+            self._wake.set()
+
+    def flush(self):
+        """Write everything buffered so far, one batch per transaction"""
+        with self._flush_lock:
+            while True:
+                batch = self.buffer.drain(self.flush_events)
+                if not batch:
+                    return
+                try:
+                    self.sink.write(batch)
+                    self.written += len(batch)
+                except Exception:
+                    # Telemetry must never break the app; a failed batch is counted and discarded
+                    self.failed += len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def stats(self):
+        return {'buffered': len(self.buffer), 'written': self.written,
+                'dropped': self.buffer.dropped, 'failed': self.failed}
+
+
+@st.cache_resource(show_spinner=False)
+def get_telemetry():
+    """The process-wide telemetry pipeline, shared by all sessions"""
+    return Telemetry(open_sink())
+
+
+# Session side
+
+def telemetry_enabled():
+    """False when disabled for the process, the browser sends Do Not Track or the session opted out"""
+    if os.environ.get(ENV_FLAG, '').lower() in _FALSY:
+        return False
+    if st.context.headers.get('DNT') == '1':
+        return False
+    return not st.session_state.get('telemetry_opt_out', False)
+
+
+def session_token():
+    """Random per-session token; it identifies a session within the event log and nothing else"""
+    return st.session_state.setdefault('telemetry_session', secrets.token_hex(8))
+
+
+def assign_variant(experiment):
+    """This session's variant for an experiment, drawn uniformly once and then kept"""
+    variants = st.session_state.setdefault('ab_variants', {})
+    if experiment not in variants:
+        choices = EXPERIMENTS[experiment]['variants']
+        variants[experiment] = choices[secrets.randbelow(len(choices))]
+    return variants[experiment]
+
+
+def track(experiment, event, value=None):
+    """Record an event for this session's variant of an experiment"""
+    if telemetry_enabled():
+        get_telemetry().record(session_token(), experiment, assign_variant(experiment), event, value)
+
+
+def track_exposure(experiment):
+    """Record that this session saw its variant; counted once per session"""
+    exposed = st.session_state.setdefault('ab_exposed', set())
+    if experiment not in exposed and telemetry_enabled():
+        exposed.add(experiment)
+        track(experiment, 'exposure')
+
+
+def _on_select(experiment, key):
+    points = st.session_state[key].selection.get('points', [])
+    if points:
+        track(experiment, 'select', len(points))
+
+
+def _on_feedback(experiment, key):
+    if st.session_state[key] is not None:
+        track(experiment, 'feedback', st.session_state[key])
+
+
+def tracked_chart(fig, experiment):
+    """Render an experiment's chart, recording the exposure and any point selections"""
+    track_exposure(experiment)
+    key = f'ab_chart_{experiment}'
+    st.plotly_chart(fig, use_container_width=True, key=key,
+                    on_select=partial(_on_select, experiment, key), selection_mode=('points', 'box', 'lasso'))
+
+
+def feedback_prompt(experiment, question="Was this chart easy to read?"):
+    """Thumbs up/down vote on an experiment's chart"""
+    key = f'ab_feedback_{experiment}'
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(question)
+    with col2:
+        st.feedback('thumbs', key=key, on_change=partial(_on_feedback, experiment, key))
+
+
+def telemetry_sidebar():
+    """Sidebar opt-out for usage statistics"""
+    with st.sidebar:
+        st.markdown("### 📊 Usage Statistics")
+        share = st.toggle("Share anonymous usage statistics", value=not st.session_state.get('telemetry_opt_out', False),
+                          help="Which chart variant you saw and whether you interacted with or rated it. "
+                               "No personal data is recorded.")
+        st.session_state['telemetry_opt_out'] = not share
+
+
+# Analysis
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_events(kind=None, directory=str(TELEMETRY_DIR)):
+    """Every stored event, re-read at most every 30 seconds"""
+    return open_sink(kind, directory).read()
+
+
+def session_outcomes(events, experiment):
+    """One row per exposed session: variant, interactions and its last helpfulness vote"""
+    events = events[events['experiment'] == experiment]
+    exposed = events.loc[events['event'] == 'exposure', ['session', 'variant']].drop_duplicates('session')
+    selects = events[events['event'] == 'select'].groupby('session').size().rename('Interactions')
+    votes = (events[events['event'] == 'feedback'].sort_values('ts')
+             .groupby('session')['value'].last().rename('Vote'))
+    outcomes = exposed.set_index('session').join(selects).join(votes)
+    outcomes['Interactions'] = outcomes['Interactions'].fillna(0).astype(int)
+    return outcomes.reset_index()
+
+
+def _proportion_ci(successes, trials):
+    """Wilson score interval for a proportion"""
+    z = stats.norm.ppf(1 - ALPHA / 2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = successes / trials
+        centre = (p + z ** 2 / (2 * trials)) / (1 + z ** 2 / trials)
+        half = z * np.sqrt(p * (1 - p) / trials + z ** 2 / (4 * trials ** 2)) / (1 + z ** 2 / trials)
+    return centre - half, centre + half
+
+
+def _chi_square(table):
+    """Chi-square test of independence on a variants x outcomes table; NaNs when it is degenerate"""
+    table = np.asarray(table, dtype=np.float64)
+    table = table[table.sum(axis=1) > 0]
+    if len(table) < 2 or (table.sum(axis=0) == 0).any():
+        return np.nan, np.nan, False
+    statistic, p_value, _, expected = stats.chi2_contingency(table, correction=False)
+    return statistic, p_value, bool((expected < 5).any())
+
+
+def experiment_results(events, experiment):
+    """Per-variant engagement and significance tests for one experiment.
+
+    Returns (variants, tests). variants has one row per variant with sessions, interaction
+    rate (with a 95% Wilson interval), interactions per session and the helpful-vote rate.
+    tests compares variants on each metric: chi-square for the two rates and Mann-Whitney U
+    (Kruskal-Wallis with more than two variants) for interactions per session.
+    """
+    outcomes = session_outcomes(events, experiment)
+    variants = EXPERIMENTS[experiment]['variants']
+    grouped = outcomes.groupby('variant')
+    summary = pd.DataFrame({
+        'Sessions': grouped.size(),
+        'Interacting': grouped['Interactions'].apply(lambda x: int((x > 0).sum())),
+        'Interactions_per_Session': grouped['Interactions'].mean(),
+        'Votes': grouped['Vote'].count(),
+        'Helpful': grouped['Vote'].sum(),
+    }).reindex(variants).fillna(0)
+    summary['Interaction_Rate'] = summary['Interacting'] / summary['Sessions'].replace(0, np.nan)
+    summary['Rate_Low'], summary['Rate_High'] = _proportion_ci(summary['Interacting'],
+                                                               summary['Sessions'].replace(0, np.nan))
+    summary['Helpful_Rate'] = summary['Helpful'] / summary['Votes'].replace(0, np.nan)
+    summary = summary.rename_axis('Variant').reset_index()
+
+    rows = []
+    statistic, p_value, sparse = _chi_square(np.column_stack(
+        [summary['Interacting'], summary['Sessions'] - summary['Interacting']]))
+    rows.append(('Interaction rate', 'Chi-square', statistic, p_value, sparse))
+    statistic, p_value, sparse = _chi_square(np.column_stack(
+        [summary['Helpful'], summary['Votes'] - summary['Helpful']]))
+    rows.append(('Helpful-vote rate', 'Chi-square', statistic, p_value, sparse))
+    samples = [outcomes.loc[outcomes['variant'] == v, 'Interactions'].to_numpy() for v in variants]
+    samples = [s for s in samples if len(s)]
+    if len(samples) < 2 or np.ptp(np.concatenate(samples)) == 0:
+        statistic, p_value = np.nan, np.nan
+    elif len(samples) == 2:
+        statistic, p_value = stats.mannwhitneyu(*samples)
+    else:
+        statistic, p_value = stats.kruskal(*samples)
+    rows.append(('Interactions per session', 'Mann-Whitney U' if len(samples) == 2 else 'Kruskal-Wallis',
+                 statistic, p_value, min((len(s) for s in samples), default=0) < 20))
+
+    tests = pd.DataFrame(rows, columns=['Metric', 'Test', 'Statistic', 'p_value', 'Low_Sample'])
+    tests['Significant'] = tests['p_value'] < ALPHA
+    return summary, tests
+
+
+# Simulated sessions for demos
+
+def simulate_sessions(telemetry, n_sessions, seed=42):
+    """Record n_sessions synthetic sessions in which the second variant of each experiment
+    is somewhat more engaging, through the same buffer and flush path as the app"""
+    rng = np.random.default_rng(seed)
+    for _ in range(n_sessions):
+        session = secrets.token_hex(8)
+        for experiment, spec in EXPERIMENTS.items():
+            arm = int(rng.integers(len(spec['variants'])))
+            variant = spec['variants'][arm]
+            telemetry.record(session, experiment, variant, 'exposure')
+            for _ in range(rng.poisson(0.6 + 0.25 * arm)):
+                telemetry.record(session, experiment, variant, 'select', int(rng.integers(1, 12)))
+            if rng.random() < 0.3:
+                telemetry.record(session, experiment, variant, 'feedback', int(rng.random() < 0.6 + 0.1 * arm))
+    telemetry.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record simulated A/B test sessions")
+    parser.add_argument('--simulate', type=int, required=True, help="Number of sessions")
+    parser.add_argument('--sink', choices=['sqlite', 'parquet'], default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    telemetry = Telemetry(open_sink(args.sink))
+    start = time.perf_counter()
+    simulate_sessions(telemetry, args.simulate, args.seed)
+    telemetry.close()
+    print(f"Recorded {telemetry.written:,} events for {args.simulate:,} sessions "
+          f"in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())